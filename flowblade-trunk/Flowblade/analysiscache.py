@@ -0,0 +1,113 @@
+"""
+    Flowblade Movie Editor is a nonlinear video editor.
+    Copyright 2012 Janne Liljeblad.
+
+    This file is part of Flowblade Movie Editor <https://github.com/jliljebl/flowblade/>.
+
+    Flowblade Movie Editor is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Flowblade Movie Editor is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Flowblade Movie Editor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+"""
+Module keeps a persisted index of stabilizing and motion tracking analysis results.
+
+Results are keyed by source file fingerprint, analyzed range, analysis parameters and
+profile. Analysis requests matching an existing results file use it without launching
+analysis process.
+"""
+
+import hashlib
+import os
+import pickle
+import threading
+
+import atomicfile
+import userfolders
+import utils
+
+INDEX_FILE = "analysis_results_cache"
+
+STABILIZE_ANALYSIS = "stabilize"
+TRACKING_ANALYSIS = "tracking"
+
+# Stabilizing is analyzed for clip range plus handles, so that small trims do not
+# require new analysis and transforms smoothing has frames to use at range ends.
+ANALYSIS_HANDLE_FRAMES = 25
+
+_index = None # analysis key -> results file path
+_index_lock = threading.Lock()
+
+
+def get_analysis_key(analysis_type, source_path, range_in, range_out, params, profile_desc):
+    """
+    Returns key for analysis or None if source file can not be read.
+    """
+    try:
+        stat = os.stat(source_path)
+    except OSError:
+        return None
+
+    # Path, size and modification time identify source file, hashing contents would
+    # take a large part of the analysis time for long clips.
+    key_str = str((analysis_type, source_path, stat.st_size, stat.st_mtime, range_in, range_out, params, profile_desc))
+    return hashlib.md5(key_str.encode("utf-8")).hexdigest()
+
+def get_stabilize_range(clip, smoothing):
+    # Returns clip range with handles limited to media length.
+    handle = max(ANALYSIS_HANDLE_FRAMES, int(float(smoothing)))
+    range_in = max(0, clip.clip_in - handle)
+    range_out = min(clip.get_length() - 1, clip.clip_out + handle)
+    return (range_in, range_out)
+
+
+# ------------------------------------------------------ index
+def _get_index():
+    global _index
+    if _index == None:
+        try:
+            _index = utils.unpickle(userfolders.get_cache_dir() + INDEX_FILE)
+        except:
+            _index = {}
+    return _index
+
+def save():
+    with _index_lock:
+        index = dict(_get_index())
+    with atomicfile.AtomicFileWriter(userfolders.get_cache_dir() + INDEX_FILE, "wb") as afw:
+        write_file = afw.get_file()
+        pickle.dump(index, write_file)
+
+def get_results_file(analysis_key):
+    """
+    Returns path to existing results file for key or None.
+    """
+    if analysis_key == None:
+        return None
+
+    with _index_lock:
+        results_file = _get_index().get(analysis_key)
+        if results_file == None:
+            return None
+        if os.path.isfile(results_file) == False:
+            del _get_index()[analysis_key]
+            return None
+
+    print("Using cached analysis results", results_file)
+    return results_file
+
+def add_results_file(analysis_key, results_file):
+    if analysis_key == None or os.path.isfile(results_file) == False:
+        return
+    with _index_lock:
+        _get_index()[analysis_key] = results_file
+    save()
@@ -104,6 +104,7 @@ import projectdatavault
 import projectdatavaultgui
 import projectinfogui
 import propertyeditorbuilder
+import proxyscheduler
 import render
 import renderconsumer
 import rendergputest
@@ -115,6 +116,7 @@ import sequence
 import shortcuts
 import shortcutsquickeffects
 import snapping
+import startupinit
 import targetactions
 import threading
 import titler
@@ -221,17 +223,19 @@ class FlowbladeApplication(Gtk.Application):
 
     def on_activate(self, data=None):
         faulthandler.enable()
-        
+        startupinit.start()
+
+        # XML documents are parsed in background while MLT is being initialized.
+        startupinit.prefetch_xml(respaths.ROOT_PATH + renderconsumer.RENDER_ENCODING_FILE)
+        startupinit.prefetch_xml(respaths.FILTERS_XML_DOC)
+        startupinit.prefetch_xml(respaths.COMPOSITORS_XML_DOC)
+        startupinit.prefetch_xml(respaths.REPLACEMENTS_XML_DOC)
+
         # Init translations module with translations data.
         translations.init_languages()
         translations.load_filters_translations()
         mlttransitions.init_module()
-
-        # Keyboard shortcuts.
-        shortcuts.update_custom_shortcuts()
-        shortcuts.load_shortcut_files()
-        shortcuts.load_shortcuts()
-        shortcutsquickeffects.load_shortcuts()
+        startupinit.phase_done("translations")
 
         # We have translations in data structs and need some initing.
         animatedvalue.init()
@@ -275,6 +279,7 @@ class FlowbladeApplication(Gtk.Application):
         if scr_w < 1151 or scr_h < 767:
             _too_small_screen_exit()
             return
+        startupinit.phase_done("theme and screen data")
 
         # Init MLT framework
         repo = mlt.Factory().init()
@@ -282,9 +287,15 @@ class FlowbladeApplication(Gtk.Application):
 
         # Set numeric locale to use "." as radix, MLT initializes this to OS locale and this causes bugs.
         locale.setlocale(locale.LC_NUMERIC, 'C')
+        startupinit.phase_done("MLT init")
+
+        # Environment detection, profiles and keyboard shortcuts do not depend on each other.
+        startupinit.run_concurrently([("MLT environment detection", lambda: mltenv.check_available_features(repo)),
+                                      ("MLT profiles", mltprofiles.load_profile_list),
+                                      ("keyboard shortcuts", _load_shortcuts)])
+        startupinit.phase_done("concurrent init stages")
 
-        # Check for codecs and formats on the system exit if detection failed.
-        mltenv.check_available_features(repo)
+        # Exit if codecs and formats detection failed.
         if mltenv.environment_detection_success == False:
             _failed_environment_exit()
             return
@@ -299,13 +310,13 @@ class FlowbladeApplication(Gtk.Application):
         
         # Replace some services if better replacements available.
         mltfilters.replace_services(mltenv.services)
-
-        # Create list of available mlt profiles.
-        mltprofiles.load_profile_list()
+        startupinit.phase_done("render profiles, filters and compositors")
 
         # We need to test which GPU render options work after profiles are inited because
-        # we do the test by doing test renders.
+        # we do the test by doing test renders. Test renders for untested systems are
+        # launched after startup.
         rendergputest.test_gpu_rendering_options(render.update_encoding_selector)
+        startupinit.phase_done("GPU encoders")
             
         # Save assoc file path if found in arguments.
         global assoc_file_path
@@ -346,12 +357,14 @@ class FlowbladeApplication(Gtk.Application):
 
         # Media Plugins a.k.a Generators.
         mediaplugin.init()
+        startupinit.phase_done("project, tools and plugins")
 
         # Create player object.
         create_player()
 
         # Create main window and make widgeta available from gui.py.
         create_gui()
+        startupinit.phase_done("player and main window")
 
         # Inits widgets with project data.
         init_project_gui()
@@ -426,6 +439,9 @@ class FlowbladeApplication(Gtk.Application):
         global disk_cache_timeout_id
         disk_cache_timeout_id = GLib.timeout_add(2500, check_disk_cache_size)
 
+        # Proxy files for heavy media are created when app is idle.
+        proxyscheduler.start()
+
         editorstate.app = self
 
         # Connect to USB HID device (if enabled)
@@ -439,6 +455,10 @@ class FlowbladeApplication(Gtk.Application):
         global _app_init_complete
         _app_init_complete = True
 
+        startupinit.phase_done("editor state and GUI data")
+        startupinit.print_report()
+        startupinit.shutdown()
+
         # Launch SDL 2 player now that data and gui exist if using that.
         if mltplayer.get_sdl_consumer_version() == mltplayer.SDL_2:
             GLib.idle_add(_create_sdl_2_consumer)
@@ -448,6 +468,12 @@ class FlowbladeApplication(Gtk.Application):
             self.add_window(gui.editor_window.window2)
 
 # --------------------------------------- display
+def _load_shortcuts():
+    shortcuts.update_custom_shortcuts()
+    shortcuts.load_shortcut_files()
+    shortcuts.load_shortcuts()
+    shortcutsquickeffects.load_shortcuts()
+
 def _create_sdl_2_consumer():
     launch_player()
 
@@ -1084,8 +1110,12 @@ def log_print_output_to_file():
 
 # ------------------------------------------------------ shutdown
 def shutdown():
+    # Idle time proxy renders do not keep app from closing.
+    proxyscheduler.shutdown()
+
     if jobs.get_active_jobs_count() != 0:
         dialogs.active_jobs_info(jobs.get_active_jobs_count())
+        proxyscheduler.start()
         return True
 
     if projectaction.was_edited_since_last_save() == False:
@@ -1111,8 +1141,10 @@ def _shutdown_dialog_callback(dialog, response_id, no_dialog_shutdown=False):
                 dialogutils.warning_message(_("Project has not been saved previously"), 
                                         _("Save project with File -> Save As before closing."),
                                         gui.editor_window.window)
+                proxyscheduler.start()
                 return
         else: # "Cancel"
+            proxyscheduler.start()
             return
     else:
         print("Nothing changed since last save.")
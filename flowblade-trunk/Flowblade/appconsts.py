@@ -215,6 +215,7 @@ P_PROP_TLINE_SHRINK_VERTICAL = "tline_shrink_vertical"
 P_PROP_LAST_RENDER_SELECTIONS = "P_PROP_LAST_RENDER_SELECTIONS"
 P_PROP_TRANSITION_ENCODING = "P_PROP_TRANSITION_ENCODING"
 P_PROP_DEFAULT_FADE_LENGTH = "P_PROP_DEFAULT_FADE_LENGTH"
+P_PROP_IDLE_PROXIES = "P_PROP_IDLE_PROXIES"
 
 # A context defining action taken when mouse press happens based on edit mode and mouse position.
 POINTER_CONTEXT_NONE = 0
@@ -33,8 +33,10 @@ try:
     import mlt7 as mlt
 except:
     import mlt
+import numpy as np
 
 from gi.repository import Gtk, GObject
+from gi.repository import Gdk
 from gi.repository import GLib
 from gi.repository import Pango
 gi.require_version('PangoCairo', '1.0')
@@ -74,6 +76,7 @@ DB_IEC_MINUS_40 = 0.15
 
 PEAK_FRAMES = 14
 OVER_FRAMES = 30
+METER_DECAY = 0.8 # displayed level falls at most this much per update
 
 # Colors
 METER_BG_COLOR = (0.15, 0.15, 0.15)
@@ -101,7 +104,12 @@ _master_volume_meter = None
 
 _update_ticker = None
 _level_filters = [] # 0 master, 1 - (len - 1) editable tracks
-_audio_levels = [] # 0 master, 1 - (len - 1) editable tracks
+
+# Meter state arrays with shape (meters, 2), row 0 master, rows 1 - (len - 1) editable tracks, columns L, R.
+_audio_levels = np.zeros((0, 2)) # displayed levels
+_peaks = np.zeros((0, 2))
+_peak_countdowns = np.zeros((0, 2), dtype=int)
+_over_countdowns = np.zeros((0, 2), dtype=int)
     
 def init(profile):
     audio_level_filter = mlt.Filter(profile, "audiolevel")
@@ -260,7 +268,7 @@ def _init_level_filters(create_track_filters):
             _level_filters.append(_add_audio_level_filter(seq.tracks[i], seq.profile))
 
 def _destroy_level_filters(destroy_track_filters=False):
-    global _level_filters, _audio_levels
+    global _level_filters
 
     # We need to be sure that audio level updates are stopped before
     # detaching and destroying them
@@ -281,16 +289,15 @@ def _destroy_level_filters(destroy_track_filters=False):
     # Destroy unneeded filters
     if _master_volume_meter == None and _monitor_window == None:
         _level_filters = []
-        _audio_levels = []
     elif _monitor_window == None:
         _level_filters = [_level_filters[0]]
-        _audio_levels[0] = (0.0, 0.0)
+    _reset_meter_state(len(_level_filters))
 
     if _master_volume_meter != None or _monitor_window != None:
         launch_update_ticker()
 
 def recreate_master_meter_filter_for_new_sequence():
-    global _level_filters, _audio_levels
+    global _level_filters
 
     # We need to be sure that audio level updates are stopped before
     # detaching and destroying them
@@ -302,7 +309,7 @@ def recreate_master_meter_filter_for_new_sequence():
         if _master_volume_meter != None:
             seq.tractor.detach(_level_filters[0])
             _level_filters.pop(0)
-            _audio_levels[0] = (0.0, 0.0)
+            _reset_meter_state(len(_level_filters) + 1)
             master_level_filter = _add_audio_level_filter(seq.tractor, seq.profile)
             _level_filters.insert(0, master_level_filter)
 
@@ -321,30 +328,113 @@ def _audio_monitor_update(data):
     if _monitor_window == None and _master_volume_meter == None:
         return
 
-    global _audio_levels
-    _audio_levels = []
-    for i in range(0, len(_level_filters)):
-        audio_level_filter = _level_filters[i]
-        l_val = _get_channel_value(audio_level_filter, LEFT_CHANNEL)
-        r_val = _get_channel_value(audio_level_filter, RIGHT_CHANNEL)
-        _audio_levels.append((l_val, r_val))
+    # No level reads or draws are done for meters that are not on screen.
+    monitor_visible = (_monitor_window != None and _widget_on_screen(_monitor_window.meters_area.widget))
+    master_visible = (_master_volume_meter != None and _widget_on_screen(_master_volume_meter.canvas))
+    if monitor_visible == False and master_visible == False:
+        return
 
-    if _monitor_window != None:
+    if _update_meter_state(_read_levels()) == False:
+        return # Meters display the same values already.
+
+    if monitor_visible == True:
         _monitor_window.meters_area.widget.queue_draw()
-    if _master_volume_meter != None:
+    if master_visible == True:
         _master_volume_meter.canvas.queue_draw()
 
-def _get_channel_value(audio_level_filter, channel_property):
-    level_value = audio_level_filter.get(channel_property)
-    if level_value == None:
-        level_value  = "0.0"
+def _widget_on_screen(widget):
+    if widget.get_mapped() == False:
+        return False
+    gdk_window = widget.get_toplevel().get_window()
+    if gdk_window != None and (gdk_window.get_state() & Gdk.WindowState.ICONIFIED):
+        return False
+    return True
+
+def _read_levels():
+    # Returns (meters, 2) array of current levels of all level filters.
+    values = []
+    for audio_level_filter in _level_filters:
+        values.append(audio_level_filter.get(LEFT_CHANNEL))
+        values.append(audio_level_filter.get(RIGHT_CHANNEL))
+    values = ["0.0" if value == None else value for value in values]
 
     try:
-        level_float = float(level_value)
-    except Exception:
-        level_float = 0.0
+        levels = np.array(values, dtype=float)
+    except ValueError:
+        levels = np.array([_get_float_value(value) for value in values])
+    return levels.reshape((len(_level_filters), 2))
 
-    return level_float
+def _get_float_value(level_value):
+    try:
+        return float(level_value)
+    except Exception:
+        return 0.0
+
+def _reset_meter_state(meters_count):
+    global _audio_levels, _peaks, _peak_countdowns, _over_countdowns
+    _audio_levels = np.zeros((meters_count, 2))
+    _peaks = np.zeros((meters_count, 2))
+    _peak_countdowns = np.zeros((meters_count, 2), dtype=int)
+    _over_countdowns = np.zeros((meters_count, 2), dtype=int)
+
+def _update_meter_state(levels):
+    # Updates displayed levels, peak holds and over indicators for all channels.
+    # Returns False if nothing displayed changed.
+    global _audio_levels, _peak_countdowns
+    if levels.shape != _audio_levels.shape:
+        _reset_meter_state(levels.shape[0])
+
+    prev_levels = _audio_levels
+    prev_peaks = _peaks.copy()
+    prev_overs = _over_countdowns > 0
+
+    _audio_levels = np.maximum(levels, prev_levels * METER_DECAY)
+    _audio_levels[_audio_levels < 0.001] = 0.0
+
+    _over_countdowns[levels > 1.0] = OVER_FRAMES + 1
+    np.subtract(_over_countdowns, 1, out=_over_countdowns, where=_over_countdowns > 0)
+
+    new_peaks = _audio_levels > _peaks
+    _peaks[new_peaks] = _audio_levels[new_peaks]
+    _peak_countdowns[new_peaks] = PEAK_FRAMES
+    _peak_countdowns -= 1
+    _peaks[_peak_countdowns <= 0] = 0.0
+
+    return not (np.array_equal(_audio_levels, prev_levels) and np.array_equal(_peaks, prev_peaks) 
+                and np.array_equal(_over_countdowns > 0, prev_overs))
+
+def _get_meter_gradient(y_top, y_bottom):
+    grad = cairo.LinearGradient(0, y_top, 0, y_bottom)
+    grad.add_color_stop_rgba(*RED_1)
+    grad.add_color_stop_rgba(*RED_2)
+    grad.add_color_stop_rgba(*YELLOW_1)
+    grad.add_color_stop_rgba(*YELLOW_2)
+    grad.add_color_stop_rgba(*GREEN_1)
+    grad.add_color_stop_rgba(*GREEN_2)
+    return grad
+
+def _draw_meters(cr, meters, x_positions, first_level_index, grad):
+    # Draws level bars, peak holds and over indicators of all meters with one
+    # stroke or fill per element type.
+    meter_width = meters[0].meter_width
+
+    cr.set_source(grad)
+    cr.set_dash(DASHES, 0) 
+    cr.set_line_width(meter_width)
+    for i in range(0, len(meters)):
+        l_value, r_value = _audio_levels[first_level_index + i]
+        meters[i].add_level_paths(cr, x_positions[i], l_value, r_value)
+    cr.stroke()
+    cr.set_dash([], 0)
+
+    for i in range(0, len(meters)):
+        meters[i].add_peak_paths(cr, x_positions[i], _peaks[first_level_index + i], _audio_levels[first_level_index + i])
+    cr.fill()
+
+    cr.set_source_rgb(1,0.6,0.6)
+    for i in range(0, len(meters)):
+        meters[i].add_over_paths(cr, x_positions[i], _over_countdowns[first_level_index + i] > 0)
+    cr.fill()
 
 
 
@@ -408,26 +498,32 @@ class MetersArea:
                 meter.right_channel.draw_dB = True
             self.audio_meters.append(meter)
 
+        self.static_surface = None
+        self.static_size = None
+
     def _draw(self, event, cr, allocation):
         x, y, w, h = allocation
 
-        cr.set_source_rgb(0.0, 0.0, 0.0)
-        cr.rectangle(0, 0, w, h)
-        cr.fill()
+        # Background, channel identifiers and dB lines are drawn only when size changes.
+        if self.static_size != (w, h):
+            self.static_surface = cr.get_target().create_similar(cairo.CONTENT_COLOR_ALPHA, w, h)
+            self.static_size = (w, h)
+            static_cr = cairo.Context(self.static_surface)
+            static_cr.set_source_rgb(0.0, 0.0, 0.0)
+            static_cr.rectangle(0, 0, w, h)
+            static_cr.fill()
+            for i in range(0, len(self.audio_meters)):
+                self.audio_meters[i].draw_static(static_cr, i * SLOT_W)
 
-        grad = cairo.LinearGradient (0, Y_TOP_PAD, 0, METER_HEIGHT + Y_TOP_PAD)
-        grad.add_color_stop_rgba(*RED_1)
-        grad.add_color_stop_rgba(*RED_2)
-        grad.add_color_stop_rgba(*YELLOW_1)
-        grad.add_color_stop_rgba(*YELLOW_2)
-        grad.add_color_stop_rgba(*GREEN_1)
-        grad.add_color_stop_rgba(*GREEN_2)
+        cr.set_source_surface(self.static_surface, 0, 0)
+        cr.paint()
 
-        for i in range(0, len(_audio_levels)):
-            meter = self.audio_meters[i]
-            l_value, r_value = _audio_levels[i]
-            x = i * SLOT_W
-            meter.display_value(cr, x, l_value, r_value, grad)
+        meters_count = min(len(self.audio_meters), len(_audio_levels))
+        if meters_count == 0:
+            return
+        grad = _get_meter_gradient(Y_TOP_PAD, METER_HEIGHT + Y_TOP_PAD)
+        x_positions = [i * SLOT_W for i in range(0, meters_count)]
+        _draw_meters(cr, self.audio_meters[0:meters_count], x_positions, 0, grad)
 
 
 
@@ -442,17 +538,24 @@ class AudioMeter:
     def set_height(self, h):
         self.left_channel.set_height(h)
         self.right_channel.set_height(h)
-        
-    def display_value(self, cr, x, value_left, value_right, grad):
-        cr.set_source(grad)
-        cr.set_dash(DASHES, 0) 
-        cr.set_line_width(self.meter_width)
-        self.left_channel.display_value(cr, x + self.x_pad_l, value_left)
 
-        cr.set_source(grad)
-        cr.set_dash(DASHES, 0) 
-        cr.set_line_width(self.meter_width)
-        self.right_channel.display_value(cr, x + self.x_pad_r, value_right)
+    def add_level_paths(self, cr, x, value_left, value_right):
+        self.left_channel.add_level_path(cr, x + self.x_pad_l, value_left)
+        self.right_channel.add_level_path(cr, x + self.x_pad_r, value_right)
+
+    def add_peak_paths(self, cr, x, peaks, values):
+        self.left_channel.add_peak_path(cr, x + self.x_pad_l, peaks[0], values[0])
+        self.right_channel.add_peak_path(cr, x + self.x_pad_r, peaks[1], values[1])
+
+    def add_over_paths(self, cr, x, overs):
+        if overs[0] == True:
+            self.left_channel.add_over_path(cr, x + self.x_pad_l)
+        if overs[1] == True:
+            self.right_channel.add_over_path(cr, x + self.x_pad_r)
+
+    def draw_static(self, cr, x):
+        self.left_channel.draw_static(cr, x + self.x_pad_l)
+        self.right_channel.draw_static(cr, x + self.x_pad_r)
 
 
 
@@ -460,54 +563,37 @@ class ChannelMeter:
     def __init__(self, height, channel_text):
         self.height = height
         self.channel_text = channel_text
-        self.peak = 0.0
-        self.countdown = 0
         self.draw_dB = False
         self.dB_x_pad = 11
         self.y_top_pad = Y_TOP_PAD
-        self.over_countdown = 0
 
     def set_height(self, height):
         self.height = height
 
-    def display_value(self, cr, x, value):
-        if value > 1.0:
-            self.over_countdown = OVER_FRAMES
-
+    def add_level_path(self, cr, x, value):
         top = self.get_meter_y_for_value(value)
         if (self.height - top) < 5: # fix for meter y rounding for vol 0
             top = self.height
         cr.move_to(x, self.height + self.y_top_pad)
         cr.line_to(x, top + self.y_top_pad)
-        cr.stroke()
-        
-        if value > self.peak:
-            self.peak = value
-            self.countdown = PEAK_FRAMES
-        
-        if self.peak > value:
-            if self.peak > 1.0:
-                self.peak = 1.0
+
+    def add_peak_path(self, cr, x, peak, value):
+        if peak > value:
+            if peak > 1.0:
+                peak = 1.0
             cr.rectangle(x - METER_WIDTH / 2, 
-                         self.get_meter_y_for_value(self.peak) + DASH_SKIP * 2 + DASH_INK + 3, # this y is just empirism, works
+                         self.get_meter_y_for_value(peak) + DASH_SKIP * 2 + DASH_INK + 3, # this y is just empirism, works
                          METER_WIDTH,
                          DASH_INK)
-            cr.fill()
-
-        self.countdown = self.countdown - 1
-        if self.countdown <= 0:
-             self.peak = 0
-
-        if self.over_countdown > 0:
-            cr.set_source_rgb(1,0.6,0.6)
-            cr.move_to(x, 0)
-            cr.line_to(x + 4, 4)
-            cr.line_to(x, 8)
-            cr.line_to(x - 4, 4)
-            cr.close_path()
-            cr.fill()
-            self.over_countdown = self.over_countdown - 1
-                    
+
+    def add_over_path(self, cr, x):
+        cr.move_to(x, 0)
+        cr.line_to(x + 4, 4)
+        cr.line_to(x, 8)
+        cr.line_to(x - 4, 4)
+        cr.close_path()
+
+    def draw_static(self, cr, x):
         self.draw_channel_identifier(cr, x)
 
         if self.draw_dB == True:
@@ -680,25 +766,26 @@ class MasterVolumeMeter:
         self.widget = Gtk.VBox(False, 0)
         self.widget.pack_start(self.canvas, True, True, 0)
 
+        self.static_surface = None
+        self.static_size = None
+
     def _draw(self, event, cr, allocation):
         x, y, w, h = allocation
 
-        self.meter.set_height(h - self.H_CUT)
- 
-        cr.set_source_rgb(0.15, 0.15, 0.15)
-        cr.fill_preserve()
-        cr.rectangle(0, 0, w, h)
-        cr.fill()
-
-        grad = cairo.LinearGradient (0, self.top_pad, 0, self.top_pad + h - self.GRAD_CUT)
-        grad.add_color_stop_rgba(*RED_1)
-        grad.add_color_stop_rgba(*RED_2)
-        grad.add_color_stop_rgba(*YELLOW_1)
-        grad.add_color_stop_rgba(*YELLOW_2)
-        grad.add_color_stop_rgba(*GREEN_1)
-        grad.add_color_stop_rgba(*GREEN_2)
-
-        l_value, r_value = _audio_levels[0]
-
-        x = 0
-        self.meter.display_value(cr, x, l_value, r_value, grad)
+        if self.static_size != (w, h):
+            self.meter.set_height(h - self.H_CUT)
+            self.static_surface = cr.get_target().create_similar(cairo.CONTENT_COLOR_ALPHA, w, h)
+            self.static_size = (w, h)
+            static_cr = cairo.Context(self.static_surface)
+            static_cr.set_source_rgb(0.15, 0.15, 0.15)
+            static_cr.rectangle(0, 0, w, h)
+            static_cr.fill()
+            self.meter.draw_static(static_cr, 0)
+
+        cr.set_source_surface(self.static_surface, 0, 0)
+        cr.paint()
+
+        if len(_audio_levels) == 0:
+            return
+        grad = _get_meter_gradient(self.top_pad, self.top_pad + h - self.GRAD_CUT)
+        _draw_meters(cr, [self.meter], [0], 0, grad)
@@ -82,12 +82,33 @@ def _write_offsets(video_file_path, audio_file_path, completed_callback):
     FLOG = open(userfolders.get_cache_dir() + "log_clapperless", 'w')
     
     # clapperless.py computes offsets and writes them to file clapperless.OFFSETS_DATA_FILE
-    p = subprocess.Popen([sys.executable, respaths.LAUNCH_DIR + "flowbladeclapperless", video_file_path, audio_file_path, "--rate", fps, "--idstr", idstr], stdin=FLOG, stdout=FLOG, stderr=FLOG)
+    command_list = [sys.executable, respaths.LAUNCH_DIR + "flowbladeclapperless", video_file_path, audio_file_path, "--rate", fps, "--idstr", idstr]
+    command_list += _get_cached_levels_args([video_file_path, audio_file_path])
+    p = subprocess.Popen(command_list, stdin=FLOG, stdout=FLOG, stderr=FLOG)
     p.wait()
     
     # Offsets are now available
     GLib.idle_add(completed_callback, (video_file_path, audio_file_path, idstr))
 
+def _get_cached_levels_args(file_paths):
+    # Audio levels rendered for timeline waveforms have one value per frame, 
+    # clapperless can use them instead of decoding files if frame rate is integer.
+    if abs(utils.fps() - round(utils.fps())) > 0.001:
+        return []
+
+    levels_files = []
+    for file_path in file_paths:
+        levels_file = userfolders.get_audio_levels_dir() + utils.get_unique_name_for_audio_levels_file(file_path, PROJECT().profile)
+        if os.path.isfile(levels_file) and os.path.getsize(levels_file) > 0:
+            levels_files.append(levels_file)
+        else:
+            levels_files.append(clapperless.NO_LEVELS_FILE)
+    
+    if all(levels_file == clapperless.NO_LEVELS_FILE for levels_file in levels_files):
+        return []
+
+    return ["--levels"] + levels_files
+
 def _get_offset_file_idstr(file_1, file_2):
     return hashlib.md5((file_1 + file_2).encode('utf-8')).hexdigest()
     
@@ -101,6 +122,8 @@ def _read_offsets(idstr):
     for line in file_lines:
         tokens = line.split(clapperless.MAGIC_SEPARATOR)
         _files_offsets[tokens[0]] = tokens[1]
+        if len(tokens) > 2:
+            print("Audio sync offset", tokens[1], "confidence", tokens[2], "for", tokens[0])
     
     os.remove(offsets_file)
 
@@ -43,6 +43,7 @@ import threading
 
 import atomicfile
 import callbackbridge
+import diskcacheledger
 import editorpersistance
 import editorstate
 import mltinit
@@ -112,6 +113,7 @@ def launch_audio_levels_rendering(file_names):
 
     # Only render audio levels for media that does not have existing levels file
     rendered_media = ""
+    levels_file_paths = []
 
     for media_file in file_names:
         levels_file_path = _get_levels_file_path(media_file, editorstate.PROJECT().profile)
@@ -122,6 +124,7 @@ def launch_audio_levels_rendering(file_names):
             if not (media_file in _render_already_requested):
                 _render_already_requested.append(media_file)
                 rendered_media = rendered_media + FILE_SEPARATOR + media_file
+                levels_file_paths.append(levels_file_path)
 
     # Renders have already been requested for all missing waveform data.
     if rendered_media == "":
@@ -132,7 +135,7 @@ def launch_audio_levels_rendering(file_names):
     # This is called from GTK thread, so we need to launch process from another thread to 
     # clean-up properly and not block GTK thread/GUI
     global single_render_launch_thread
-    single_render_launch_thread = AudioRenderLaunchThread(rendered_media, profile_desc)
+    single_render_launch_thread = AudioRenderLaunchThread(rendered_media, profile_desc, levels_file_paths)
     single_render_launch_thread.start()
 
 def _get_levels_file_path(media_file_path, profile):
@@ -140,10 +143,11 @@ def _get_levels_file_path(media_file_path, profile):
  
 
 class AudioRenderLaunchThread(threading.Thread):
-    def __init__(self, rendered_media, profile_desc):
+    def __init__(self, rendered_media, profile_desc, levels_file_paths):
         threading.Thread.__init__(self)
         self.rendered_media = rendered_media
         self.profile_desc = profile_desc
+        self.levels_file_paths = levels_file_paths
 
     def run(self):
         project_data_path = projectdatavault.get_project_data_folder()
@@ -158,6 +162,9 @@ class AudioRenderLaunchThread(threading.Thread):
                   stdin=FLOG, stdout=FLOG, stderr=FLOG)
         self.process.wait()
 
+        for levels_file_path in self.levels_file_paths:
+            diskcacheledger.file_written(levels_file_path)
+
         Gdk.threads_add_timeout(GLib.PRIORITY_HIGH_IDLE, 10, _repaint)
 
 def _repaint():
@@ -0,0 +1,110 @@
+"""
+    Flowblade Movie Editor is a nonlinear video editor.
+    Copyright 2012 Janne Liljeblad.
+
+    This file is part of Flowblade Movie Editor <https://github.com/jliljebl/flowblade/>.
+
+    Flowblade Movie Editor is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Flowblade Movie Editor is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Flowblade Movie Editor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+"""
+Module keeps persisted results of system capability tests.
+
+Tests like ffmpeg CLI availability and GPU encoder test renders launch processes
+and are done again only when system fingerprint changes, i.e. application, MLT,
+ffmpeg or GPU driver is updated.
+"""
+
+import hashlib
+import os
+import pickle
+import platform
+import shutil
+import threading
+
+import atomicfile
+import editorstate
+import userfolders
+import utils
+
+CACHE_FILE = "system_capabilities"
+
+FFMPEG_CLI = "ffmpeg_cli"
+GPU_ENCODERS = "gpu_encoders"
+
+FINGERPRINT_TOOLS = ["ffmpeg", "melt", "gmic", "nvidia-smi", "vainfo"]
+FINGERPRINT_FILES = ["/proc/driver/nvidia/version"]
+FINGERPRINT_DIRS = ["/dev/dri"]
+
+_fingerprint = None
+_capabilities = None
+_lock = threading.Lock()
+
+
+def get_result(capability_key):
+    """
+    Returns cached test result for current system or None.
+    """
+    with _lock:
+        return _get_capabilities().get(capability_key)
+
+def save_result(capability_key, value):
+    with _lock:
+        _get_capabilities()[capability_key] = value
+        data = {"fingerprint":get_system_fingerprint(), "capabilities":dict(_capabilities)}
+    with atomicfile.AtomicFileWriter(userfolders.get_cache_dir() + CACHE_FILE, "wb") as afw:
+        write_file = afw.get_file()
+        pickle.dump(data, write_file)
+
+def get_system_fingerprint():
+    global _fingerprint
+    if _fingerprint != None:
+        return _fingerprint
+
+    items = [editorstate.appversion, editorstate.mlt_version, platform.python_version(), platform.release()]
+    for tool in FINGERPRINT_TOOLS:
+        items.append((tool, _get_file_id(shutil.which(tool))))
+    for file_path in FINGERPRINT_FILES:
+        items.append((file_path, _get_file_id(file_path)))
+    for dir_path in FINGERPRINT_DIRS:
+        try:
+            items.append((dir_path, sorted(os.listdir(dir_path))))
+        except OSError:
+            items.append((dir_path, None))
+
+    _fingerprint = hashlib.md5(str(items).encode("utf-8")).hexdigest()
+    return _fingerprint
+
+def _get_file_id(file_path):
+    if file_path == None:
+        return None
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return (file_path, stat.st_size, stat.st_mtime)
+
+def _get_capabilities():
+    global _capabilities
+    if _capabilities == None:
+        try:
+            data = utils.unpickle(userfolders.get_cache_dir() + CACHE_FILE)
+            if data["fingerprint"] == get_system_fingerprint():
+                _capabilities = data["capabilities"]
+            else:
+                print("System changed, capability tests will be done again.")
+                _capabilities = {}
+        except:
+            _capabilities = {}
+    return _capabilities
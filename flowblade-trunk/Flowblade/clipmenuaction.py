@@ -56,6 +56,7 @@ import movemodes
 import projectaction
 import render
 import renderconsumer
+import sequencesegments
 import singletracktransition
 import syncsplitevent
 import titler
@@ -967,8 +968,11 @@ def _update_seq_link(data):
     uuid_str = hashlib.md5(str(os.urandom(32)).encode('utf-8')).hexdigest()
     write_file = folder + uuid_str + ".xml"
     
+    # Segment signatures let render skip segments that have not changed since last render.
+    segment_signatures = sequencesegments.get_segment_signatures(link_sequence)
+
     render_player = renderconsumer.XMLRenderPlayer( write_file, _sequence_link_update_xml_render_done_callback, 
-                                                    (clip, track, write_file), link_sequence, 
+                                                    (clip, track, write_file, segment_signatures), link_sequence, 
                                                     PROJECT(), PLAYER())
     render_player.start()
 
@@ -978,7 +982,7 @@ def _sequence_link_update_xml_render_done_callback(data):
 
 def _do_seq_link_tline_edit(data):
     # We do GUI updates on add, so we need GLib thread.
-    clip, track, write_file = data
+    clip, track, write_file, segment_signatures = data
 
     # Container clips, create new container_data object and generate uuid for clip so it gets it own folder in.$XML_DATA/.../container_clips
     new_clip = current_sequence().create_file_producer_clip(write_file, clip.name, False, clip.ttl)
@@ -991,6 +995,7 @@ def _do_seq_link_tline_edit(data):
     new_clip.container_data.rendered_media_range_in = -1
     new_clip.container_data.rendered_media_range_out = -1
     new_clip.container_data.unrendered_length = new_clip.get_length() - 1
+    new_clip.container_data.data_slots[sequencesegments.SEGMENT_SIGNATURES] = segment_signatures
     new_clip.link_seq_data = copy.deepcopy(clip.link_seq_data)
     
     clip_index = track.clips.index(clip)
@@ -293,6 +293,12 @@ def display_kfeditors_tline_frame(frame):
     for kf_widget in keyframe_editor_widgets:
         kf_widget.display_tline_frame(frame)
 
+def kfeditors_visible():
+    for kf_widget in keyframe_editor_widgets:
+        if kf_widget.get_mapped() == True:
+            return True
+    return False
+
 def update_kfeditors_sliders(frame):
     for kf_widget in keyframe_editor_widgets:
         kf_widget.update_slider_value_display(frame)
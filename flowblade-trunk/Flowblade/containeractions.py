@@ -30,7 +30,6 @@ except:
     import mlt
 import os
 import subprocess
-import shutil
 import sys
 import threading
 import time
@@ -38,6 +37,8 @@ import time
 import appconsts
 import callbackbridge
 import ccrutils
+import containerrendercache
+import diskcacheledger
 import dialogutils
 import edit
 import editorstate
@@ -54,6 +55,7 @@ import mltprofiles
 import mltxmlheadless
 import renderconsumer
 import rendergui
+import sequencesegments
 import respaths
 import simpleeditors
 import toolsencoding
@@ -167,6 +169,7 @@ class AbstractContainerActionObject:
         self.render_type = -1 # to be set in methods below
         self.do_filters_clone = False
         self.video_file_name = None
+        self.render_cache_key = None
 
     def create_data_dirs_if_needed(self):
         session_folder = self.get_session_dir()
@@ -185,7 +188,9 @@ class AbstractContainerActionObject:
             src_dir = orig_clip_action.get_session_dir()
             dst_dir = self.get_session_dir()
             
-            shutil.copytree(src_dir, dst_dir)
+            linked_bytes = containerrendercache.link_tree(src_dir, dst_dir)
+            diskcacheledger.folder_changed(dst_dir)
+            print("Container clip clone shares", linked_bytes, "bytes of rendered media")
             
             # Fix 'rendered_media' path.
             rendered_path = None
@@ -205,6 +210,9 @@ class AbstractContainerActionObject:
         self.render_type = FULL_RENDER
         self.clip = clip
         self.launch_render_data = (clip, 0, self.container_data.unrendered_length, 0)
+        if self._use_cached_render() == True:
+            return
+
         job_proxy = self.get_launch_job_proxy()
         jobs.add_job(job_proxy)
         
@@ -214,6 +222,8 @@ class AbstractContainerActionObject:
         self.render_type = CLIP_LENGTH_RENDER
         self.clip = clip
         self.launch_render_data = (clip, clip.clip_in, clip.clip_out, clip.clip_in)
+        if self._use_cached_render() == True:
+            return
 
         job_proxy = self.get_launch_job_proxy()
         jobs.add_job(job_proxy)
@@ -230,8 +240,68 @@ class AbstractContainerActionObject:
 
     def start_render(self):
         clip, range_in, range_out, clip_start_offset = self.launch_render_data
+        if self.render_type != PREVIEW_RENDER:
+            # Session media is replaced, files shared with clones or cached renders must not be written into.
+            containerrendercache.session_render_started(self.get_session_dir())
+            render_data = self.container_data.render_data
+            if render_data != None and render_data.do_video_render == True:
+                containerrendercache.release_shared_file(self.get_rendered_video_clip_path())
+            elif render_data != None:
+                containerrendercache.release_shared_frames(self.get_rendered_media_dir())
+
         self._launch_render(clip, range_in, range_out, clip_start_offset)
 
+        if self.render_type != PREVIEW_RENDER:
+            self.render_cache_key = self._get_render_cache_key()
+
+    def _get_render_cache_key(self):
+        clip, range_in, range_out, clip_start_offset = self.launch_render_data
+        return containerrendercache.get_render_key(self.container_data, range_in, range_out, clip_start_offset,
+                                                   PROJECT().profile.description())
+
+    def _use_cached_render(self):
+        # Links existing media rendered with identical program, data, settings and range
+        # into session folder and completes render without launching it.
+        if self.container_data.render_data == None:
+            return False
+
+        render_key = self._get_render_cache_key()
+        entry = containerrendercache.get_cached_render(render_key)
+        if entry == None:
+            return False
+
+        try:
+            self.create_data_dirs_if_needed()
+            if entry.do_video_render == True:
+                media_path = self.get_rendered_video_clip_path()
+                if os.path.normpath(entry.media_path) != os.path.normpath(media_path):
+                    containerrendercache.link_file(entry.media_path, media_path)
+            else:
+                media_path = self.get_rendered_media_dir()
+                if os.path.normpath(entry.media_path) != os.path.normpath(media_path):
+                    containerrendercache.link_frames(entry.media_path, media_path)
+        except OSError as e:
+            print("Using cached container clip render failed:", e)
+            return False
+
+        self.render_cache_key = render_key
+        containerrendercache.render_skipped(entry)
+        GLib.idle_add(self.render_complete)
+        return True
+
+    def _add_render_to_cache(self):
+        if self.render_cache_key == None:
+            return
+        if self.container_data.render_data.do_video_render == True:
+            media_path = self.get_rendered_video_clip_path()
+        else:
+            media_path = self.get_rendered_media_dir()
+        containerrendercache.add_render(self.render_cache_key, media_path, 
+                                        self.container_data.render_data.do_video_render, self.get_session_dir())
+
+    def render_complete(self):
+        self.create_producer_and_do_update_edit(None)
+
     def _launch_render(self, clip, range_in, range_out, clip_start_offset):
         print("AbstractContainerActionObject._launch_render() not impl")
 
@@ -322,7 +392,7 @@ class AbstractContainerActionObject:
                 file_name = appconsts.CONTAINER_CLIP_VIDEO_CLIP_NAME
             else:
                 file_name = self.video_file_name
-            resource_path = self.get_session_dir() + "/" + appconsts.CONTAINER_CLIP_VIDEO_CLIP_NAME + self.container_data.render_data.file_extension
+            resource_path = self.get_session_dir() + "/" + file_name + self.container_data.render_data.file_extension
         else:
             resource_path = self.container_data.render_data.render_dir + "/" + self.container_data.render_data.file_name + self.container_data.render_data.file_extension
     
@@ -343,6 +413,8 @@ class AbstractContainerActionObject:
         print("AbstractContainerActionObject.abort_render not impl")
 
     def create_producer_and_do_update_edit(self, unused_data, video_file_name=None):
+        diskcacheledger.folder_changed(self.get_session_dir())
+        self._add_render_to_cache()
 
         # Using frame sequence as clip
         if  self.container_data.render_data.do_video_render == False:
@@ -491,15 +563,14 @@ class AbstractContainerActionObject:
             # we have rendered a video clip for media last. 
             old_clip_path = container_clip_action_object.get_session_dir() + "/" + appconsts.CONTAINER_CLIP_VIDEO_CLIP_NAME + container_clip.container_data.render_data.file_extension
             new_clip_path = self.get_session_dir() + "/" + appconsts.CONTAINER_CLIP_VIDEO_CLIP_NAME + container_clip.container_data.render_data.file_extension
-            shutil.copyfile(old_clip_path, new_clip_path)
+            containerrendercache.link_file(old_clip_path, new_clip_path)
             clone_clip =  current_sequence().create_file_producer_clip(new_clip_path, None, False, container_clip.ttl)
             
         else:
             # we have rendered a frame sequence clip for media last.
             old_frames_dir = container_clip_action_object.get_session_dir() + appconsts.CC_RENDERED_FRAMES_DIR
             new_frames_dir = self.get_session_dir() + appconsts.CC_RENDERED_FRAMES_DIR
-            os.rmdir(new_frames_dir)
-            shutil.copytree(old_frames_dir, new_frames_dir)
+            containerrendercache.link_frames(old_frames_dir, new_frames_dir)
         
             resource_path = self.get_rendered_frame_sequence_resource_path()
             clone_clip =  current_sequence().create_file_producer_clip(resource_path, None, False, container_clip.ttl)
@@ -789,17 +860,7 @@ class FluxityContainerActions(AbstractContainerActionObject):
             job_msg = self.get_completed_job_message()
             jobs.update_job_queue(job_msg)
             
-            if self.plugin_create_render_complete_callback == None:
-                # Completed render for timeline container clip update is handled here.
-                GLib.idle_add(self.plugin_tline_render_comlete)
-            else:
-                # Completed render for adding Generator plugin as rendered video clip is handled here. 
-                if self.container_data.render_data.do_video_render == False:
-                    resource_path = self.get_rendered_frame_sequence_resource_path()
-                else:
-                    resource_path = self.get_rendered_video_clip_path()
-
-                GLib.idle_add(self.plugin_create_render_complete_callback, resource_path, self.container_data)
+            GLib.idle_add(self.render_complete)
 
         else:
             status = fluxityheadless.get_session_status(self.parent_folder, self.get_container_program_id())
@@ -849,6 +910,20 @@ class FluxityContainerActions(AbstractContainerActionObject):
                 pass # This can happen sometimes before gmicheadless.py has written a status message, we just do nothing here.
 
 
+    def render_complete(self):
+        if self.plugin_create_render_complete_callback == None:
+            # Completed render for timeline container clip update is handled here.
+            self.plugin_tline_render_comlete()
+        else:
+            # Completed render for adding Generator plugin as rendered video clip is handled here. 
+            self._add_render_to_cache()
+            if self.container_data.render_data.do_video_render == False:
+                resource_path = self.get_rendered_frame_sequence_resource_path()
+            else:
+                resource_path = self.get_rendered_video_clip_path()
+
+            self.plugin_create_render_complete_callback(resource_path, self.container_data)
+
     def plugin_tline_render_comlete(self):
         clip = self.create_producer_and_do_update_edit(None)
         # Reopen in edit panel.
@@ -1070,6 +1145,8 @@ class SequenceLinkContainerActions(AbstractContainerActionObject):
                 self.video_file_name = appconsts.CONTAINER_CLIP_VIDEO_CLIP_NAME + str(number) 
                 number += 1
 
+        do_segment_render = self._create_segment_render_plan(range_in, range_out)
+
         job_msg = self.get_job_queue_message()
         job_msg.text = _("Render Starting...")
         job_msg.status = jobs.RENDERING
@@ -1082,6 +1159,8 @@ class SequenceLinkContainerActions(AbstractContainerActionObject):
                 "profile_desc:" + PROJECT().profile.description().replace(" ", "_"),
                 "video_file_name:" + str(self.video_file_name),
                 "xml_file_path:" + str(self.container_data.unrendered_media))
+        if do_segment_render == True:
+            args = args + ("segment_plan:" + sequencesegments.SEGMENT_RENDER_PLAN,)
 
         # Create command list and launch process.
         command_list = [sys.executable]
@@ -1093,6 +1172,31 @@ class SequenceLinkContainerActions(AbstractContainerActionObject):
         command_list_runner = ProcessCommandListRunner(command_list)
         command_list_runner.start()
 
+    def _create_segment_render_plan(self, range_in, range_out):
+        # Video renders of linked sequence are done in segments, segments with content unchanged 
+        # since they were last rendered are taken from segment store and are not rendered again.
+        render_data = self.container_data.render_data
+        if render_data.do_video_render == False or render_data.save_internally == False:
+            return False
+        if renderconsumer.ffmpeg_cli_available == False:
+            return False # Segments are concatenated using ffmpeg.
+
+        signatures = self.container_data.data_slots.get(sequencesegments.SEGMENT_SIGNATURES)
+        segments = sequencesegments.get_render_segments(signatures, range_in, range_out)
+        if segments == None:
+            return False
+
+        settings_str = str(sorted((k, str(v)) for k, v in render_data.__dict__.items())) + PROJECT().profile.description()
+        plan = sequencesegments.create_render_plan(self.get_segments_dir(), segments, settings_str, render_data.file_extension)
+        ccrutils.write_misc_session_data(self.parent_folder, self.get_container_program_id(), sequencesegments.SEGMENT_RENDER_PLAN, plan)
+        return True
+
+    def get_segments_dir(self):
+        # Session dir changes with every sequence link update that writes new 'unrendered_media',
+        # segment store is kept per container clip so that updated clips find their segments.
+        uid_str = hashlib.md5(str(self.container_data.container_clip_uid).encode('utf-8')).hexdigest()
+        return userfolders.get_container_clips_dir() + sequencesegments.SEGMENTS_DIR + uid_str
+
     def update_render_status(self):
         GLib.idle_add(self._do_update_render_status)
             
@@ -1114,6 +1218,10 @@ class SequenceLinkContainerActions(AbstractContainerActionObject):
 
                 if self.container_data.render_data.do_video_render == True:
                     msg = _("Video for Selection Clip: ") + self.clip.name 
+                    segment_status = mltxmlheadless.get_segment_status(self.parent_folder, self.get_container_program_id())
+                    if segment_status != None:
+                        segment, segments_count = segment_status
+                        msg += " - " + _("Segment") + " " + segment + " / " + segments_count
 
                 job_msg = self.get_job_queue_message()
                 job_msg.progress = float(fraction)
@@ -37,6 +37,7 @@ import guiutils
 import gtkbuilder
 import projectaction
 import respaths
+import sequencesegments
 import toolsencoding
 import updater
 import userfolders
@@ -423,8 +424,9 @@ def create_mlt_xml_media_item(xml_file_path, media_name):
 
 
 # ---------------------------------------------------------------------- SEQUENCE LINK
-def create_sequence_link_media_item(xml_file_path, media_name, linked_sequence_uid):
+def create_sequence_link_media_item(xml_file_path, media_name, linked_sequence_uid, segment_signatures=None):
     container_clip_data = ContainerClipData(appconsts.CONTAINER_CLIP_SEQUENCE_LINK, xml_file_path, xml_file_path)
+    container_clip_data.data_slots[sequencesegments.SEGMENT_SIGNATURES] = segment_signatures
     media_item = ContainerClipMediaItem(PROJECT().next_media_file_id, media_name, container_clip_data)
     PROJECT().add_sequence_link_media_object(media_item, linked_sequence_uid)
     _update_gui_for_media_object_add()
@@ -0,0 +1,267 @@
+"""
+    Flowblade Movie Editor is a nonlinear video editor.
+    Copyright 2012 Janne Liljeblad.
+
+    This file is part of Flowblade Movie Editor <https://github.com/jliljebl/flowblade/>.
+
+    Flowblade Movie Editor is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Flowblade Movie Editor is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Flowblade Movie Editor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+"""
+Module keeps a persisted index of rendered container clip media keyed by
+a hash of everything that affects render output.
+
+Render key is computed from program source, unrendered media, editor values,
+render settings, render range and profile. If media for key already exists it can
+be hardlinked into requesting clip's session folder instead of rendering it again.
+
+Cloned container clips share rendered media files using hardlinks too.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import threading
+
+import atomicfile
+import userfolders
+import utils
+
+INDEX_FILE = "container_render_cache"
+
+# Files smaller than this are copied, not hardlinked. Session folders contain small
+# flag and data files that are rewritten in place, rendered media files are always
+# removed before being written again.
+LINK_MIN_SIZE = 64 * 1024
+
+_index = None # render key -> RenderCacheEntry
+_index_lock = threading.Lock()
+
+_skipped_renders = 0
+_reclaimed_bytes = 0
+
+
+class RenderCacheEntry:
+
+    def __init__(self, media_path, do_video_render, session_dir):
+        self.media_path = media_path # video file or rendered frames folder
+        self.do_video_render = do_video_render
+        self.session_dir = session_dir
+        self.size, self.files_count = _get_media_size(media_path, do_video_render)
+
+    def media_exists(self):
+        try:
+            size, files_count = _get_media_size(self.media_path, self.do_video_render)
+        except OSError:
+            return False
+        return size == self.size and files_count == self.files_count and files_count > 0
+
+
+# ------------------------------------------------------ render key
+def get_render_key(container_data, range_in, range_out, clip_start_offset, profile_desc):
+    """
+    Returns render key or None if render is not cacheable.
+    """
+    render_data = container_data.render_data
+    if render_data == None or render_data.save_internally == False:
+        return None # External render folders are user controlled, renders there are always done.
+
+    h = hashlib.md5()
+    try:
+        _update_hash(h, str(container_data.container_type))
+        if container_data.program != None and os.path.isfile(container_data.program):
+            _update_hash_file(h, container_data.program, True)
+        if container_data.unrendered_media != None:
+            is_xml = container_data.unrendered_media.lower().endswith(".xml")
+            _update_hash_file(h, container_data.unrendered_media, is_xml)
+        _update_hash(h, json.dumps(container_data.data_slots, sort_keys=True, default=str))
+        render_settings = sorted((k, str(v)) for k, v in render_data.__dict__.items())
+        _update_hash(h, str(render_settings))
+        _update_hash(h, str((range_in, range_out, clip_start_offset)))
+        _update_hash(h, profile_desc)
+    except (OSError, TypeError, ValueError) as e:
+        print("containerrendercache.get_render_key() failed:", e)
+        return None
+
+    return h.hexdigest()
+
+def _update_hash(h, text):
+    h.update(text.encode("utf-8"))
+    h.update(b"\0")
+
+def _update_hash_file(h, file_path, hash_contents):
+    if hash_contents == True:
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(chunk)
+        h.update(b"\0")
+    else:
+        # Media files can be big, path, size and modification time identify them well enough.
+        stat = os.stat(file_path)
+        _update_hash(h, file_path + str(stat.st_size) + str(stat.st_mtime))
+
+
+# ------------------------------------------------------ index
+def _get_index():
+    global _index
+    if _index == None:
+        try:
+            _index = utils.unpickle(userfolders.get_cache_dir() + INDEX_FILE)
+        except:
+            _index = {}
+    return _index
+
+def save():
+    with _index_lock:
+        index = dict(_get_index())
+    with atomicfile.AtomicFileWriter(userfolders.get_cache_dir() + INDEX_FILE, "wb") as afw:
+        write_file = afw.get_file()
+        pickle.dump(index, write_file)
+
+def get_cached_render(render_key):
+    """
+    Returns RenderCacheEntry for key or None if no valid rendered media exists.
+    """
+    if render_key == None:
+        return None
+
+    with _index_lock:
+        entry = _get_index().get(render_key)
+        if entry == None:
+            return None
+        if entry.media_exists() == False:
+            _get_index().pop(render_key, None)
+            return None
+        return entry
+
+def add_render(render_key, media_path, do_video_render, session_dir):
+    if render_key == None:
+        return
+    try:
+        entry = RenderCacheEntry(media_path, do_video_render, session_dir)
+    except OSError:
+        return
+    with _index_lock:
+        _get_index()[render_key] = entry
+    save()
+
+def session_render_started(session_dir):
+    # Media in session folder is about to be replaced, entries pointing to it are no longer valid.
+    session_dir = os.path.normpath(session_dir)
+    with _index_lock:
+        index = _get_index()
+        for render_key in [k for k, e in index.items() if os.path.normpath(e.session_dir) == session_dir]:
+            del index[render_key]
+
+def render_skipped(entry):
+    global _skipped_renders
+    _skipped_renders += 1
+    print("Container clip render skipped, using cached render", entry.media_path)
+
+def get_stats():
+    """
+    Returns (skipped renders, bytes reclaimed by hardlinking) tuple.
+    """
+    return (_skipped_renders, _reclaimed_bytes)
+
+def print_stats():
+    print("Container clip render cache skipped renders:", _skipped_renders,
+          "reclaimed MB: %.1f" % (_reclaimed_bytes / 1000000.0))
+
+
+# ------------------------------------------------------ sharing media files
+def link_file(src_path, dst_path):
+    """
+    Hardlinks or copies file, returns number of bytes not copied.
+    """
+    if os.path.exists(dst_path):
+        os.remove(dst_path)
+
+    size = os.path.getsize(src_path)
+    if size >= LINK_MIN_SIZE:
+        try:
+            os.link(src_path, dst_path)
+            _add_reclaimed(size)
+            return size
+        except OSError:
+            pass # Different file system or no hardlink support, copy.
+
+    shutil.copyfile(src_path, dst_path)
+    return 0
+
+def link_tree(src_dir, dst_dir):
+    """
+    Replacement for shutil.copytree() that hardlinks big files.
+    Returns number of bytes not copied.
+    """
+    if not os.path.exists(dst_dir):
+        os.mkdir(dst_dir)
+
+    linked = 0
+    for name in os.listdir(src_dir):
+        src_path = os.path.join(src_dir, name)
+        dst_path = os.path.join(dst_dir, name)
+        if os.path.isdir(src_path) == True:
+            linked += link_tree(src_path, dst_path)
+        else:
+            linked += link_file(src_path, dst_path)
+    return linked
+
+def link_frames(src_dir, dst_dir):
+    # Replaces all files in 'dst_dir' with files in 'src_dir'.
+    if not os.path.exists(dst_dir):
+        os.mkdir(dst_dir)
+    for name in os.listdir(dst_dir):
+        file_path = os.path.join(dst_dir, name)
+        if os.path.isfile(file_path) == True:
+            os.remove(file_path)
+    return link_tree(src_dir, dst_dir)
+
+def release_shared_file(file_path):
+    # Renderers writing into existing file would change contents of all its hardlinks,
+    # removing shared file first makes renderer create a new file.
+    try:
+        if os.stat(file_path).st_nlink > 1:
+            os.remove(file_path)
+    except OSError:
+        pass
+
+def release_shared_frames(frames_dir):
+    # Removes frame files shared with other sessions from 'frames_dir'.
+    try:
+        names = os.listdir(frames_dir)
+    except OSError:
+        return
+    for name in names:
+        release_shared_file(os.path.join(frames_dir, name))
+
+def _add_reclaimed(size):
+    global _reclaimed_bytes
+    _reclaimed_bytes += size
+
+def _get_media_size(media_path, do_video_render):
+    # Returns (size, files count), raises OSError if media does not exist.
+    if do_video_render == True:
+        return (os.path.getsize(media_path), 1)
+
+    size = 0
+    count = 0
+    with os.scandir(media_path) as it:
+        for dir_entry in it:
+            if dir_entry.is_file(follow_symlinks=False):
+                size += dir_entry.stat(follow_symlinks=False).st_size
+                count += 1
+    return (size, count)
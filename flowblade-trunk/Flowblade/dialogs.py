@@ -921,7 +921,28 @@ def update_media_lengths_progress_dialog():
 
 def audio_sync_active_dialog():
     return _text_info_prograss_dialog(_("Comparing Audio Data..."))
-    
+
+def ardour_export_progress_dialog(cancel_callback):
+    dialog = _text_info_prograss_dialog(_("Exporting Ardour Session"))
+
+    cancel_button = Gtk.Button(label=_("Cancel"))
+    cancel_button.connect("clicked", lambda w: cancel_callback(dialog))
+    buttons_box = Gtk.HBox(False, 2)
+    buttons_box.pack_start(Gtk.Label(), True, True, 0)
+    buttons_box.pack_start(cancel_button, False, False, 0)
+    guiutils.set_margins(buttons_box, 0, 12, 12, 12)
+
+    vbox = dialog.get_child()
+    dialog.remove(vbox)
+    dialog_vbox = Gtk.VBox(False, 2)
+    dialog_vbox.pack_start(vbox, True, True, 0)
+    dialog_vbox.pack_start(buttons_box, False, False, 0)
+    dialog.add(dialog_vbox)
+    dialog.set_transient_for(gui.editor_window.window)
+    dialog.show_all()
+
+    return dialog
+
 def _text_info_prograss_dialog(title):
     dialog = Gtk.Window(Gtk.WindowType.TOPLEVEL)
     dialog.set_title(title)
@@ -0,0 +1,301 @@
+"""
+    Flowblade Movie Editor is a nonlinear video editor.
+    Copyright 2012 Janne Liljeblad.
+
+    This file is part of Flowblade Movie Editor <https://github.com/jliljebl/flowblade/>.
+
+    Flowblade Movie Editor is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Flowblade Movie Editor is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Flowblade Movie Editor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+"""
+Module keeps a persisted ledger of disk cache folder sizes.
+
+Folder sizes are computed by scanning in a background thread. Code that writes
+into cache folders reports written files with file_written() or changed folders
+with folder_changed() so that scans are only needed for folders with changes
+the ledger does not know about.
+
+Folders that have no reported changes and have not had files added or removed
+since last scan (directory mtime unchanged) are not rescanned. Changes inside
+subfolders of recursive folders do not change folder mtime, writers must report
+those.
+
+This module does not use Gtk, callbacks are called from the scanning thread.
+"""
+
+import os
+import pickle
+import threading
+import time
+
+import atomicfile
+import userfolders
+import utils
+
+LEDGER_FILE = "disk_cache_ledger"
+
+_ledger = None # folder path -> FolderEntry
+_ledger_lock = threading.Lock()
+
+
+class FolderEntry:
+
+    def __init__(self, recursive):
+        self.recursive = recursive
+        self.size = 0
+        self.files_count = 0
+        self.dir_mtime = None
+        self.scan_time = None
+        self.needs_scan = True
+
+
+# ------------------------------------------------------ ledger
+def _get_ledger():
+    global _ledger
+    if _ledger == None:
+        try:
+            _ledger = utils.unpickle(userfolders.get_cache_dir() + LEDGER_FILE)
+        except:
+            _ledger = {}
+    return _ledger
+
+def save():
+    with _ledger_lock:
+        ledger = dict(_get_ledger())
+    with atomicfile.AtomicFileWriter(userfolders.get_cache_dir() + LEDGER_FILE, "wb") as afw:
+        write_file = afw.get_file()
+        pickle.dump(ledger, write_file)
+
+def _folder_key(folder):
+    return os.path.normpath(folder)
+
+def get_folder_size(folder):
+    """
+    Returns last known size of folder in bytes or None if folder has never been scanned.
+    """
+    with _ledger_lock:
+        try:
+            entry = _get_ledger()[_folder_key(folder)]
+        except KeyError:
+            return None
+        if entry.scan_time == None:
+            return None
+        return entry.size
+
+def _find_entry(path, path_is_folder=False):
+    # Returns entry for tracked folder containing path or None.
+    ledger = _get_ledger()
+    folder = os.path.normpath(path)
+    if path_is_folder == False:
+        folder = os.path.dirname(folder)
+    while True:
+        try:
+            return ledger[folder]
+        except KeyError:
+            pass
+        parent = os.path.dirname(folder)
+        if parent == folder:
+            return None
+        folder = parent
+
+def file_written(file_path, previous_size=0):
+    """
+    Called by cache writers after writing a file. 'previous_size' is the size
+    of the file that was overwritten, if any.
+    """
+    try:
+        size = os.path.getsize(file_path)
+    except OSError:
+        return
+
+    with _ledger_lock:
+        entry = _find_entry(file_path)
+        if entry == None:
+            return
+        entry.size += size - previous_size
+        if previous_size == 0:
+            entry.files_count += 1
+        # File added into tracked folder itself changes folder mtime.
+        folder = os.path.dirname(os.path.normpath(file_path))
+        if _get_ledger().get(folder) is entry:
+            try:
+                entry.dir_mtime = os.stat(folder).st_mtime
+            except OSError:
+                pass
+
+def folder_changed(path):
+    """
+    Called by writers that create or delete data the ledger can't follow file by file,
+    containing tracked folder is rescanned on next scan.
+    """
+    with _ledger_lock:
+        entry = _find_entry(path, True)
+        if entry != None:
+            entry.needs_scan = True
+
+def get_file_size(file_path):
+    # Writers use this to get 'previous_size' before overwriting files.
+    try:
+        return os.path.getsize(file_path)
+    except OSError:
+        return 0
+
+
+# ------------------------------------------------------ scanning
+def _scan_folder(folder, recursive):
+    # Returns (size, files_count), raises OSError if folder does not exist.
+    size = 0
+    count = 0
+    with os.scandir(folder) as it:
+        for dir_entry in it:
+            try:
+                if dir_entry.is_dir(follow_symlinks=False):
+                    if recursive == True:
+                        sub_size, sub_count = _scan_folder(dir_entry.path, recursive)
+                        size += sub_size
+                        count += sub_count
+                else:
+                    size += dir_entry.stat(follow_symlinks=False).st_size
+                    count += 1
+            except OSError:
+                pass # File was removed while scanning.
+    return (size, count)
+
+def _folder_needs_scan(folder, entry):
+    if entry.needs_scan == True or entry.scan_time == None:
+        return True
+    try:
+        return os.stat(folder).st_mtime != entry.dir_mtime
+    except OSError:
+        return True
+
+
+class CacheScanThread(threading.Thread):
+    """
+    Scans folders in background.
+
+    folders is list of (folder path, recursive) tuples.
+    folder_scanned_callback(folder, size) is called after each folder, size is None
+    if folder does not exist. completed_callback(sizes) is called with dict folder -> size
+    when all folders are done.
+    """
+    def __init__(self, folders, folder_scanned_callback=None, completed_callback=None):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.folders = folders
+        self.folder_scanned_callback = folder_scanned_callback
+        self.completed_callback = completed_callback
+        self.aborted = False
+
+    def run(self):
+        sizes = {}
+        for folder, recursive in self.folders:
+            if self.aborted == True:
+                return
+
+            key = _folder_key(folder)
+            with _ledger_lock:
+                ledger = _get_ledger()
+                if key not in ledger:
+                    ledger[key] = FolderEntry(recursive)
+                entry = ledger[key]
+                if entry.recursive != recursive:
+                    entry.needs_scan = True
+                entry.recursive = recursive
+                do_scan = _folder_needs_scan(key, entry)
+                size = entry.size
+
+            if do_scan == True:
+                try:
+                    dir_mtime = os.stat(key).st_mtime
+                    size, count = _scan_folder(key, recursive)
+                except OSError:
+                    size = None
+
+                with _ledger_lock:
+                    if size == None:
+                        _get_ledger().pop(key, None)
+                    else:
+                        entry.size = size
+                        entry.files_count = count
+                        entry.dir_mtime = dir_mtime
+                        entry.scan_time = time.time()
+                        entry.needs_scan = False
+
+            sizes[folder] = size
+            if self.folder_scanned_callback != None:
+                self.folder_scanned_callback(folder, size)
+
+        save()
+
+        if self.completed_callback != None:
+            self.completed_callback(sizes)
+
+    def abort(self):
+        self.aborted = True
+
+
+# ------------------------------------------------------ pruning
+def prune_least_recently_used(folders, bytes_to_free):
+    """
+    Deletes files from folders in least recently accessed first order until
+    'bytes_to_free' bytes have been deleted or no files are left.
+
+    Only use this for folders containing data that is recreated when needed.
+    Returns number of bytes freed.
+    """
+    candidates = []
+    for folder in folders:
+        try:
+            with os.scandir(folder) as it:
+                for dir_entry in it:
+                    try:
+                        if dir_entry.is_file(follow_symlinks=False):
+                            stat = dir_entry.stat(follow_symlinks=False)
+                            candidates.append((stat.st_atime, stat.st_size, dir_entry.path))
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+
+    candidates.sort()
+
+    freed = 0
+    for atime, size, path in candidates:
+        if freed >= bytes_to_free:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        freed += size
+        with _ledger_lock:
+            entry = _find_entry(path)
+            if entry != None:
+                entry.size -= size
+                entry.files_count -= 1
+
+    for folder in folders:
+        try:
+            mtime = os.stat(folder).st_mtime
+        except OSError:
+            continue
+        with _ledger_lock:
+            entry = _get_ledger().get(_folder_key(folder))
+            if entry != None:
+                entry.dir_mtime = mtime
+
+    save()
+
+    return freed
@@ -18,13 +18,14 @@
     along with Flowblade Movie Editor.  If not, see <http://www.gnu.org/licenses/>.
 """
 
-from gi.repository import Gtk, Gdk, GLib
+from gi.repository import Gtk, GLib
 
 from os import listdir
 from os.path import isfile, join
 import os
 
 import appconsts
+import diskcacheledger
 import dialogutils
 import editorpersistance
 import gui
@@ -37,6 +38,10 @@ PROJECT_DATA_WARNING = 2
 
 _panels = None
 _legacy_disk_data_exists = True
+_scan_thread = None
+
+# Auto pruning frees disk down to this fraction of warning level.
+AUTO_PRUNE_TARGET = 0.8
 
 
 def legacy_disk_data_exists():
@@ -58,7 +63,11 @@ class DiskFolderManagementPanel:
         self.destroy_guard_check.connect("toggled", self.destroy_guard_toggled)
         
         self.size_info = Gtk.Label()
-        self.size_info.set_text(self.get_folder_size_str())
+        self.used_disk = diskcacheledger.get_folder_size(self.get_disk_folder())
+        if self.used_disk == None:
+            self.size_info.set_text(_("Calculating..."))
+        else:
+            self.size_info.set_text(self.get_size_str(self.used_disk))
 
         info = Gtk.HBox(True, 2)
         info.pack_start(guiutils.get_left_justified_box([guiutils.bold_label(info_text)]), True, True, 0)
@@ -95,31 +104,18 @@ class DiskFolderManagementPanel:
     def get_folder_contents(self, folder):
         return os.listdir(self.get_disk_folder())
         
-    def get_folder_size(self):
-        return self.get_folder_sizes_recursively(self.get_disk_folder())
-    
-    def get_folder_sizes_recursively(self, folder):
-        files = os.listdir(folder)
-        size = 0
-        for f in files:
-            if os.path.isdir(folder + "/" + f) and self.recursive == True:
-                size += self.get_folder_sizes_recursively(folder + "/" + f)
-            else:
-                size += os.path.getsize(folder +"/" + f)
-        return size
+    def get_scan_data(self):
+        return (self.get_disk_folder(), self.recursive)
 
-    def get_folder_size_str(self):
-        size = self.get_folder_size()
+    def set_scanned_size(self, size):
+        if size == None:
+            return
         self.used_disk = size
-        return self.get_size_str(size)
+        self.size_info.set_text(self.get_size_str(size))
+        self.size_info.queue_draw()
 
     def get_size_str(self, size):
-        if size > 1000000:
-            return str(int((size + 500000) / 1000000)) + _(" MB")
-        elif size > 1000:
-            return str(int((size + 500) / 1000)) + _(" kB")
-        else:
-            return str(int(size)) + " B"
+        return _get_size_str(size)
 
     def destroy_pressed(self, widget):
         self.destroy_data()
@@ -133,6 +129,7 @@ class DiskFolderManagementPanel:
     def destroy_data(self):
         print("deleting", self.folder)
         self.destroy_recursively(self.get_disk_folder())
+        diskcacheledger.folder_changed(self.get_disk_folder())
 
     def destroy_recursively(self, folder):
         files = os.listdir(folder)
@@ -148,8 +145,7 @@ class DiskFolderManagementPanel:
         GLib.idle_add(self._update_view)
 
     def _update_view(self):
-        self.size_info.set_text(self.get_folder_size_str())
-        self.size_info.queue_draw()
+        _launch_scan([self])
 
 def show_disk_management_dialog():
     dialog = Gtk.Dialog(_("Disk Cache Manager"), None,
@@ -172,50 +168,92 @@ def show_disk_management_dialog():
 
     guiutils.set_margins(pane, 12, 24, 12, 12)
 
-    dialog.connect('response', dialogutils.dialog_destroy)
+    dialog.connect('response', _dialog_response)
     
     dialog.vbox.pack_start(pane, True, True, 0)
     dialogutils.set_outer_margins(dialog.vbox)
     dialogutils.default_behaviour(dialog)
     dialog.show_all()
+
+    _launch_scan(_panels)
+
     return dialog
 
+def _dialog_response(dialog, response_id):
+    if _scan_thread != None:
+        _scan_thread.abort()
+    dialogutils.dialog_destroy(dialog, response_id)
+
+def _launch_scan(panels):
+    # Folder sizes are computed in background thread and labels updated as folders complete. 
+    global _scan_thread
+    panels_for_folders = {panel.get_disk_folder():panel for panel in panels}
+    scan_data = [panel.get_scan_data() for panel in panels]
+    _scan_thread = diskcacheledger.CacheScanThread(scan_data,
+                                                   lambda folder, size: GLib.idle_add(_folder_scanned, panels_for_folders[folder], size))
+    _scan_thread.start()
+
+def _folder_scanned(panel, size):
+    panel.set_scanned_size(size)
+
 def check_disk_cache_size():
     check_level = editorpersistance.prefs.disk_space_warning
     # check levels [off, 500 MB,1 GB, 2 GB], see preferenceswindow.py
     if check_level == 0:
         return
 
-    Gdk.threads_add_timeout(GLib.PRIORITY_HIGH_IDLE, 10, _check_cache_size)
+    # Sizes are computed and cache is pruned in a background thread, warning is shown in GUI thread.
+    scan_thread = diskcacheledger.CacheScanThread(_get_disk_dirs_scan_data(), 
+                                                  None,
+                                                  _cache_scan_completed)
+    scan_thread.start()
+
+def _cache_scan_completed(sizes):
+    # Called from scan thread, pruning deletes files and is done here to not block GUI.
+    # Missing folders mean that no legacy data for layout prior to 2.12 exists.
+    if None in sizes.values():
+        GLib.idle_add(_legacy_disk_data_missing)
+        return
 
-def _check_cache_size():
-    try:
-        # We are running this check in GUI thread, but this should be fast enough to not block app GUI noticeably.
-        check_level = editorpersistance.prefs.disk_space_warning
-        
-        # Get disk cache size
-        panels = _get_disk_dir_panels()
-        used_disk_cache_size = 0
-        for panel in panels:
-            used_disk_cache_size += panel.used_disk
-        
-        size_str = panels[0].get_size_str(used_disk_cache_size)
-
-        # check levels [off, 500 MB,1 GB, 2 GB], see preferenceswindow.py
-        if check_level == 1 and used_disk_cache_size > 1000000 * 500:
-            _show_warning(size_str)
-        elif check_level == 2 and used_disk_cache_size > 1000000 * 1000:
-            _show_warning(size_str)
-        elif check_level == 3 and used_disk_cache_size > 1000000 * 2000:
-            _show_warning(size_str)
-    except Exception as e:
-        #print(str(e))
-        # No legacy data for layout prior to 2.12 exists.
-        global _legacy_disk_data_exists
-        _legacy_disk_data_exists = False
+    # check levels [off, 500 MB,1 GB, 2 GB], see preferenceswindow.py
+    check_level = editorpersistance.prefs.disk_space_warning
+    if check_level == 1:
+        warning_size = 1000000 * 500
+    elif check_level == 2:
+        warning_size = 1000000 * 1000
+    elif check_level == 3:
+        warning_size = 1000000 * 2000
+    else:
+        return
+
+    used_disk_cache_size = sum(sizes.values())
+    if used_disk_cache_size <= warning_size:
+        return
+
+    if editorpersistance.prefs.disk_cache_auto_prune == True:
+        bytes_to_free = used_disk_cache_size - int(warning_size * AUTO_PRUNE_TARGET)
+        folders = [folder for folder, recursive in _get_disk_dirs_scan_data(RECREATE_WARNING)]
+        freed = diskcacheledger.prune_least_recently_used(folders, bytes_to_free)
+        print("Disk cache auto prune freed", freed, "bytes")
+        used_disk_cache_size -= freed
+        if used_disk_cache_size <= warning_size:
+            return
+
+    GLib.idle_add(_show_warning, _get_size_str(used_disk_cache_size))
 
+def _legacy_disk_data_missing():
+    global _legacy_disk_data_exists
+    _legacy_disk_data_exists = False
     return False
 
+def _get_size_str(size):
+    if size > 1000000:
+        return str(int((size + 500000) / 1000000)) + _(" MB")
+    elif size > 1000:
+        return str(int((size + 500) / 1000)) + _(" kB")
+    else:
+        return str(int(size)) + " B"
+
 def _show_warning(size_str):
     primary_txt = _("Disk Cache Size Exceeds Current Warning Level!")
     secondary_txt = _("Flowblade currently uses ") + size_str + _(" of disk space.") + "\n\n" + \
@@ -223,16 +261,31 @@ def _show_warning(size_str):
                     _("change warning level in <b>Edit->Preferences 'General Options'</b> panel.") 
     dialogutils.warning_message(primary_txt, secondary_txt, gui.editor_window.window, is_info=False)
 
-def _get_disk_dir_panels():
-    panels = []
-    panels.append(DiskFolderManagementPanel(userfolders.get_cache_dir(), appconsts.AUDIO_LEVELS_DIR, _("Audio Levels Data"), RECREATE_WARNING))
+def _get_disk_dirs():
+    # (xdg_folder, folder, info_text, warning_level, recursive)
+    disk_dirs = []
+    disk_dirs.append((userfolders.get_cache_dir(), appconsts.AUDIO_LEVELS_DIR, _("Audio Levels Data"), RECREATE_WARNING, False))
     # This is too small amount of data to make deletable.
-    #panels.append(DiskFolderManagementPanel(userfolders.get_cache_dir(), appconsts.GMIC_DIR, _("G'Mic Tool Session Data"), NO_WARNING))
-    panels.append(DiskFolderManagementPanel(userfolders.get_data_dir(), appconsts.RENDERED_CLIPS_DIR, _("Rendered Files"), PROJECT_DATA_WARNING))
-    panels.append(DiskFolderManagementPanel(userfolders.get_render_dir(True), "/" + appconsts.PROXIES_DIR, _("Proxy Files"), PROJECT_DATA_WARNING))
-    panels.append(DiskFolderManagementPanel(userfolders.get_data_dir(), appconsts.CONTAINER_CLIPS_DIR, _("Container Clips"), PROJECT_DATA_WARNING, True))
-    panels.append(DiskFolderManagementPanel(userfolders.get_cache_dir(), appconsts.THUMBNAILS_DIR, _("Thumbnails"), RECREATE_WARNING))
+    #disk_dirs.append((userfolders.get_cache_dir(), appconsts.GMIC_DIR, _("G'Mic Tool Session Data"), NO_WARNING, False))
+    disk_dirs.append((userfolders.get_data_dir(), appconsts.RENDERED_CLIPS_DIR, _("Rendered Files"), PROJECT_DATA_WARNING, False))
+    disk_dirs.append((userfolders.get_render_dir(True), "/" + appconsts.PROXIES_DIR, _("Proxy Files"), PROJECT_DATA_WARNING, False))
+    disk_dirs.append((userfolders.get_data_dir(), appconsts.CONTAINER_CLIPS_DIR, _("Container Clips"), PROJECT_DATA_WARNING, True))
+    disk_dirs.append((userfolders.get_cache_dir(), appconsts.THUMBNAILS_DIR, _("Thumbnails"), RECREATE_WARNING, False))
     # This is too small amount of data to make deletable.
-    #panels.append(DiskFolderManagementPanel(userfolders.get_data_dir(), appconsts.USER_PROFILES_DIR_NO_SLASH, _("User Created Custom Profiles"), PROJECT_DATA_WARNING))
+    #disk_dirs.append((userfolders.get_data_dir(), appconsts.USER_PROFILES_DIR_NO_SLASH, _("User Created Custom Profiles"), PROJECT_DATA_WARNING, False))
+
+    return disk_dirs
+
+def _get_disk_dirs_scan_data(warning_level=None):
+    scan_data = []
+    for xdg_folder, folder, info_text, dir_warning_level, recursive in _get_disk_dirs():
+        if warning_level == None or warning_level == dir_warning_level:
+            scan_data.append((xdg_folder + folder, recursive))
+    return scan_data
+
+def _get_disk_dir_panels():
+    panels = []
+    for xdg_folder, folder, info_text, warning_level, recursive in _get_disk_dirs():
+        panels.append(DiskFolderManagementPanel(xdg_folder, folder, info_text, warning_level, recursive))
 
     return panels
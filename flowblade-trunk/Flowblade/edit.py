@@ -26,12 +26,14 @@ Edits, undos and redos are done by creating and calling methods on these
 EditAction objects and placing them on the undo/redo stack.
 """
 import copy
+import time
 
 import appconsts
 import clipeffectseditor
 import compositeeditor
 import containeractions
 import containerclip
+import framecache
 from editorstate import current_sequence
 from editorstate import get_track
 from editorstate import PLAYER
@@ -53,6 +55,13 @@ do_gui_update = False
 # Flag for doing edits since last save
 edit_done_since_last_save = False
 
+# Track -> [first, last] clip index range changed by atomic edit ops since last reset.
+# Post-edit blank consolidation and trailing blank removal are only done on these ranges.
+_touched_regions = {}
+
+# Debug flag, when set every edit is checked against a full normalization pass and timed.
+verify_post_edit_normalization = False
+
 
 # ---------------------------------- atomic edit ops
 def append_clip(track, clip, clip_in, clip_out):
@@ -64,6 +73,9 @@ def append_clip(track, clip, clip_in, clip_out):
     track.clips.append(clip) # py
     track.append(clip, clip_in, clip_out) # mlt
     resync.clip_added_to_timeline(clip, track)
+    _track_insert_done(track, len(track.clips) - 1)
+    if clip.link_seq_data != None:
+        undo.seq_link_track_changed(track)
 
 def _insert_clip(track, clip, index, clip_in, clip_out):
     """
@@ -74,6 +86,9 @@ def _insert_clip(track, clip, index, clip_in, clip_out):
     track.clips.insert(index, clip) # py
     track.insert(clip, index, clip_in, clip_out) # mlt
     resync.clip_added_to_timeline(clip, track)
+    _track_insert_done(track, index)
+    if clip.link_seq_data != None:
+        undo.seq_link_track_changed(track)
 
 def _insert_blank(track, index, length):
     track.insert_blank(index, length - 1) # end inclusive
@@ -83,6 +98,8 @@ def _insert_blank(track, index, length):
     blank_clip.clip_out = length - 1 # -1, end inclusive
     blank_clip.is_blanck_clip = True
     track.clips.insert(index, blank_clip)
+    resync.track_changed(track)
+    _track_insert_done(track, index)
     
 def _remove_clip(track, index):
     """
@@ -91,6 +108,10 @@ def _remove_clip(track, index):
     track.remove(index)
     clip = track.clips.pop(index)
     resync.clip_removed_from_timeline(clip)
+    resync.track_changed(track)
+    _track_remove_done(track, index)
+    if clip.link_seq_data != None:
+        undo.seq_link_track_changed(track)
     
     return clip
 
@@ -130,8 +151,57 @@ def _add_blank_to_py(track, index, length):
     blank_clip.clip_out = length - 1 # -1, end inclusive
     blank_clip.is_blanck_clip = True
     track.clips.insert(index, blank_clip)
+    resync.track_changed(track)
+    _track_insert_done(track, index)
     return blank_clip
 
+# -------------------------------- touched regions
+def _track_insert_done(track, index):
+    framecache.sequence_changed()
+    # Range is kept as a superset of changed indexes in current index space.
+    try:
+        region = _touched_regions[track]
+    except KeyError:
+        _touched_regions[track] = [index, index]
+        return
+    if index <= region[1]:
+        region[1] += 1
+    region[0] = min(region[0], index)
+    region[1] = max(region[1], index)
+
+def _track_remove_done(track, index):
+    framecache.sequence_changed()
+    # Clips at index - 1 and index are now neighbours and need to be checked.
+    try:
+        region = _touched_regions[track]
+    except KeyError:
+        _touched_regions[track] = [index, index]
+        return
+    if index <= region[1]:
+        region[1] -= 1
+    region[0] = min(region[0], index)
+    region[1] = max(region[1], index - 1, region[0])
+
+def _reset_touched_regions():
+    global _touched_regions
+    _touched_regions = {}
+
+def _take_touched_regions():
+    # Returns list of (track, first, last) for edit tracks and resets regions.
+    global _touched_regions
+    regions = _touched_regions
+    _touched_regions = {}
+    seq = current_sequence()
+    touched = []
+    for i in range(1, len(seq.tracks) - 1): # -1 because hidden track, 1 because black track
+        track = seq.tracks[i]
+        try:
+            first, last = regions[track]
+        except KeyError:
+            continue
+        touched.append((track, first, last))
+    return touched
+
 # --------------------------------- util methods
 def _set_in_out(clip, c_in, c_out):
     """
@@ -161,6 +231,21 @@ def _remove_trailing_blanks_undo(self):
 def _remove_trailing_blanks_redo(self):
     _remove_all_trailing_blanks(self)
 
+def _remove_touched_trailing_blanks(self, touched):
+    # Same as _remove_all_trailing_blanks() but only for tracks changed by edit.
+    if self != None:
+        self.trailing_blanks = []
+    for track, first, last in touched:
+        if len(track.clips) == 0:
+            continue
+        last_clip_index = track.count() - 1
+        clip = track.clips[last_clip_index]
+        if clip.is_blanck_clip:
+            length = clip.clip_length()
+            _remove_clip(track, last_clip_index)
+            if self != None:
+                self.trailing_blanks.append((current_sequence().tracks.index(track), length))
+
 def _remove_all_trailing_blanks(self=None):
     if self != None:
         self.trailing_blanks = []
@@ -369,15 +454,22 @@ class EditAction:
         PLAYER().stop_playback()
 
         movemodes.clear_selected_clips()  # selection not valid after change in sequence
+        start_time = time.monotonic()
+        _reset_touched_regions()
+        framecache.sequence_changed()
+
         _remove_trailing_blanks_undo(self)
         _consolidate_all_blanks_undo(self)
     
         self.undo_func(self)
 
-        _remove_all_trailing_blanks(None)
+        _remove_touched_trailing_blanks(None, _take_touched_regions())
 
         resync.calculate_and_set_child_clip_sync_states()
-        
+
+        if verify_post_edit_normalization == True:
+            _verify_post_edit_normalization(self, "undo", start_time)
+
         if do_gui_update:
             self._update_gui()
             
@@ -385,14 +477,22 @@ class EditAction:
         PLAYER().stop_playback()
 
         movemodes.clear_selected_clips() # selection is not valid after a change in sequence
+        start_time = time.monotonic()
+        _reset_touched_regions()
+        framecache.sequence_changed()
 
         self.redo_func(self)
 
-        _consolidate_all_blanks_redo(self)
-        _remove_trailing_blanks_redo(self)
+        # Only tracks and index ranges changed by redo_func need to be normalized.
+        touched = _take_touched_regions()
+        _consolidate_touched_blanks_redo(self, touched)
+        _remove_touched_trailing_blanks(self, touched)
 
         resync.calculate_and_set_child_clip_sync_states()
-                
+
+        if verify_post_edit_normalization == True:
+            _verify_post_edit_normalization(self, "redo", start_time)
+
         # Update GUI.
         if do_gui_update:
             self._update_gui()
@@ -515,54 +615,34 @@ class ConsolidatedEditAction:
 
 # ---------------------------------------------------- compositor sync methods
 def get_full_compositor_sync_data():
-    # Returns list of tuples in form (compositor, orig_in, orig_out, clip_start, clip_end)
-    # Pair all compositors with their origin clips ids
-    comp_clip_pairings = {}
-    for compositor in current_sequence().compositors:
-        if compositor.origin_clip_id in comp_clip_pairings:
-            comp_clip_pairings[compositor.origin_clip_id].append(compositor)
-        else:
-            comp_clip_pairings[compositor.origin_clip_id] = [compositor]
-    
-    # Create resync list
-    resync_list = []
-    orphan_origin_clip_ids = list(comp_clip_pairings.keys())
-    for i in range(current_sequence().first_video_index, len(current_sequence().tracks) - 1): # -1, there is a topmost hidden track 
-        track = current_sequence().tracks[i] # b_track is source track where origin clip is
-        for j in range(0, len(track.clips)):
-            clip = track.clips[j]
+    # Returns list of tuples in form (destroy_id, orig_in, orig_out, clip_start, clip_end, clip_track, compositor_track)
+    # Compositors are paired with their origin clips using sequence origin clip index and 
+    # clip start positions are summed from clip lengths while iterating tracks.
+    seq = current_sequence()
+    comp_clip_pairings = seq.origin_clip_compositors
+
+    full_sync_data = []
+    orphan_origin_clip_ids = set(comp_clip_pairings.keys())
+    for i in range(seq.first_video_index, len(seq.tracks) - 1): # -1, there is a topmost hidden track 
+        track = seq.tracks[i] # b_track is source track where origin clip is
+        clip_start = 0
+        for clip in track.clips:
+            clip_length = clip.clip_out - clip.clip_in + 1
             if clip.id in comp_clip_pairings:
-                compositor_list = comp_clip_pairings[clip.id]
-                for compositor in compositor_list:
-                    resync_list.append((clip, track, j, compositor))
-            if clip.id in orphan_origin_clip_ids:
-                orphan_origin_clip_ids.remove(clip.id)
+                clip_end = clip_start + clip_length - 1
+                for compositor in comp_clip_pairings[clip.id]:
+                    full_sync_data_item = (compositor.destroy_id, compositor.clip_in, compositor.clip_out, 
+                                           clip_start, clip_end, track.id, compositor.transition.b_track)
+                    full_sync_data.append(full_sync_data_item)
+                orphan_origin_clip_ids.discard(clip.id)
+            clip_start += clip_length
     
     # Create orphan compositors list
     orhan_compositors = []
-    if current_sequence().compositing_mode == appconsts.COMPOSITING_MODE_STANDARD_AUTO_FOLLOW:
+    if seq.compositing_mode == appconsts.COMPOSITING_MODE_STANDARD_AUTO_FOLLOW:
         for oprhan_comp_origin in orphan_origin_clip_ids:
             orhan_compositors.append(comp_clip_pairings[oprhan_comp_origin][0])
 
-    # Create full data
-    full_sync_data = []
-    for resync_item in resync_list:
-        try:
-            clip, track, clip_index, compositor = resync_item
-            clip_start = track.clip_start(clip_index)
-            clip_end = clip_start + clip.clip_out - clip.clip_in
-            
-            orig_in = compositor.clip_in
-            orig_out = compositor.clip_out
-            
-            destroy_id = compositor.destroy_id
-            
-            full_sync_data_item = (destroy_id, orig_in, orig_out, clip_start, clip_end, track.id, compositor.transition.b_track)
-            full_sync_data.append(full_sync_data_item)
-        except:
-            # Clip is probably deleted
-            pass
-
     return (full_sync_data, orhan_compositors)
 
 
@@ -2006,6 +2086,58 @@ def _add_filter_multi_redo(self):
     
     self.filter_edit_done_func(self.clips) # updates effect stack gui
 
+#------------------- SET CLIPS VOLUME
+# "clips","levels","filter_info","filter_edit_done_func"
+# Sets level of first non-keyframed Volume filter of clips, clips without one get a new Volume filter.
+def set_clips_volume_action(data):
+    action = EditAction(_set_clips_volume_undo, _set_clips_volume_redo, data)
+    return action
+
+def _set_clips_volume_undo(self):
+    for clip, filter_object, old_level in self.volume_states:
+        if old_level == None:
+            clip.detach(filter_object.mlt_filter)
+            clip.filters.remove(filter_object)
+        else:
+            _set_volume_level(filter_object, old_level)
+
+    self.filter_edit_done_func(self.clips) # updates effect stack gui
+
+def _set_clips_volume_redo(self):
+    if not hasattr(self, "volume_states"): # First do
+        self.volume_states = []
+        for clip in self.clips:
+            filter_object, old_level = _get_static_volume_filter(clip)
+            if filter_object == None:
+                filter_object = current_sequence().create_filter(self.filter_info)
+                filter_object.replace_values(clip)
+            self.volume_states.append((clip, filter_object, old_level))
+
+    for i in range(0, len(self.clips)):
+        clip, filter_object, old_level = self.volume_states[i]
+        if old_level == None:
+            clip.attach(filter_object.mlt_filter)
+            clip.filters.append(filter_object)
+        _set_volume_level(filter_object, self.levels[i])
+
+    self.filter_edit_done_func(self.clips) # updates effect stack gui
+
+def _get_static_volume_filter(clip):
+    for filter_object in clip.filters:
+        if filter_object.info.mlt_service_id != "volume":
+            continue
+        for name, value, prop_type in filter_object.properties:
+            if name == "level" and ";" not in value:
+                return (filter_object, value)
+    return (None, None)
+
+def _set_volume_level(filter_object, level):
+    for i in range(0, len(filter_object.properties)):
+        name, value, prop_type = filter_object.properties[i]
+        if name == "level":
+            filter_object.properties[i] = (name, level, prop_type)
+    filter_object.mlt_filter.set("level", str(level))
+
 #------------------- ADD TWO FILTERS
 # NOTE: Using this requires that index_2 > index_1
 # "clip","filter_info_1",filter_info_2","index_1","index_2","filter_edit_done_func"
@@ -3057,6 +3189,81 @@ def _consolidate_all_blanks_redo(self):
                 self.consolidate_actions.append((track, i, removed_lengths))
                 break
 
+def _consolidate_touched_blanks_redo(self, touched):
+    # Same as _consolidate_all_blanks_redo() but only looks at touched ranges 
+    # and their neighbours, and only records actions for actually merged blanks.
+    # _consolidate_all_blanks_undo() undoes both.
+    self.consolidate_actions = []
+    for track, first, last in touched:
+        i = max(first - 1, 0)
+        end = min(last + 1, len(track.clips) - 1)
+        while i < end:
+            if track.clips[i].is_blanck_clip and track.clips[i + 1].is_blanck_clip:
+                removed_lengths = _remove_consecutive_blanks(track, i)
+                total_length = 0
+                for length in removed_lengths:
+                    total_length = total_length + length
+                _insert_blank(track, i, total_length)
+                self.consolidate_actions.append((track, i, removed_lengths))
+                end = end - (len(removed_lengths) - 1)
+            i += 1
+
+def _verify_post_edit_normalization(self, edit_op, start_time):
+    # Debug check that compares touched region normalization result to full
+    # blanks consolidation, trailing blanks removal and resync pass done on copies.
+    elapsed = time.monotonic() - start_time
+    _reset_touched_regions()
+    seq = current_sequence()
+    for i in range(1, len(seq.tracks) - 1): # -1 because hidden track, 1 because black track
+        track = seq.tracks[i]
+        clip_list = _get_clip_list_copy(track)
+        full_pass_clip_list = _get_fully_normalized_clip_list(clip_list)
+        if clip_list != full_pass_clip_list:
+            print("post edit normalization: track", i, "differs from full pass", self.redo_func.__name__)
+            print("    touched regions result:", _clip_list_str(clip_list))
+            print("    full pass result:      ", _clip_list_str(full_pass_clip_list))
+
+    full_sync_states = resync.get_full_child_clip_sync_states()
+    for child_clip, (sync_state, sync_diff) in full_sync_states.items():
+        if child_clip.sync_data.sync_state != sync_state or \
+            (sync_diff != None and getattr(child_clip, "sync_diff", None) != sync_diff):
+            print("post edit normalization: sync state of clip", child_clip.id, "differs from full pass", self.redo_func.__name__)
+    if set(resync.sync_children.keys()) != set(full_sync_states.keys()):
+        print("post edit normalization: sync children differ from full pass", self.redo_func.__name__)
+
+    print(edit_op, self.redo_func.__name__, "%.2f ms" % (elapsed * 1000.0))
+
+def _get_clip_list_copy(track):
+    # Returns list of (clip or None for blank, length) tuples.
+    clip_list = []
+    for clip in track.clips:
+        if clip.is_blanck_clip:
+            clip_list.append((None, _clip_length(clip)))
+        else:
+            clip_list.append((clip, _clip_length(clip)))
+    return clip_list
+
+def _get_fully_normalized_clip_list(clip_list):
+    # Does same as _consolidate_all_blanks_redo() and _remove_all_trailing_blanks() on clip list copy.
+    normalized = []
+    for clip, length in clip_list:
+        if clip == None and len(normalized) > 0 and normalized[-1][0] == None:
+            normalized[-1] = (None, normalized[-1][1] + length)
+        else:
+            normalized.append((clip, length))
+    if len(normalized) > 0 and normalized[-1][0] == None:
+        normalized.pop()
+    return normalized
+
+def _clip_list_str(clip_list):
+    items = []
+    for clip, length in clip_list:
+        if clip == None:
+            items.append("blank:" + str(length))
+        else:
+            items.append(str(clip.id) + ":" + str(length))
+    return " ".join(items)
+
 #----------------- RANGE OVERWRITE 
 # "track","clip","clip_in","clip_out","mark_in_frame","mark_out_frame"
 def range_overwrite_action(data):
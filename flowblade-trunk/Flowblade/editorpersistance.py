@@ -185,7 +185,7 @@ def update_prefs_from_widgets(widgets_tuples_tuple):
     gen_opts_widgets, edit_prefs_widgets, playback_prefs_widgets, view_prefs_widgets, performance_widgets, jog_shuttle_widgets = widgets_tuples_tuple
     
     default_profile_combo, open_in_last_opened_check, open_in_last_rendered_check, undo_max_spin, load_order_combo, \
-    autosave_combo, render_folder_select, disk_cache_warning_combo = gen_opts_widgets
+    autosave_combo, render_folder_select, disk_cache_warning_combo, disk_cache_auto_prune_check = gen_opts_widgets
 
     gfx_length_spin, cover_delete, mouse_scroll_action, hide_file_ext_button, \
     hor_scroll_dir, effects_editor_clip_load, auto_render_plugins, dnd_action = edit_prefs_widgets
@@ -196,7 +196,7 @@ def update_prefs_from_widgets(widgets_tuples_tuple):
     force_language_combo, window_mode_combo, full_names, tracks_combo, project_panel_width_spin, \
     edit_panel_width_spin, media_panel_width_spin, layout_monitor, filter_select_width_spin = view_prefs_widgets
 
-    perf_render_threads, perf_drop_frames = performance_widgets
+    perf_render_threads, perf_drop_frames, idle_proxy_budget_combo, smart_render_check = performance_widgets
 
     usbhid_enabled_check, usbhid_config_combo = jog_shuttle_widgets
 
@@ -225,6 +225,8 @@ def update_prefs_from_widgets(widgets_tuples_tuple):
     prefs.global_layout = window_mode_combo.get_active() + 1 # +1 'cause values are 1 and 2
     prefs.perf_render_threads = int(perf_render_threads.get_adjustment().get_value())
     prefs.perf_drop_frames = perf_drop_frames.get_active()
+    prefs.idle_proxy_disk_budget = idle_proxy_budget_combo.get_active()
+    prefs.smart_render = smart_render_check.get_active()
     prefs.show_full_file_names = full_names.get_active()
     prefs.center_on_arrow_move = auto_center_on_updown.get_active()
     prefs.tracks_scale = tracks_combo.get_active()
@@ -234,6 +236,7 @@ def update_prefs_from_widgets(widgets_tuples_tuple):
     if len(render_folder_select.get_filenames()) != 0:
         prefs.default_render_directory = render_folder_select.get_filename()
     prefs.disk_space_warning = disk_cache_warning_combo.get_active()
+    prefs.disk_cache_auto_prune = disk_cache_auto_prune_check.get_active()
     prefs.auto_render_media_plugins = auto_render_plugins.get_active()
     # --------------------------------- USB HID
     prefs.usbhid_enabled = usbhid_enabled_check.get_active()
@@ -387,3 +390,6 @@ class EditorPreferences:
         self.show_sync = True
         self.wide_multitrim_slip = False
         self.disable_drag_when_selected = True
+        self.disk_cache_auto_prune = False # Delete least recently used recreatable cache data when disk cache exceeds warning level.
+        self.idle_proxy_disk_budget = 0 # Index into proxyscheduler.DISK_BUDGETS, 0 disables idle time proxy creation.
+        self.smart_render = False # Copy unchanged source media segments to render output without re-encoding.
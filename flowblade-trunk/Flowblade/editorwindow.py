@@ -50,6 +50,7 @@ import guiutils
 import gtkbuilder
 import jobs
 import keyevents
+import loudnessanalysis
 import medialinker
 import medialog
 import mediaplugin
@@ -827,6 +828,8 @@ class EditorWindow:
             ('DeleteAudioTrack', None, _('Delete Audio Track'), None, None, lambda a:projectaction.delete_audio_track()),
             ('ChangeSequenceTracks', None, _('Change Sequence Tracks Count...'), None, None, lambda a:projectaction.change_sequence_track_count()),
             ('Watermark', None, _('Watermark...'), None, None, lambda a:menuactions.edit_watermark()),
+            ('AnalyzeLoudness', None, _('Analyze Loudness'), None, None, lambda a:loudnessanalysis.analyze_sequence_loudness()),
+            ('NormalizeClipsLoudness', None, _('Normalize Clips Loudness'), None, None, lambda a:loudnessanalysis.normalize_clips_loudness()),
             ('ProfilesManager', None, _('Profiles Manager'), None, None, lambda a:menuactions.profiles_manager()),
             ('Preferences', None, _('Preferences'), None, None, lambda a:preferenceswindow.preferences_dialog()),
             ('ViewMenu', None, _('View')),
@@ -1005,6 +1008,9 @@ class EditorWindow:
                     <separator/>
                     <menuitem action='ChangeSequenceTracks'/>
                     <separator/>
+                    <menuitem action='AnalyzeLoudness'/>
+                    <menuitem action='NormalizeClipsLoudness'/>
+                    <separator/>
                     <menuitem action='Watermark'/>
                 </menu>
                 <menu action='RenderMenu'>
@@ -18,7 +18,7 @@
     along with Flowblade Movie Editor.  If not, see <http://www.gnu.org/licenses/>.
 """
 
-from gi.repository import Gtk
+from gi.repository import Gtk, GLib
 import os
 from xml.dom import minidom
 from math import floor
@@ -57,6 +57,7 @@ _img_types = ["png", "bmp", "targa","tiff"]
 _img_extensions = ["png", "bmp", "tga","tif"]
 
 _ardour_export_sample_rate = exportardour.DEFAULT_SAMPLE_RATE
+_ardour_progress_dialog = None
 
 ####---------------MLT--------------####    
 def MELT_XML_export():
@@ -568,10 +569,49 @@ def _ardour_xml_render_done(data):
     temp_xml = _xml_render_player.file_name
     
     _xml_render_player = None
-    
+
+    # We're in render thread, transcode here too and update GUI with idle calls.
+    GLib.idle_add(_show_ardour_export_progress_dialog)
+
     exportardour.use_existing_basedir = True
-    exportardour.launch_export_ardour_session_from_flowblade(temp_xml,
-                                                             adour_session_folder,
-                                                             sample_rate=_ardour_export_sample_rate)
+    try:
+        exportardour.launch_export_ardour_session_from_flowblade(temp_xml,
+                                                                 adour_session_folder,
+                                                                 sample_rate=_ardour_export_sample_rate,
+                                                                 progress_callback=_ardour_transcode_progress)
+    except Exception as e:
+        print("Ardour export failed: " + str(e))
+        GLib.idle_add(_ardour_export_done, False)
+        return
 
     print ("Ardour export done.")
+    GLib.idle_add(_ardour_export_done, True)
+
+def _show_ardour_export_progress_dialog():
+    global _ardour_progress_dialog
+    _ardour_progress_dialog = dialogs.ardour_export_progress_dialog(_ardour_export_cancel)
+    _ardour_progress_dialog.info.set_text(_("Transcoding media..."))
+
+def _ardour_export_cancel(dialog):
+    exportardour.cancel_media_pool_transcode()
+    dialog.info.set_text(_("Cancelling..."))
+
+def _ardour_transcode_progress(completed_count, total_count, media):
+    GLib.idle_add(_update_ardour_export_progress, completed_count, total_count, media.source_media)
+
+def _update_ardour_export_progress(completed_count, total_count, source_media):
+    if _ardour_progress_dialog == None:
+        return
+    _ardour_progress_dialog.progress_bar.set_fraction(float(completed_count) / float(total_count))
+    _ardour_progress_dialog.info.set_text(os.path.basename(source_media) + " " + str(completed_count) + "/" + str(total_count))
+
+def _ardour_export_done(success):
+    global _ardour_progress_dialog
+    if _ardour_progress_dialog != None:
+        _ardour_progress_dialog.destroy()
+        _ardour_progress_dialog = None
+
+    if success == False:
+        primary_txt = _("Ardour Session export was not completed")
+        secondary_txt = _("Export was cancelled or media transcoding failed.")
+        dialogutils.info_message(primary_txt, secondary_txt, gui.editor_window.window)
@@ -31,6 +31,7 @@ import webbrowser
 
 from gi.repository import Gtk
 
+import analysiscache
 import appconsts
 import cairo
 import cairoarea
@@ -1207,21 +1208,35 @@ class AnalyzeStabilizeFilterEditor:
     def analyze_button_clicked(self, button):
         session_id = utils.create_render_session_uid()
         profile_desc = PROJECT().profile_desc.replace(" ", "_")
-        clip_path = self.editable_properties[0].clip.path
+        clip = self.editable_properties[0].clip
+        clip_path = clip.path
         accuracy_prop = [ep for ep in self.editable_properties if ep.name == "accuracy"][0]
         shakiness_prop = [ep for ep in self.editable_properties if ep.name == "shakiness"][0]
         smoothing_prop = [ep for ep in self.editable_properties if ep.name == "smoothing"][0]
         zoom_prop = [ep for ep in self.editable_properties if ep.name == "zoom"][0]
         
+        # Only clip range with handles is analyzed.
+        range_in, range_out = analysiscache.get_stabilize_range(clip, smoothing_prop.value)
+        params = (shakiness_prop.value, accuracy_prop.value, smoothing_prop.value, zoom_prop.value)
+        analysis_key = analysiscache.get_analysis_key(analysiscache.STABILIZE_ANALYSIS, clip_path, range_in, range_out, params, profile_desc)
+        results_file = analysiscache.get_results_file(analysis_key)
+        if results_file != None:
+            jobs.set_stabilize_results(self.filter, results_file)
+            self.analysis_complete()
+            return
+
         args = ("session_id:" + str(session_id),
                 "profile_desc:" + str(profile_desc),
                 "clip_path:" + str(clip_path),
                 "shakiness:" + str(shakiness_prop.value),
                 "accuracy:" + str(accuracy_prop.value),
                 "smoothing:" + str(smoothing_prop.value),
-                "zoom:" + str(zoom_prop.value))
+                "zoom:" + str(zoom_prop.value),
+                "range_in:" + str(range_in),
+                "range_out:" + str(range_out))
 
         job = jobs.StablizeDataRenderJobQueueObject(session_id, self.filter, self.editable_properties, self, args)
+        job.analysis_key = analysis_key
         job.add_to_queue()
     
     def analysis_complete(self):
@@ -1328,8 +1343,17 @@ class AnalyzeMotionTrackingFilterEditor:
         data_label = self.label_entry.get_text()
         if len(data_label) == 0:
             data_label = self.get_default_data_label()
-        
+
+        params = (rect_value, algo_prop.value, step_prop.value)
+        analysis_key = analysiscache.get_analysis_key(analysiscache.TRACKING_ANALYSIS, clip_path, clip_in, clip_out, params, profile_desc)
+        data_file_path = analysiscache.get_results_file(analysis_key)
+        if data_file_path != None:
+            final_label = PROJECT().add_tracking_data(data_label, data_file_path)
+            self.analysis_complete(final_label, data_file_path)
+            return
+
         job = jobs.TrackingDataRenderJobQueueObject(session_id, self.filter, self.editable_properties, self, args, data_label)
+        job.analysis_key = analysis_key
         job.add_to_queue()
 
     def analysis_complete(self, final_label, data_file_path):
@@ -0,0 +1,226 @@
+"""
+    Flowblade Movie Editor is a nonlinear video editor.
+    Copyright 2012 Janne Liljeblad.
+
+    This file is part of Flowblade Movie Editor <https://github.com/jliljebl/flowblade/>.
+
+    Flowblade Movie Editor is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Flowblade Movie Editor is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Flowblade Movie Editor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+"""
+Module provides bounded RAM caches for decoded RGBA frames and a background
+thread that decodes frames ahead of scrub position.
+
+Caches count hits and misses, use get_stats() or print_stats() when tuning cache sizes.
+"""
+import collections
+import threading
+import time
+
+PLAYER_CACHE_MAX_BYTES = 256 * 1024 * 1024
+MATCH_FRAME_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Scrub prediction and prefetch
+SCRUB_HISTORY_LENGTH = 6 # number of latest scrub positions used to predict direction and speed
+SCRUB_HISTORY_MAX_AGE = 0.5 # seconds, older positions are not used for prediction
+PREFETCH_SECONDS = 0.5 # prefetch frames for this much scrub time ahead
+PREFETCH_MIN_FRAMES = 4
+PREFETCH_MAX_FRAMES = 48
+PREFETCH_BEHIND_FRAMES = 2
+
+_caches = []
+
+
+class FrameCache:
+    """
+    Least recently used cache of frame data limited by total size in bytes.
+    """
+    def __init__(self, name, max_bytes):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.frames = collections.OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0 # Incremented on invalidate, decodes started before that are not added.
+        self.lock = threading.Lock()
+        _caches.append(self)
+
+    def get(self, key):
+        with self.lock:
+            try:
+                data = self.frames[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self.frames.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def contains(self, key):
+        # Does not count as hit or miss.
+        with self.lock:
+            return key in self.frames
+
+    def put(self, key, data, generation=None):
+        with self.lock:
+            if generation != None and generation != self.generation:
+                return
+            try:
+                self.size -= _get_data_size(self.frames.pop(key))
+            except KeyError:
+                pass
+            self.frames[key] = data
+            self.size += _get_data_size(data)
+            while self.size > self.max_bytes and len(self.frames) > 1:
+                old_key, old_data = self.frames.popitem(last=False)
+                self.size -= _get_data_size(old_data)
+
+    def invalidate(self):
+        with self.lock:
+            self.frames.clear()
+            self.size = 0
+            self.generation += 1
+
+    def get_stats(self):
+        with self.lock:
+            requests = self.hits + self.misses
+            if requests > 0:
+                hit_rate = float(self.hits) / float(requests)
+            else:
+                hit_rate = 0.0
+            return (self.name, self.hits, self.misses, hit_rate, len(self.frames), self.size)
+
+    def reset_stats(self):
+        with self.lock:
+            self.hits = 0
+            self.misses = 0
+
+
+def _get_data_size(data):
+    try:
+        return data.nbytes # numpy arrays
+    except AttributeError:
+        return len(data)
+
+def get_stats():
+    """
+    Returns list of (name, hits, misses, hit rate, frames count, bytes) tuples for all caches.
+    """
+    return [cache.get_stats() for cache in _caches]
+
+def print_stats():
+    for name, hits, misses, hit_rate, count, size in get_stats():
+        print("frame cache", name, "hits:", hits, "misses:", misses,
+              "hit rate: %.2f" % hit_rate, "frames:", count, "MB: %.1f" % (size / 1000000.0))
+
+
+# Cache for RGBA frames of sequence displayed by player.
+# Must be invalidated when anything that changes sequence image output is edited.
+player_frames = FrameCache("player", PLAYER_CACHE_MAX_BYTES)
+
+def sequence_changed():
+    player_frames.invalidate()
+
+
+class ScrubPrefetcher(threading.Thread):
+    """
+    Decodes frames ahead of scrub position into cache.
+
+    Scrub direction and speed are predicted from latest positions given with
+    scrub_position(). decode_func(frame) returns frame data, it is only called
+    from this thread. key_func(frame) returns cache key for frame.
+    """
+    def __init__(self, cache, key_func, decode_func, first_frame, last_frame):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.cache = cache
+        self.key_func = key_func
+        self.decode_func = decode_func
+        self.first_frame = first_frame
+        self.last_frame = last_frame
+        self.history = collections.deque(maxlen=SCRUB_HISTORY_LENGTH)
+        self.position_changed = threading.Condition()
+        self.scrub_frame = None
+        self.running = True
+
+    def scrub_position(self, frame):
+        with self.position_changed:
+            self.history.append((time.monotonic(), frame))
+            self.scrub_frame = frame
+            self.position_changed.notify()
+
+    def stop(self):
+        with self.position_changed:
+            self.running = False
+            self.position_changed.notify()
+
+    def run(self):
+        while True:
+            with self.position_changed:
+                while self.running == True and self.scrub_frame == None:
+                    self.position_changed.wait()
+                if self.running == False:
+                    return
+                frame = self.scrub_frame
+                self.scrub_frame = None
+                velocity = self._get_velocity()
+
+            generation = self.cache.generation
+            for prefetch_frame in self._get_prefetch_frames(frame, velocity):
+                if self.running == False or self.scrub_frame != None:
+                    break # new position, start again from there
+                key = self.key_func(prefetch_frame)
+                if self.cache.contains(key):
+                    continue
+                try:
+                    data = self.decode_func(prefetch_frame)
+                except Exception as e:
+                    print("ScrubPrefetcher decode failed:", e)
+                    continue
+                if data is not None: # data may be a numpy array
+                    self.cache.put(key, data, generation)
+
+    def _get_velocity(self):
+        # Frames per second, sign gives scrub direction.
+        now = time.monotonic()
+        recent = [(t, f) for t, f in self.history if now - t < SCRUB_HISTORY_MAX_AGE]
+        if len(recent) < 2:
+            return 0.0
+        first_time, first_frame = recent[0]
+        last_time, last_frame = recent[-1]
+        if last_time - first_time <= 0.0:
+            return 0.0
+        return float(last_frame - first_frame) / (last_time - first_time)
+
+    def _get_prefetch_frames(self, frame, velocity):
+        frames_ahead = int(abs(velocity) * PREFETCH_SECONDS)
+        frames_ahead = max(PREFETCH_MIN_FRAMES, min(PREFETCH_MAX_FRAMES, frames_ahead))
+
+        if velocity > 0.0:
+            ahead = range(frame + 1, frame + frames_ahead + 1)
+            behind = range(frame - 1, frame - PREFETCH_BEHIND_FRAMES - 1, -1)
+            candidates = list(ahead) + list(behind)
+        elif velocity < 0.0:
+            ahead = range(frame - 1, frame - frames_ahead - 1, -1)
+            behind = range(frame + 1, frame + PREFETCH_BEHIND_FRAMES + 1)
+            candidates = list(ahead) + list(behind)
+        else:
+            # Direction unknown, alternate both sides.
+            candidates = []
+            for i in range(1, PREFETCH_MIN_FRAMES + 1):
+                candidates.append(frame + i)
+                candidates.append(frame - i)
+
+        return [f for f in candidates if f >= self.first_frame and f <= self.last_frame]
@@ -0,0 +1,109 @@
+"""
+    Flowblade Movie Editor is a nonlinear video editor.
+    Copyright 2012 Janne Liljeblad.
+
+    This file is part of Flowblade Movie Editor <https://github.com/jliljebl/flowblade/>.
+
+    Flowblade Movie Editor is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Flowblade Movie Editor is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Flowblade Movie Editor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+"""
+Module schedules updates of displays showing playback position.
+
+Player reports current frame with frame_changed() and subscribed displays are updated
+on next frame clock tick of editor window, so any number of frame changes between
+screen updates cause only one update.
+
+Displays subscribe with maximum update rate and optionally a function telling if
+display is currently visible. Hidden displays are not updated.
+"""
+
+import gui
+
+_displays = []
+_pending_frame = None
+_tick_callback_id = None
+
+
+class FrameDisplay:
+
+    def __init__(self, name, display_func, max_rate, visible_func):
+        self.name = name
+        self.display_func = display_func # display_func(frame)
+        self.min_interval = 0.0
+        if max_rate != None:
+            self.min_interval = 1.0 / max_rate
+        self.visible_func = visible_func
+        self.last_frame = None
+        self.last_update_time = 0.0
+
+    def update(self, frame, now):
+        """
+        Returns True if display needs to be updated later because of update rate limit.
+        """
+        if frame == self.last_frame:
+            return False
+
+        if self.visible_func != None and self.visible_func() == False:
+            self.last_frame = None # Update when display is next time visible and frame changes.
+            return False
+
+        if now - self.last_update_time < self.min_interval:
+            return True
+
+        self.display_func(frame)
+        self.last_frame = frame
+        self.last_update_time = now
+        return False
+
+
+def subscribe(name, display_func, max_rate=None, visible_func=None):
+    display = FrameDisplay(name, display_func, max_rate, visible_func)
+    _displays.append(display)
+    return display
+
+def has_subscribers():
+    return len(_displays) > 0
+
+def frame_changed(frame):
+    global _pending_frame, _tick_callback_id
+    _pending_frame = frame
+    if _tick_callback_id == None:
+        _tick_callback_id = gui.editor_window.window.add_tick_callback(_frame_clock_tick)
+
+def frame_displayed(frame):
+    # All displays were updated for frame outside scheduler.
+    global _pending_frame
+    _pending_frame = frame
+    for display in _displays:
+        display.last_frame = frame
+
+def _frame_clock_tick(widget, frame_clock):
+    global _tick_callback_id
+    now = frame_clock.get_frame_time() / 1000000.0 # microseconds to seconds
+
+    updates_waiting = False
+    for display in _displays:
+        try:
+            if display.update(_pending_frame, now) == True:
+                updates_waiting = True
+        except Exception as e:
+            print("framescheduler: display", display.name, "update failed:", e)
+            display.last_frame = _pending_frame
+
+    if updates_waiting == True:
+        return True # Rate limited displays get updated on a later tick.
+
+    _tick_callback_id = None
+    return False
@@ -24,6 +24,9 @@ from gi.repository import GObject
 from gi.repository import Pango
 
 import os
+import shlex
+import shutil
+import signal
 import subprocess
 import sys
 import time
@@ -33,14 +36,17 @@ try:
 except:
     import mlt
 
+import analysiscache
 import appconsts
 import callbackbridge
+import diskcacheledger
 import editorlayout
 import editorpersistance
 from editorstate import PROJECT
 import guicomponents
 import guipopover
 import guiutils
+import loudnessheadless
 import motionheadless
 import proxyheadless
 import renderconsumer
@@ -66,6 +72,7 @@ CONTAINER_CLIP_RENDER_FLUXITY = 6
 STABILIZE_DATA_RENDER = 7
 MOTION_TRACKING_DATA_RENDER = 8
 STABILIZED_MEDIA_ITEM_RENDER = 9
+LOUDNESS_ANALYSIS = 10
 
 FFMPEG_ATTR_SOURCEFILE = "%SOURCEFILE"
 FFMPEG_ATTR_SCREENSIZE = "%SCREENSIZE"
@@ -81,6 +88,9 @@ _remove_list = [] # objects are removed from GUI with delay to give user time to
 
 _jobs_render_progress_window = None
 
+# Both MLT and ffmpeg proxy renders count towards this limit.
+MAX_CONCURRENT_PROXY_RENDERS = max(1, min(4, (os.cpu_count() or 2) // 2))
+
 
 class JobProxy: # This object represents a job in the job queue. 
 
@@ -129,9 +139,11 @@ class ProcessCommandListRunner(threading.Thread):
         threading.Thread.__init__(self)
         self.command_list = command_list
         
+        self.process = None
+
     def run(self):
-        process = subprocess.Popen(self.command_list)
-        process.wait()
+        self.process = subprocess.Popen(self.command_list)
+        self.process.wait()
 
 #---------------------------------------------------------------- interface
 def add_job(job_proxy):
@@ -142,7 +154,8 @@ def add_job(job_proxy):
         editorlayout.show_panel(appconsts.PANEL_JOBS)
     
     if editorpersistance.prefs.render_jobs_sequentially == False: # Feature not active for first release 2.6.
-        job_proxy.start_render()
+        if _can_start_job(job_proxy):
+            job_proxy.start_render()
     else:
          running = _get_jobs_with_status(RENDERING)
          if len(running) == 0:
@@ -182,9 +195,7 @@ def update_job_queue(job_msg): # We're using JobProxy objects as messages to upd
         _jobs[row].progress = 1.0
         _remove_list.append(_jobs[row])
         GLib.timeout_add(4000, _remove_jobs)
-        waiting_jobs = _get_jobs_with_status(QUEUED)
-        if len(waiting_jobs) > 0:
-            waiting_jobs[0].start_render()
+        _start_next_queued_job()
     else:
         _jobs[row].status = job_msg.status
 
@@ -250,11 +261,44 @@ def get_jobs_panel():
     return panel
 
 def get_active_jobs_count():
-    return len(_jobs)
+    return len(get_active_jobs())
+
+def get_active_jobs():
+    return _get_jobs_with_status(QUEUED) + _get_jobs_with_status(RENDERING)
+
+def cancel_job(job):
+    job.abort_render()
+    job.progress = -1.0
+    job.text = _("Cancelled")
+    job.status = CANCELLED
+    _remove_list.append(job)
+
+    # Cancelled job no longer blocks queued jobs.
+    running = _get_jobs_with_status(RENDERING)
+    if len(running) == 0 or editorpersistance.prefs.render_jobs_sequentially == False:
+        _start_next_queued_job()
+
+    _jobs_list_view.fill_data_model()
+    _jobs_list_view.scroll.queue_draw()
+    GLib.timeout_add(4000, _remove_jobs)
+
+def get_low_priority_command(command_list):
+    # Process gets idle IO priority and lowest CPU priority if tools are available.
+    prefix = []
+    if shutil.which("ionice") != None:
+        prefix = prefix + ["ionice", "-c", "3"]
+    if shutil.which("nice") != None:
+        prefix = prefix + ["nice", "-n", "19"]
+    return prefix + command_list
 
 
 
 # ------------------------------------------------------------- module functions
+def set_stabilize_results(filter, results_file):
+    filter.mlt_filter.set("results", str(results_file))
+    # We have only one of these, so just recreate list.
+    filter.non_mlt_properties = [("results_save_data",  str(results_file),  appconsts.PROP_EXPRESSION)]
+
 def _menu_action_pressed(launcher, widget, event, data):
     guipopover.jobs_menu_popover_show(launcher, widget, _hamburger_item_activated)
     
@@ -269,16 +313,7 @@ def _hamburger_item_activated(action, variant, msg=None):
         except:
             return # nothing was selected
         
-        job = _jobs[jobs_list_index]
-        job.abort_render()
-        job.progress = -1.0
-        job.text = _("Cancelled")
-        job.status = CANCELLED
-        _remove_list.append(job)
-
-        _jobs_list_view.fill_data_model()
-        _jobs_list_view.scroll.queue_draw()
-        GLib.timeout_add(4000, _remove_jobs)
+        cancel_job(_jobs[jobs_list_index])
         
     elif msg == "open_on_add":
         new_state = not(action.get_state().get_boolean())
@@ -294,6 +329,24 @@ def _get_jobs_with_status(status):
     
     return running
 
+def _get_running_proxy_renders_count():
+    count = 0
+    for job in _get_jobs_with_status(RENDERING):
+        if job.type == PROXY_RENDER:
+            count += 1
+    return count
+
+def _can_start_job(job):
+    if job.type != PROXY_RENDER:
+        return True
+    return _get_running_proxy_renders_count() < MAX_CONCURRENT_PROXY_RENDERS
+
+def _start_next_queued_job():
+    for job in _get_jobs_with_status(QUEUED):
+        if _can_start_job(job):
+            job.start_render()
+            return
+
 def _remove_jobs():
     global _jobs, _remove_list
     for  job in _remove_list:
@@ -303,10 +356,8 @@ def _remove_jobs():
             pass
 
     running = _get_jobs_with_status(RENDERING)
-    if len(running) == 0:
-        in_queue = _get_jobs_with_status(QUEUED)
-        if len(in_queue) > 0:
-            in_queue[0].start_render()
+    if len(running) == 0 or editorpersistance.prefs.render_jobs_sequentially == False:
+        _start_next_queued_job()
 
     _jobs_list_view.fill_data_model()
     _jobs_list_view.scroll.queue_draw()
@@ -553,6 +604,7 @@ class StablizeDataRenderJobQueueObject(AbstractJobQueueObject):
         self.editable_properties = editable_properties
         self.args = args
         self.parent_folder = userfolders.get_temp_render_dir() # This is used for message passing, output file goes to path given by 'write_file'.
+        self.analysis_key = None # set at object creation site if results should be cached, see analysiscache.py
         
     def start_render(self):
         
@@ -613,9 +665,8 @@ class StablizeDataRenderJobQueueObject(AbstractJobQueueObject):
                 pass
 
     def update_filter_and_gui(self):
-        self.filter.mlt_filter.set("results", str(self.write_file))
-        # We have only one of these, so just recreate list.
-        self.filter.non_mlt_properties = [("results_save_data",  str(self.write_file),  appconsts.PROP_EXPRESSION)]
+        analysiscache.add_results_file(self.analysis_key, self.write_file)
+        set_stabilize_results(self.filter, self.write_file)
         self.analyze_editor.analysis_complete()
         
     def abort_render(self):
@@ -634,6 +685,7 @@ class StablizedMediaItemDataRenderJobQueueObject(AbstractJobQueueObject):
         self.args = args
         self.parent_folder = userfolders.get_temp_render_dir() # This is used for message passing, output file goes to path given by 'write_file'.
         self.data_render_comple_callback = data_render_comple_callback
+        self.analysis_key = None # set at object creation site if results should be cached, see analysiscache.py
         
     def start_render(self):
         
@@ -693,6 +745,7 @@ class StablizedMediaItemDataRenderJobQueueObject(AbstractJobQueueObject):
                 pass
 
     def data_render_done(self):
+        analysiscache.add_results_file(self.analysis_key, self.write_file)
         self.data_render_comple_callback(self.media_file, self.render_params, self.write_file)
         
     def abort_render(self):
@@ -787,6 +840,7 @@ class TrackingDataRenderJobQueueObject(AbstractJobQueueObject):
         self.args = args
         self.data_label = data_label
         self.parent_folder = userfolders.get_temp_render_dir() # This is used for message passing, output file goes to path given by 'write_file'.
+        self.analysis_key = None # set at object creation site if results should be cached, see analysiscache.py
         
     def start_render(self):
         job_msg = self.get_job_queue_message()
@@ -852,6 +906,7 @@ class TrackingDataRenderJobQueueObject(AbstractJobQueueObject):
                 pass
 
     def update_filter_and_gui(self):    
+        analysiscache.add_results_file(self.analysis_key, self.data_file_path)
         final_label = PROJECT().add_tracking_data(self.data_label, self.data_file_path)
         self.analyze_editor.analysis_complete(final_label, self.data_file_path)
 
@@ -860,6 +915,74 @@ class TrackingDataRenderJobQueueObject(AbstractJobQueueObject):
 
 
 
+class LoudnessAnalysisJobQueueObject(AbstractJobQueueObject):
+
+    def __init__(self, session_id, args, job_name, analysis_done_callback):
+        
+        AbstractJobQueueObject.__init__(self, session_id, LOUDNESS_ANALYSIS)
+        
+        self.args = args
+        self.job_name = job_name
+        self.analysis_done_callback = analysis_done_callback # analysis_done_callback(results)
+        self.parent_folder = userfolders.get_temp_render_dir() # Analysis plan and results are in session folder.
+
+    def get_job_name(self):
+        return self.job_name
+
+    def start_render(self):
+        job_msg = self.get_job_queue_message()
+        job_msg.text = _("Render Starting...")
+        job_msg.status = RENDERING
+        update_job_queue(job_msg)
+
+        # Create command list and launch process.
+        command_list = [sys.executable]
+        command_list.append(respaths.LAUNCH_DIR + "flowbladeloudnessheadless")
+        for arg in self.args:
+            command_list.append(arg)
+        parent_folder_arg = "parent_folder:" + str(self.parent_folder)
+        command_list.append(parent_folder_arg)
+
+        # We need to wait() in thread.
+        command_list_runner = ProcessCommandListRunner(command_list)
+        command_list_runner.start()
+
+    def update_render_status(self):
+        GLib.idle_add(self._update_from_gui_thread)
+            
+    def _update_from_gui_thread(self):
+
+        if loudnessheadless.session_render_complete(self.parent_folder, self.get_session_id()) == True:
+            job_msg = self.get_completed_job_message()
+            update_job_queue(job_msg)
+
+            try:
+                results = loudnessheadless.get_results(self.parent_folder, self.get_session_id())
+            except Exception as e:
+                print("Loudness analysis results could not be read:", e)
+                results = None
+            loudnessheadless.delete_session_folders(self.parent_folder, self.get_session_id())
+
+            if results != None:
+                GLib.idle_add(self.analysis_done_callback, results)
+        else:
+            status = loudnessheadless.get_session_status(self.parent_folder, self.get_session_id())
+            if status != None:
+                fraction, elapsed = status
+
+                self.progress = min(1.0, float(fraction))
+                self.elapsed = float(elapsed)
+                self.text = _("Loudness Analysis") + " " + self.get_job_name()
+
+                job_msg = self.get_job_queue_message()
+
+                update_job_queue(job_msg)
+
+    def abort_render(self):
+        loudnessheadless.abort_render(self.parent_folder, self.get_session_id())
+
+
+
 class ProxyRenderJobQueueObject(AbstractJobQueueObject):
 
     def __init__(self, session_id, render_data):
@@ -868,6 +991,8 @@ class ProxyRenderJobQueueObject(AbstractJobQueueObject):
         
         self.render_data = render_data # 'render_data' is proxyediting.ProxyRenderItemData
         self.parent_folder = userfolders.get_temp_render_dir()
+        self.is_mlt_render = None # Set when render is started.
+        self.paused = False
 
     def get_job_name(self):
         folder, file_name = os.path.split(self.render_data.media_file_path)
@@ -904,39 +1029,54 @@ class ProxyRenderJobQueueObject(AbstractJobQueueObject):
             parent_folder_arg = "parent_folder:" + str(self.parent_folder)
             command_list.append(parent_folder_arg)
 
+            if self.render_data.low_priority == True:
+                command_list = get_low_priority_command(command_list)
+
             # We need to wait() in thread.
-            command_list_runner = ProcessCommandListRunner(command_list)
-            command_list_runner.start()
+            self.command_list_runner = ProcessCommandListRunner(command_list)
+            self.command_list_runner.start()
         else:
             # FFMPEG CLI proxy rendering.
             self.is_mlt_render = False
             
-            # Build ffmpeg CLI string.
-            proxy_attr_str = enc_opt.attr_string
-            # Set scale size.
+            # Build ffmpeg CLI args list. Attributes are split before values
+            # are inserted so that paths with spaces stay single arguments.
             screen_size_str = str(self.render_data.proxy_w) + "x" + str(self.render_data.proxy_h)
-            proxy_attr_str = proxy_attr_str.replace(FFMPEG_ATTR_SCREENSIZE, screen_size_str)
-            #...or
-            screen_size_str = str(self.render_data.proxy_w) + ":" + str(self.render_data.proxy_h)
-            proxy_attr_str = proxy_attr_str.replace(FFMPEG_ATTR_SCREENSIZE_2, screen_size_str)
-            # Set source file.
-            proxy_attr_str = proxy_attr_str.replace(FFMPEG_ATTR_SOURCEFILE, self.render_data.media_file_path)
-            # Set proxy file.
-            proxy_attr_str = proxy_attr_str.replace(FFMPEG_ATTR_PROXYFILE, self.render_data.proxy_file_path)
-
-            ffmpeg_command = "ffmpeg -i " + str(proxy_attr_str)
-            
+            screen_size_str_2 = str(self.render_data.proxy_w) + ":" + str(self.render_data.proxy_h)
+            command_list = ["ffmpeg", "-nostdin", "-y", "-nostats", "-progress", "pipe:1", "-i"]
+            for token in shlex.split(enc_opt.attr_string):
+                token = token.replace(FFMPEG_ATTR_SCREENSIZE_2, screen_size_str_2)
+                token = token.replace(FFMPEG_ATTR_SCREENSIZE, screen_size_str)
+                token = token.replace(FFMPEG_ATTR_SOURCEFILE, self.render_data.media_file_path)
+                token = token.replace(FFMPEG_ATTR_PROXYFILE, self.render_data.proxy_file_path)
+                command_list.append(token)
+
+            if self.render_data.low_priority == True:
+                command_list = get_low_priority_command(command_list)
+
             self.ffmpeg_start = time.monotonic()
             
-            self.ffmpeg_remnder_thread = FFmpegRenderThread(ffmpeg_command)
+            self.ffmpeg_remnder_thread = FFmpegRenderThread(command_list,
+                                                            self.render_data.proxy_file_path,
+                                                            self._get_media_duration())
             self.ffmpeg_remnder_thread.start()
 
+    def _get_media_duration(self):
+        # Returns source media duration in seconds or None if not available.
+        try:
+            media_file = PROJECT().media_files[self.render_data.media_file_id]
+            return float(media_file.length) / PROJECT().profile.fps()
+        except:
+            return None
+
     def update_render_status(self):
 
         GLib.idle_add(self._update_from_gui_thread)
             
     def _update_from_gui_thread(self):
-        
+        if self.paused == True:
+            return
+
         if self.is_mlt_render == True:
             if proxyheadless.session_render_complete(self.parent_folder, self.get_session_id()) == True:
                 
@@ -965,30 +1105,66 @@ class ProxyRenderJobQueueObject(AbstractJobQueueObject):
                     # Process start/stop on their own and we hit trying to get non-existing status for e.g completed renders.
                     pass
         else:
-            if self.ffmpeg_remnder_thread.completed == True:
+            if self.ffmpeg_remnder_thread.aborted == True:
+                return
+            elif self.ffmpeg_remnder_thread.completed == True:
+                if self.ffmpeg_remnder_thread.return_code != 0:
+                    print("ffmpeg proxy render failed for", self.render_data.media_file_path, 
+                          "return code:", self.ffmpeg_remnder_thread.return_code)
                 job_msg = self.get_completed_job_message()
                 update_job_queue(job_msg)
                 GLib.idle_add(self.proxy_render_complete)
             else:
                 self.elapsed = float(time.monotonic() - self.ffmpeg_start)
-                prog_step = 0.07
-                if PROJECT().profile.height() > 1090:
-                    prog_step = 0.035
-                self.progress += prog_step
-                if self.progress > 1.0:
+                self.progress = self.ffmpeg_remnder_thread.get_fraction()
+                if self.progress > 0.99:
                     self.progress = 0.99
-                    
+
                 self.text = _("Proxy Render")  + " " + self.get_job_name()
+                eta = self.ffmpeg_remnder_thread.get_eta()
+                if eta != None:
+                    self.text += ", " + utils.get_time_str_for_sec_float(eta) + " " + _("left")
 
                 job_msg = self.get_job_queue_message()
                 update_job_queue(job_msg)
                     
+    def pause_render(self):
+        # Stopped process keeps its state and continues from same frame on resume.
+        if self._signal_process(signal.SIGSTOP) == True:
+            self.paused = True
+            self.text = _("Paused") + " - " + self.get_job_name()
+            update_job_queue(self.get_job_queue_message())
+
+    def resume_render(self):
+        if self.paused == False:
+            return
+        self._signal_process(signal.SIGCONT)
+        self.paused = False
+
+    def _signal_process(self, signal_number):
+        if self.is_mlt_render == True:
+            process = self.command_list_runner.process
+        elif self.is_mlt_render == False:
+            process = self.ffmpeg_remnder_thread.process
+        else:
+            return False
+
+        if process == None or process.poll() != None:
+            return False
+        try:
+            os.kill(process.pid, signal_number)
+        except OSError:
+            return False
+        return True
+
     def abort_render(self):
+        # Stopped process would not see abort message.
+        self.resume_render()
         if self.is_mlt_render == True:
             # remove_as_status_polling_object(self)
             motionheadless.abort_render(self.parent_folder, self.get_session_id())
-        
-        # NOTE: ffmpeg cli render not abortable currently.
+        elif self.is_mlt_render == False:
+            self.ffmpeg_remnder_thread.abort()
         
     def proxy_render_complete(self):
         try:
@@ -998,6 +1174,7 @@ class ProxyRenderJobQueueObject(AbstractJobQueueObject):
             return
 
         media_file.add_proxy_file(self.render_data.proxy_file_path)
+        diskcacheledger.file_written(self.render_data.proxy_file_path)
 
         if PROJECT().proxy_data.proxy_mode == appconsts.USE_PROXY_MEDIA: # When proxy mode is USE_PROXY_MEDIA all proxy files are used all the time
             media_file.set_as_proxy_media_file()
@@ -1012,18 +1189,99 @@ class ProxyRenderJobQueueObject(AbstractJobQueueObject):
 
 
 class FFmpegRenderThread(threading.Thread):
-    
-    def __init__(self, ffmpeg_command):
+    """
+    Runs ffmpeg as a managed subprocess and parses its '-progress' output 
+    for render progress. Process is killed and partial output file deleted on abort
+    unless process had already exited successfully.
+    """
+    def __init__(self, command_list, output_file, duration):
         
-        self.ffmpeg_command = ffmpeg_command
+        self.command_list = command_list
+        self.output_file = output_file
+        self.duration = duration # in seconds, or None if not known
+        self.process = None
+        self.out_time = 0.0 # in seconds
+        self.frame = 0
+        self.start_time = None
+        self.return_code = None
         self.completed = False
+        self.aborted = False
 
         threading.Thread.__init__(self)
 
     def run(self):
-        os.system(self.ffmpeg_command) # blocks
+        self.start_time = time.monotonic()
+        try:
+            self.process = subprocess.Popen(self.command_list,
+                                            stdout=subprocess.PIPE,
+                                            stderr=subprocess.DEVNULL,
+                                            stdin=subprocess.DEVNULL,
+                                            universal_newlines=True)
+        except OSError as e:
+            print("Launching ffmpeg proxy render failed:", e)
+            self.return_code = -1
+            self.completed = True
+            return
+
+        # Abort could have been requested while process was being launched.
+        if self.aborted == True:
+            self._kill_process()
+
+        for line in self.process.stdout:
+            self._parse_progress_line(line.strip())
+
+        self.return_code = self.process.wait()
+        if self.aborted == True and self.return_code != 0:
+            self._delete_output_file()
         self.completed = True 
 
+    def _parse_progress_line(self, line):
+        try:
+            key, value = line.split("=", 1)
+        except ValueError:
+            return
+
+        try:
+            if key == "out_time_us" or key == "out_time_ms": # both are in microseconds in ffmpeg output
+                self.out_time = int(value) / 1000000.0
+            elif key == "frame":
+                self.frame = int(value)
+        except ValueError:
+            pass # value is 'N/A' before first frame is written
+
+    def get_fraction(self):
+        if self.duration == None or self.duration <= 0.0:
+            return 0.0
+        fraction = self.out_time / self.duration
+        if fraction > 1.0:
+            fraction = 1.0
+        return fraction
+
+    def get_eta(self):
+        # Returns estimated seconds left or None if no estimate can be made yet.
+        fraction = self.get_fraction()
+        if fraction <= 0.0 or self.start_time == None:
+            return None
+        elapsed = time.monotonic() - self.start_time
+        return elapsed / fraction - elapsed
+
+    def abort(self):
+        self.aborted = True
+        self._kill_process()
+        # Finished proxy is kept if process exited successfully before abort.
+        if self.completed == True and self.return_code != 0:
+            self._delete_output_file()
+
+    def _kill_process(self):
+        if self.process != None and self.process.poll() == None:
+            self.process.kill()
+
+    def _delete_output_file(self):
+        try:
+            os.remove(self.output_file)
+        except OSError:
+            pass
+
 
 # ----------------------------------------------------------------- polling
 class ContainerStatusPollingThread(threading.Thread):
@@ -30,7 +30,7 @@ of callbacks to parent objects.
 import cairo
 import copy
 
-from gi.repository import Gtk, GObject, Gio, Gdk
+from gi.repository import Gtk, GObject, Gio, Gdk, GLib
 from gi.repository import Pango, PangoCairo
 
 import appconsts
@@ -73,6 +73,9 @@ POS_ENTRY_H = 20
 KF_HIT_WIDTH = 4
 KF_DRAG_THRESHOLD = 3
 
+# Slider drag keyframe writes to MLT are coalesced to happen at most once in this interval.
+KF_WRITE_BACK_INTERVAL_MS = 16 # ~ 60 fps display refresh rate
+
 GEOM_EDITOR_SIZE_LARGE = 0.9 # Displayed screensize as fraction of available height.
 GEOM_EDITOR_SIZE_MEDIUM = 0.6 # Displayed screensize as fraction of available height.
 GEOM_EDITOR_SIZE_SMALL = 0.3 # Displayed screensize as fraction of available height.
@@ -998,6 +1001,11 @@ class AbstractKeyFrameEditor(Gtk.VBox):
         self.value_slider_row = row
         self.slider = slider
         self.spin = spin
+        self.slider.connect("button-release-event", lambda w, e: self.flush_property_value_update())
+
+        # Coalesced write-back of slider value changes.
+        self.write_back_id = None
+        self.property_update_pending = False
 
         self.initializing = False # Hack against too early for on slider listener
 
@@ -1041,7 +1049,42 @@ class AbstractKeyFrameEditor(Gtk.VBox):
 
     def seek_tline_frame(self, clip_frame):
         PLAYER().seek_frame(self.clip_tline_pos + clip_frame - self.clip_in)
-    
+
+    def queue_property_value_update(self):
+        # Slider drags create value changes faster then MLT can reparse keyframes,
+        # so we write the latest value once per write back interval.
+        self.property_update_pending = True
+        if self.write_back_id == None:
+            self.write_back_id = GLib.timeout_add(KF_WRITE_BACK_INTERVAL_MS, self._write_back_timeout)
+
+    def _write_back_timeout(self):
+        if self.property_update_pending == True:
+            # Value changed during last interval, update MLT value only.
+            self._write_live_property_value()
+            return True
+
+        # No changes during last interval, persistent value can be written.
+        self.write_back_id = None
+        self.editable_property.commit_value()
+        return False
+
+    def _write_live_property_value(self):
+        self.property_update_pending = False
+        self.editable_property.live_write = True
+        self.update_property_value()
+        self.editable_property.live_write = False
+
+    def flush_property_value_update(self):
+        # Called on slider release to write pending value and commit persistent value immediately.
+        if self.write_back_id == None:
+            return False
+        GLib.source_remove(self.write_back_id)
+        self.write_back_id = None
+        if self.property_update_pending == True:
+            self._write_live_property_value()
+        self.editable_property.commit_value()
+        return False
+
     def update_editor_view(self, seek_tline=True):
         print(type(self), "update_editor_view not implemented")
 
@@ -1131,10 +1174,10 @@ class KeyFrameEditor(AbstractKeyFrameEditor):
             self.clip_editor.add_keyframe(current_frame)
             self.clip_editor.set_active_kf_value(value)
             self.update_editor_view()
-            self.update_property_value()
+            self.queue_property_value_update()
         else: # if on kf, just update value
             self.clip_editor.set_active_kf_value(value)
-            self.update_property_value()
+            self.queue_property_value_update()
 
     def active_keyframe_changed(self):
         frame = self.clip_editor.current_clip_frame
@@ -1557,7 +1600,7 @@ class GeometryEditor(AbstractKeyFrameEditor):
     def slider_value_changed(self, adjustment):
         value = adjustment.get_value()
         self.clip_editor.set_active_kf_value(value)
-        self.update_property_value()
+        self.queue_property_value_update()
 
     def get_copy_kf_value(self):
          return self.geom_kf_edit.get_keyframe(self.clip_editor.active_kf_index)
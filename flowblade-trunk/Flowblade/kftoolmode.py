@@ -253,6 +253,9 @@ def get_clip_kftool_editable_params_data(clip):
     return kftool_editable_params
 
                 
+def kf_editor_active():
+    return (_kf_editor != None)
+
 def update_clip_frame(tline_frame):
     if _kf_editor != None and edit_data != None and edit_data["initializing"] != True:
         clip_frame = tline_frame - edit_data["clip_start_in_timeline"] + edit_data["clip"].clip_in
@@ -0,0 +1,249 @@
+"""
+    Flowblade Movie Editor is a nonlinear video editor.
+    Copyright 2012 Janne Liljeblad.
+
+    This file is part of Flowblade Movie Editor <https://github.com/jliljebl/flowblade/>.
+
+    Flowblade Movie Editor is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Flowblade Movie Editor is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Flowblade Movie Editor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+"""
+Module launches offline loudness analysis of current sequence and normalizes clip loudness
+using analysis results.
+
+Clip results are source media loudness for clip range and are kept in a persisted index,
+so normalization and later analyses of same clip ranges do not need analyzing them again.
+Track and master results are kept for the session.
+"""
+
+from gi.repository import GLib
+from gi.repository import Gtk
+
+import hashlib
+import os
+import pickle
+import threading
+
+import appconsts
+import atomicfile
+import ccrutils
+import clipeffectseditor
+import dialogutils
+import edit
+from editorstate import current_sequence
+from editorstate import PLAYER
+from editorstate import PROJECT
+import gui
+import guiutils
+import jobs
+import loudnessheadless
+import mltenv
+import mltfilters
+import renderconsumer
+import updater
+import userfolders
+import utils
+
+INDEX_FILE = "loudness_results_cache"
+SEQUENCE_XML = "loudness_sequence.xml"
+
+TARGET_LOUDNESS = -23.0 # LUFS, EBU R128
+MIN_GAIN = -70.0 # dB, Volume filter range
+MAX_GAIN = 20.0
+
+_index = None # clip key -> result dict, see loudnessheadless.get_loudness_result()
+_index_lock = threading.Lock()
+
+_sequence_results = {} # sequence uid -> (track results dict, master result)
+
+
+# ------------------------------------------------------ clip results
+def get_clip_key(clip, profile_desc):
+    """
+    Returns key for clip range results or None if clip media can not be read.
+    """
+    try:
+        stat = os.stat(clip.path)
+    except OSError:
+        return None
+    key_str = str((clip.path, stat.st_size, stat.st_mtime, clip.clip_in, clip.clip_out, profile_desc))
+    return hashlib.md5(key_str.encode("utf-8")).hexdigest()
+
+def get_clip_result(clip):
+    clip_key = get_clip_key(clip, PROJECT().profile.description())
+    if clip_key == None:
+        return None
+    with _index_lock:
+        return _get_index().get(clip_key)
+
+def _get_analyzed_clips(seq):
+    clips = []
+    for track in seq.tracks[1:len(seq.tracks) - 1]:
+        for clip in track.clips:
+            if clip.is_blanck_clip == False and clip.media_type in (appconsts.VIDEO, appconsts.AUDIO):
+                clips.append(clip)
+    return clips
+
+
+# ------------------------------------------------------ index
+def _get_index():
+    global _index
+    if _index == None:
+        try:
+            _index = utils.unpickle(userfolders.get_cache_dir() + INDEX_FILE)
+        except:
+            _index = {}
+    return _index
+
+def _save():
+    with _index_lock:
+        index = dict(_get_index())
+    with atomicfile.AtomicFileWriter(userfolders.get_cache_dir() + INDEX_FILE, "wb") as afw:
+        write_file = afw.get_file()
+        pickle.dump(index, write_file)
+
+
+# ------------------------------------------------------ analysis
+def analyze_sequence_loudness():
+    if "loudness_meter" not in mltenv.services:
+        primary_txt = _("Loudness analysis not available")
+        secondary_txt = _("MLT service 'loudness_meter' was not found on the system.")
+        dialogutils.warning_message(primary_txt, secondary_txt, gui.editor_window.window)
+        return
+
+    seq = current_sequence()
+    profile_desc = PROJECT().profile.description()
+
+    # Clip ranges with existing results are not analyzed again.
+    clip_items = {}
+    for clip in _get_analyzed_clips(seq):
+        clip_key = get_clip_key(clip, profile_desc)
+        if clip_key == None or get_clip_result(clip) != None:
+            continue
+        clip_items[clip_key] = (clip_key, clip.path, clip.clip_in, clip.clip_out)
+
+    track_indexes = []
+    for i in range(1, len(seq.tracks) - 1):
+        if len([clip for clip in seq.tracks[i].clips if clip.is_blanck_clip == False]) > 0:
+            track_indexes.append(i)
+
+    session_id = utils.get_uid_str()
+    parent_folder = userfolders.get_temp_render_dir()
+    session_folder = ccrutils.get_session_folder(parent_folder, session_id)
+    os.mkdir(session_folder)
+
+    xml_path = session_folder + "/" + SEQUENCE_XML
+    plan = {"clips":list(clip_items.values()),
+            "tracks":track_indexes,
+            "xml_path":xml_path,
+            "length":seq.get_length()}
+    with atomicfile.AtomicFileWriter(session_folder + "/" + loudnessheadless.ANALYSIS_PLAN, "wb") as afw:
+        write_file = afw.get_file()
+        pickle.dump(plan, write_file)
+
+    # Sequence is written as MLT XML for analysis process.
+    render_player = renderconsumer.XMLRenderPlayer(xml_path, _xml_render_done_callback,
+                                                   (seq, session_id, profile_desc), seq,
+                                                   PROJECT(), PLAYER())
+    render_player.start()
+
+def _xml_render_done_callback(data):
+    GLib.idle_add(_launch_analysis_job, data)
+
+def _launch_analysis_job(data):
+    seq, session_id, profile_desc = data
+    args = ("session_id:" + session_id, "profile_desc:" + profile_desc.replace(" ", "_"))
+    job = jobs.LoudnessAnalysisJobQueueObject(session_id, args, seq.name,
+                                              lambda results: _analysis_done(seq, results))
+    job.add_to_queue()
+
+def _analysis_done(seq, results):
+    with _index_lock:
+        _get_index().update(results["clips"])
+    _save()
+
+    _sequence_results[seq.uid] = (results["tracks"], results["master"])
+    show_sequence_results(seq)
+
+
+# ------------------------------------------------------ results display
+def show_sequence_results(seq):
+    try:
+        track_results, master_result = _sequence_results[seq.uid]
+    except KeyError:
+        return
+
+    grid = Gtk.Grid()
+    grid.set_column_spacing(24)
+    grid.set_row_spacing(4)
+    headers = [_("Item"), _("Integrated"), _("Max Short-term"), _("True Peak")]
+    for column in range(0, len(headers)):
+        grid.attach(guiutils.bold_label(headers[column]), column, 0, 1, 1)
+
+    rows = [(_("Master"), master_result)]
+    for track_index in sorted(track_results.keys(), reverse=True):
+        rows.append((utils.get_track_name(seq.tracks[track_index], seq), track_results[track_index]))
+
+    for row in range(0, len(rows)):
+        name, result = rows[row]
+        if result == None:
+            continue
+        values = [name, _get_loudness_str(result["integrated"], "LUFS"),
+                  _get_loudness_str(result["short_term_max"], "LUFS"),
+                  _get_loudness_str(result["true_peak"], "dBTP")]
+        for column in range(0, len(values)):
+            label = Gtk.Label(label=values[column])
+            label.set_xalign(0.0)
+            grid.attach(label, column, row + 1, 1, 1)
+
+    dialogutils.panel_ok_dialog(_("Loudness Analysis") + " - " + seq.name, grid)
+
+def _get_loudness_str(value, unit):
+    if value == float("-inf"):
+        return "-inf " + unit
+    return "%.1f %s" % (value, unit)
+
+
+# ------------------------------------------------------ normalization
+def normalize_clips_loudness():
+    """
+    Sets Volume filter levels of analyzed clips in current sequence so that clip loudness is TARGET_LOUDNESS.
+    """
+    clips = []
+    levels = []
+    not_analyzed = 0
+    for clip in _get_analyzed_clips(current_sequence()):
+        result = get_clip_result(clip)
+        if result == None:
+            not_analyzed += 1
+            continue
+        if result["integrated"] == float("-inf"):
+            continue # silent
+        gain = max(MIN_GAIN, min(MAX_GAIN, TARGET_LOUDNESS - result["integrated"]))
+        clips.append(clip)
+        levels.append("0=%.2f" % gain)
+
+    if len(clips) > 0:
+        data = {"clips":clips,
+                "levels":levels,
+                "filter_info":mltfilters.get_volume_filters_info(),
+                "filter_edit_done_func":clipeffectseditor.filter_edit_multi_done_stack_update}
+        action = edit.set_clips_volume_action(data)
+        action.do_edit()
+        updater.repaint_tline()
+
+    if not_analyzed > 0:
+        primary_txt = _("Some clips were not normalized")
+        secondary_txt = str(not_analyzed) + " " + _("clips have not been analyzed, use 'Analyze Loudness' first.")
+        dialogutils.info_message(primary_txt, secondary_txt, gui.editor_window.window)
@@ -23,7 +23,8 @@ This module handles replacing missing media items in projects
 with generated media or other available media items.
 """
 
-import glob
+import concurrent.futures
+import fnmatch
 import hashlib
 try:
     import mlt7 as mlt
@@ -50,6 +51,7 @@ import editorpersistance
 import gui
 import guiutils
 import guipopover
+import mediaprobecache
 import mltinit
 import patternproducer
 import persistance
@@ -68,6 +70,9 @@ media_assets = []
 NO_PROJECT_AT_LAUNCH = "##&&noproject&&##"
 REPLACE_TEMP_PROJECT = "replace_temp_project.flb"
 
+SCAN_THREADS = 8 # Folder listings and search root indexing are done in parallel, mostly waiting for disk.
+PARTIAL_HASH_BLOCK_SIZE = 64 * 1024
+
 def display_linker(filename=NO_PROJECT_AT_LAUNCH):
     print("Launching Media Relinker")
     FLOG = open(userfolders.get_cache_dir() + "log_media_relinker", 'w')
@@ -137,6 +142,8 @@ class MediaLinkerWindow(Gtk.Window):
 
         self.find_button = Gtk.Button(label=_("Set File Relink Path"))
         self.find_button.connect("clicked", lambda w: _set_button_pressed())
+        self.auto_relink_button = Gtk.Button(label=_("Auto Relink From Folders..."))
+        self.auto_relink_button.connect("clicked", lambda w: _auto_relink_button_pressed())
         self.create_button = Gtk.Button(label=_("Create Placeholder File"))
         self.create_button.connect("clicked", lambda w: _create_relink_media_button_pressed())
         self.delete_button = Gtk.Button(label=_("Delete File Relink Path"))
@@ -151,6 +158,8 @@ class MediaLinkerWindow(Gtk.Window):
         buttons_row = Gtk.HBox(False, 2)
         buttons_row.pack_start(self.display_combo, False, False, 0)
         buttons_row.pack_start(Gtk.Label(), True, True, 0)
+        buttons_row.pack_start(self.auto_relink_button, False, False, 0)
+        buttons_row.pack_start(guiutils.pad_label(24, 4), False, False, 0)
         buttons_row.pack_start(self.create_button, False, False, 0)
         buttons_row.pack_start(guiutils.pad_label(24, 4), False, False, 0)
         buttons_row.pack_start(self.delete_button, False, False, 0)
@@ -232,6 +241,7 @@ class MediaLinkerWindow(Gtk.Window):
         self.project_label.set_sensitive(active) 
         self.proj.set_sensitive(active) 
         self.create_button.set_sensitive(active)
+        self.auto_relink_button.set_sensitive(active)
 
     def update_files_info(self):
         found = 0
@@ -361,32 +371,72 @@ class MediaRelinkListView(Gtk.VBox):
 # ----------------------------------------------------------- logic
 class MediaAsset:
 
-    def __init__(self, orig_path, media_type, media_length=0):
+    def __init__(self, orig_path, media_type, media_length=0, folder_listings=None):
         self.orig_path = orig_path
         self.media_type = media_type
         self.length = media_length
 
-        self.orig_file_exists = os.path.isfile(orig_path)
+        if folder_listings == None:
+            folder_listings = FolderListings()
+
         if self.media_type == appconsts.IMAGE_SEQUENCE:
-            self._check_img_seq_existance(orig_path)
+            self.orig_file_exists = folder_listings.img_seq_exists(orig_path)
+        else:
+            self.orig_file_exists = folder_listings.file_exists(orig_path)
             
         self.relink_path = None
 
-    def _check_img_seq_existance(self, orig_path):
-        asset_folder, asset_file_name = os.path.split(orig_path)
-        lookup_filename = utils.get_img_seq_glob_lookup_name(asset_file_name)
-        lookup_path = asset_folder + "/" + lookup_filename          
-        listing = glob.glob(lookup_path)
 
-        if len(listing) > 0:
-            self.orig_file_exists = True
-        else:
-            self.orig_file_exists = False
-                
+class FolderListings:
+    """
+    Existence of files is checked against folder listings, each folder is listed once.
+    """
+    def __init__(self):
+        self.listings = {} # folder -> set of file names
+
+    def prefetch(self, folders):
+        # Lists folders in parallel.
+        folders = [folder for folder in set(folders) if folder not in self.listings]
+        with concurrent.futures.ThreadPoolExecutor(max_workers=SCAN_THREADS) as executor:
+            for folder, listing in zip(folders, executor.map(_list_files, folders)):
+                self.listings[folder] = listing
+
+    def get_listing(self, folder):
+        try:
+            return self.listings[folder]
+        except KeyError:
+            listing = _list_files(folder)
+            self.listings[folder] = listing
+            return listing
+
+    def file_exists(self, path):
+        folder, file_name = os.path.split(path)
+        return file_name in self.get_listing(folder)
+
+    def img_seq_exists(self, path):
+        folder, file_name = os.path.split(path)
+        lookup_filename = utils.get_img_seq_glob_lookup_name(file_name)
+        return len(fnmatch.filter(self.get_listing(folder), lookup_filename)) > 0
+
+
+def _list_files(folder):
+    files = set()
+    try:
+        with os.scandir(folder) as it:
+            for dir_entry in it:
+                try:
+                    if dir_entry.is_file():
+                        files.add(dir_entry.name)
+                except OSError:
+                    pass
+    except OSError:
+        pass
+    return files
+
 def _update_media_assets():
     # Collect all media assets used by project
     
-    new_assets = []
+    asset_data = [] # (path, media type, length)
     asset_paths = {}
             
     # Media file media assets
@@ -394,8 +444,9 @@ def _update_media_assets():
         if isinstance(media_file, patternproducer.AbstractBinClip):
             continue
         try:
-            new_assets.append(MediaAsset(media_file.path, media_file.type, media_file.length))
-            asset_paths[media_file.path] = media_file.path
+            if not(media_file.path in asset_paths):
+                asset_data.append((media_file.path, media_file.type, media_file.length))
+                asset_paths[media_file.path] = media_file.path
         except:
             print("failed loading:", media_file)
             
@@ -407,7 +458,7 @@ def _update_media_assets():
                 # Only producer clips are affected
                 if (clip.is_blanck_clip == False and (clip.media_type != appconsts.PATTERN_PRODUCER)):
                     if not(clip.path in asset_paths):
-                        new_assets.append(MediaAsset(clip.path, clip.media_type,clip.clip_out - clip.clip_in + 1))  #clip.get_length()))
+                        asset_data.append((clip.path, clip.media_type, clip.clip_out - clip.clip_in + 1))  #clip.get_length()))
                         asset_paths[clip.path] = clip.path
         # Wipe lumas
         for compositor in seq.compositors:
@@ -419,9 +470,20 @@ def _update_media_assets():
 
             if res_path != None:
                 if not(res_path in asset_paths):
-                    new_assets.append(MediaAsset(res_path, appconsts.IMAGE))
+                    asset_data.append((res_path, appconsts.IMAGE, 0))
                     asset_paths[res_path] = res_path
 
+    # Check existence of all assets using one listing per folder.
+    folder_listings = FolderListings()
+    folder_listings.prefetch([os.path.dirname(path) for path in asset_paths])
+
+    new_assets = []
+    for path, media_type, length in asset_data:
+        try:
+            new_assets.append(MediaAsset(path, media_type, length, folder_listings))
+        except:
+            print("failed loading:", path)
+
     global media_assets
     media_assets = new_assets
 
@@ -534,16 +596,259 @@ def _select_relink_path_dialog_callback(file_select, response_id, media_asset):
     linker_window.set_title( folder + " " + file_name )    
 
     # Relink all the files in a same directory
+    folder_files = _list_files(folder)
     for med_asset in media_assets:
         med_link_name = os.path.basename(med_asset.orig_path)
         link_path = os.path.join(folder, med_link_name)
-        if os.path.isfile(link_path):
+        if med_link_name in folder_files:
             if med_asset.media_type == appconsts.IMAGE_SEQUENCE: # img seqs need formatted path
                 resource_name_str = utils.get_img_seq_resource_name(link_path)
                 med_asset.relink_path = folder + "/" + resource_name_str
             else:
                 med_asset.relink_path = link_path
-            linker_window.relink_list.fill_data_model()
+
+    linker_window.relink_list.fill_data_model()
+
+# ----------------------------------------------------------- auto relink
+def _auto_relink_button_pressed():
+    dialog = Gtk.FileChooserDialog(_("Select Folders To Search Missing Media From"), linker_window, 
+                                   Gtk.FileChooserAction.SELECT_FOLDER,
+                                   (_("Cancel"), Gtk.ResponseType.CANCEL,
+                                    _("Search"), Gtk.ResponseType.ACCEPT))
+    dialog.set_select_multiple(True)
+    if last_media_dir != None:
+        dialog.set_current_folder(last_media_dir)
+    dialog.connect('response', _auto_relink_dialog_callback)
+    dialog.show()
+
+def _auto_relink_dialog_callback(dialog, response_id):
+    search_roots = dialog.get_filenames()
+    dialog.destroy()
+
+    if response_id != Gtk.ResponseType.ACCEPT or len(search_roots) == 0:
+        return
+
+    missing_assets = [asset for asset in media_assets if asset.orig_file_exists == False and asset.relink_path == None]
+    if len(missing_assets) == 0:
+        return
+
+    linker_window.msg_label.set_text(_("Searching missing media..."))
+    linker_window.auto_relink_button.set_sensitive(False)
+
+    relink_thread = AutoRelinkThread(search_roots, missing_assets)
+    relink_thread.start()
+
+
+class AutoRelinkThread(threading.Thread):
+    """
+    Indexes search roots and resolves relink paths for all missing assets in one batch.
+    """
+    def __init__(self, search_roots, missing_assets):
+        threading.Thread.__init__(self)
+        self.search_roots = search_roots
+        self.missing_assets = missing_assets
+
+    def run(self):
+        start_time = time.monotonic()
+        search_index = MediaSearchIndex(self.search_roots)
+        results = resolve_relink_paths(self.missing_assets, search_index)
+        print("Auto relink indexed", search_index.files_count, "files in", time.monotonic() - start_time, "s")
+        GLib.idle_add(_auto_relink_done, results)
+
+
+class MediaSearchIndex:
+    """
+    File name -> file paths index of all files under search roots.
+    """
+    def __init__(self, search_roots):
+        self.paths_for_name = {}
+        self.folders = {} # folder -> list of file names, used for image sequences 
+        self.files_count = 0
+
+        # Each root level folder is walked in its own thread.
+        walk_folders = []
+        for root in search_roots:
+            self._add_folder(root, list(_list_files(root)))
+            try:
+                with os.scandir(root) as it:
+                    for dir_entry in it:
+                        if dir_entry.is_dir():
+                            walk_folders.append(dir_entry.path)
+            except OSError:
+                pass
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=SCAN_THREADS) as executor:
+            for walk_results in executor.map(_walk_folder, walk_folders):
+                for folder, file_names in walk_results:
+                    self._add_folder(folder, file_names)
+
+    def _add_folder(self, folder, file_names):
+        self.folders[folder] = file_names
+        for file_name in file_names:
+            self.paths_for_name.setdefault(file_name, []).append(os.path.join(folder, file_name))
+        self.files_count += len(file_names)
+
+    def get_candidates(self, media_asset):
+        file_name = os.path.basename(media_asset.orig_path)
+        if media_asset.media_type != appconsts.IMAGE_SEQUENCE:
+            return self.paths_for_name.get(file_name, [])
+
+        # Image sequence relink paths are frame sequence resource paths in folders containing matching frames.
+        lookup_filename = utils.get_img_seq_glob_lookup_name(file_name)
+        candidates = []
+        for folder, file_names in self.folders.items():
+            if len(fnmatch.filter(file_names, lookup_filename)) > 0:
+                candidates.append(os.path.join(folder, file_name))
+        return candidates
+
+
+def _walk_folder(folder):
+    walk_results = []
+    for dir_path, dir_names, file_names in os.walk(folder):
+        walk_results.append((dir_path, file_names))
+    return walk_results
+
+def resolve_relink_paths(missing_assets, search_index):
+    """
+    Returns (resolved, ambiguous, unverified, not_found) where resolved is list of (asset, relink path) tuples,
+    ambiguous is list of (asset, candidate paths) tuples and unverified is list of (asset, relink path) tuples
+    for relinks that could not be checked against recorded file size.
+    """
+    resolved = []
+    ambiguous = []
+    unverified = []
+    not_found = []
+    fingerprints = {} # Candidates may be shared by many assets, e.g. same file name in different folders.
+    
+    for media_asset in missing_assets:
+        candidates = search_index.get_candidates(media_asset)
+        if len(candidates) == 0:
+            not_found.append(media_asset)
+            continue
+
+        # File names like 'C0001.MP4' repeat across camera cards, so candidates
+        # must have size recorded when media was last probed.
+        recorded_size = None
+        if media_asset.media_type != appconsts.IMAGE_SEQUENCE:
+            recorded_size = mediaprobecache.get_recorded_size(media_asset.orig_path)
+        if recorded_size != None:
+            candidates = [candidate for candidate in candidates if _get_file_size(candidate) == recorded_size]
+            if len(candidates) == 0:
+                not_found.append(media_asset)
+                continue
+
+        if len(candidates) == 1:
+            if recorded_size != None:
+                resolved.append((media_asset, candidates[0]))
+            else:
+                unverified.append((media_asset, candidates[0]))
+            continue
+
+        # Prefer candidates keeping most of original folder structure.
+        scores = [_get_path_suffix_match(media_asset.orig_path, candidate) for candidate in candidates]
+        best_score = max(scores)
+        best_candidates = [candidate for candidate, score in zip(candidates, scores) if score == best_score]
+        if len(best_candidates) == 1:
+            if recorded_size != None:
+                resolved.append((media_asset, best_candidates[0]))
+            else:
+                unverified.append((media_asset, best_candidates[0]))
+            continue
+
+        # Copies of same file are all valid relink targets.
+        if media_asset.media_type != appconsts.IMAGE_SEQUENCE:
+            for candidate in best_candidates:
+                if candidate not in fingerprints:
+                    fingerprints[candidate] = _get_file_fingerprint(candidate)
+            if len(set([fingerprints[candidate] for candidate in best_candidates])) == 1:
+                if recorded_size != None:
+                    resolved.append((media_asset, best_candidates[0]))
+                else:
+                    unverified.append((media_asset, best_candidates[0]))
+                continue
+
+        ambiguous.append((media_asset, best_candidates))
+
+    return (resolved, ambiguous, unverified, not_found)
+
+def _get_file_size(file_path):
+    try:
+        return os.path.getsize(file_path)
+    except OSError:
+        return None
+
+def _get_path_suffix_match(orig_path, candidate_path):
+    # Returns number of matching folder names from the end of paths.
+    orig_parts = os.path.dirname(orig_path).split("/")
+    candidate_parts = os.path.dirname(candidate_path).split("/")
+    count = 0
+    while count < len(orig_parts) and count < len(candidate_parts):
+        if orig_parts[-1 - count] != candidate_parts[-1 - count]:
+            break
+        count += 1
+    return count
+
+def _get_file_fingerprint(file_path):
+    # File size and hash of first and last blocks of file.
+    try:
+        size = os.path.getsize(file_path)
+        md5 = hashlib.md5()
+        with open(file_path, "rb") as f:
+            md5.update(f.read(PARTIAL_HASH_BLOCK_SIZE))
+            if size > PARTIAL_HASH_BLOCK_SIZE:
+                f.seek(max(PARTIAL_HASH_BLOCK_SIZE, size - PARTIAL_HASH_BLOCK_SIZE))
+                md5.update(f.read(PARTIAL_HASH_BLOCK_SIZE))
+        return (size, md5.hexdigest())
+    except OSError:
+        return (file_path, None) # Unreadable files never match other files.
+
+def _auto_relink_done(results):
+    resolved, ambiguous, unverified, not_found = results
+
+    # Unverified relinks are set too, they are listed for review.
+    for media_asset, relink_path in resolved + unverified:
+        media_asset.relink_path = relink_path
+
+    linker_window.relink_list.fill_data_model()
+    linker_window.auto_relink_button.set_sensitive(True)
+    linker_window.msg_label.set_text(_("Relinked: ") + str(len(resolved)) + ", " + 
+                                     _("Unverified: ") + str(len(unverified)) + ", " + 
+                                     _("Ambiguous: ") + str(len(ambiguous)) + ", " +
+                                     _("Not Found: ") + str(len(not_found)))
+
+    if len(ambiguous) > 0 or len(unverified) > 0:
+        _show_relinks_for_review(ambiguous, unverified)
+
+    return False
+
+def _show_relinks_for_review(ambiguous, unverified):
+    text = ""
+    if len(ambiguous) > 0:
+        text += _("Several possible files were found for these missing files, set their relink paths manually:") + "\n\n"
+        for media_asset, candidates in ambiguous:
+            text += media_asset.orig_path + "\n"
+            for candidate in candidates:
+                text += "    " + candidate + "\n"
+        text += "\n"
+
+    if len(unverified) > 0:
+        text += _("These files were relinked by name only, file sizes were not recorded and could not be checked:") + "\n\n"
+        for media_asset, relink_path in unverified:
+            text += media_asset.orig_path + "\n"
+            text += "    " + relink_path + "\n"
+
+    text_view = Gtk.TextView()
+    text_view.set_editable(False)
+    text_view.get_buffer().set_text(text)
+    scroll = Gtk.ScrolledWindow()
+    scroll.set_policy(Gtk.PolicyType.AUTOMATIC, Gtk.PolicyType.AUTOMATIC)
+    scroll.add(text_view)
+    scroll.set_size_request(800, 300)
+
+    panel = Gtk.VBox(False, 2)
+    panel.pack_start(scroll, True, True, 0)
+
+    dialogutils.panel_ok_dialog(_("Relinks To Review"), panel)
 
 def _delete_button_pressed():
     media_asset = linker_window.get_selected_media_asset()
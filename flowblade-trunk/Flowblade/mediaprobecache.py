@@ -0,0 +1,229 @@
+"""
+    Flowblade Movie Editor is a nonlinear video editor.
+    Copyright 2012 Janne Liljeblad.
+
+    This file is part of Flowblade Movie Editor <https://github.com/jliljebl/flowblade/>.
+
+    Flowblade Movie Editor is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Flowblade Movie Editor is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Flowblade Movie Editor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+"""
+Module keeps a persisted index of media file probe results.
+
+Creating MLT producer to get length and stream info of a media file can take 0.5s+
+for some files. Probe results are saved for each media file and profile, and used
+again as long as file size and modification time are unchanged.
+"""
+
+import concurrent.futures
+try:
+    import mlt7 as mlt
+except:
+    import mlt
+import os
+import pickle
+import threading
+import time
+
+import atomicfile
+import userfolders
+import utils
+
+INDEX_FILE = "media_probe_cache"
+
+PROBE_THREADS = 4
+SAVE_DELAY = 2.0 # seconds, probes done in batches are saved once
+
+_index = None # (file path, profile description) -> MediaProbe
+_sizes = None # file path -> file size when last probed, built from index
+_index_lock = threading.Lock()
+_save_timer = None
+
+_hits = 0
+_misses = 0
+_saved_time = 0.0 # seconds, sum of original probe times for hits
+_probe_time = 0.0 # seconds, sum of probe times for misses
+
+
+class MediaProbe:
+
+    def __init__(self, size, mtime, length, info, seekable, probe_time):
+        self.size = size
+        self.mtime = mtime
+        self.length = length
+        self.info = info # dict from utils.get_file_producer_info()
+        self.seekable = seekable
+        self.probe_time = probe_time
+
+    def matches_file(self, stat):
+        return self.size == stat.st_size and self.mtime == stat.st_mtime
+
+
+# ------------------------------------------------------ probing
+def get_probe(file_path, profile):
+    """
+    Returns MediaProbe for file from cache or None.
+    """
+    global _hits, _misses, _saved_time
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+
+    with _index_lock:
+        media_probe = _get_index().get((file_path, profile.description()))
+        if media_probe != None and media_probe.matches_file(stat):
+            _hits += 1
+            _saved_time += media_probe.probe_time
+            return media_probe
+        _misses += 1
+        return None
+
+def get_recorded_size(file_path):
+    """
+    Returns size of file when it was last probed with any profile or None. File does not need to exist.
+    """
+    with _index_lock:
+        return _get_sizes().get(file_path)
+
+def probe(file_path, profile):
+    """
+    Returns MediaProbe for file from cache or by creating a producer,
+    or None if MLT can not create a valid producer for file.
+    """
+    media_probe = get_probe(file_path, profile)
+    if media_probe != None:
+        return media_probe
+
+    return _probe_file(file_path, profile)
+
+def probe_files(file_paths, profile):
+    """
+    Returns dict file path -> MediaProbe or None. Files not in cache are probed in parallel.
+    """
+    probes = {}
+    misses = []
+    for file_path in file_paths:
+        media_probe = get_probe(file_path, profile)
+        if media_probe != None:
+            probes[file_path] = media_probe
+        else:
+            misses.append(file_path)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=PROBE_THREADS) as executor:
+        for file_path, media_probe in zip(misses, executor.map(lambda path: _probe_file(path, profile), misses)):
+            probes[file_path] = media_probe
+
+    return probes
+
+def _probe_file(file_path, profile):
+    start_time = time.monotonic()
+    producer = mlt.Producer(profile, str(file_path))
+    return add_producer_probe(file_path, profile, producer, start_time)
+
+def add_producer_probe(file_path, profile, producer, start_time=None):
+    """
+    Saves probe data from already created producer and returns it as MediaProbe,
+    or returns None if producer is not valid.
+    """
+    global _probe_time
+    if start_time == None:
+        start_time = time.monotonic()
+    if producer.is_valid() == False:
+        return None
+
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+
+    length = producer.get_length()
+    info = utils.get_file_producer_info(producer)
+    seekable = (producer.get("seekable") != "0")
+    probe_time = time.monotonic() - start_time
+
+    media_probe = MediaProbe(stat.st_size, stat.st_mtime, length, info, seekable, probe_time)
+    with _index_lock:
+        _get_index()[(file_path, profile.description())] = media_probe
+        _get_sizes()[file_path] = stat.st_size
+        _probe_time += probe_time
+    _schedule_save()
+
+    return media_probe
+
+
+# ------------------------------------------------------ index
+def _get_index():
+    global _index
+    if _index == None:
+        try:
+            _index = utils.unpickle(userfolders.get_cache_dir() + INDEX_FILE)
+        except:
+            _index = {}
+    return _index
+
+def _get_sizes():
+    global _sizes
+    if _sizes == None:
+        _sizes = {}
+        for (file_path, profile_desc), media_probe in _get_index().items():
+            _sizes[file_path] = media_probe.size
+    return _sizes
+
+def _schedule_save():
+    global _save_timer
+    with _index_lock:
+        if _save_timer != None:
+            return
+        _save_timer = threading.Timer(SAVE_DELAY, save)
+        _save_timer.daemon = True
+        _save_timer.start()
+
+def save():
+    global _save_timer
+    with _index_lock:
+        _save_timer = None
+        index = dict(_get_index())
+    with atomicfile.AtomicFileWriter(userfolders.get_cache_dir() + INDEX_FILE, "wb") as afw:
+        write_file = afw.get_file()
+        pickle.dump(index, write_file)
+
+
+# ------------------------------------------------------ stats
+def reset_stats():
+    global _hits, _misses, _saved_time, _probe_time
+    with _index_lock:
+        _hits = 0
+        _misses = 0
+        _saved_time = 0.0
+        _probe_time = 0.0
+
+def get_stats():
+    """
+    Returns (hits, misses, hit rate, seconds saved, seconds probing) tuple.
+    """
+    with _index_lock:
+        requests = _hits + _misses
+        if requests > 0:
+            hit_rate = float(_hits) / float(requests)
+        else:
+            hit_rate = 0.0
+        return (_hits, _misses, hit_rate, _saved_time, _probe_time)
+
+def print_stats():
+    hits, misses, hit_rate, saved_time, probe_time = get_stats()
+    if hits + misses == 0:
+        return
+    print("Media probe cache hits:", hits, "misses:", misses, "hit rate: %.2f" % hit_rate,
+          "time saved: %.2fs" % saved_time, "probing: %.2fs" % probe_time)
@@ -30,14 +30,15 @@ try:
 except:
     import mlt
     
-import xml.dom.minidom
 
 import appconsts
 import editorstate
 from editorstate import PROJECT
+import framecache
 import mltrefhold
 import propertyparse
 import respaths
+import startupinit
 import translations
 
 # Attr and node names in xml describing available filters.
@@ -219,6 +220,7 @@ class FilterObject:
              self.mlt_filter.set("disable", str(0))
         else:
              self.mlt_filter.set("disable", str(1))
+        framecache.sequence_changed()
 
     def replace_values(self, clip):
         # We need to initialize some values based clip length and need wait until clip for
@@ -337,6 +339,7 @@ class MultipartFilterObject:
         else:
             for f in self.mlt_filters:
                 f.set("disable", str(1))
+        framecache.sequence_changed()
 
 # -------------------------------------------------------------------- init
 def load_filters_xml(services):
@@ -349,7 +352,7 @@ def load_filters_xml(services):
     print("Loading filters...")
     
     global filters_doc
-    filters_doc = xml.dom.minidom.parse(respaths.FILTERS_XML_DOC)
+    filters_doc = startupinit.parse_xml(respaths.FILTERS_XML_DOC)
 
     load_groups = {}
     filter_nodes = filters_doc.getElementsByTagName(FILTER)
@@ -435,7 +438,7 @@ def clone_filter_object(filter_object, mlt_profile):
 
 def replace_services(services):
     
-    replacements_doc = xml.dom.minidom.parse(respaths.REPLACEMENTS_XML_DOC)
+    replacements_doc = startupinit.parse_xml(respaths.REPLACEMENTS_XML_DOC)
 
     # Build dict that has enough info to enable deleting and finding filters by name
     filters_dict = {}
@@ -32,6 +32,7 @@ except:
 import os
 import time
 
+import framecache
 import gui
 from editorstate import timeline_visible
 import editorpersistance
@@ -62,6 +63,7 @@ class Player:
         self.last_slowmo_seektime = 0.0
         self.slowmo_ticker = None
         self.consumer = None
+        self.producer_generation = 0 # Frame cache key part, incremented when displayed producer changes.
             
     def init_for_profile(self, profile):
         # Get profile and create ticker for playback GUI updates
@@ -130,6 +132,8 @@ class Player:
         """
         self.tracktor_producer = tractor
         self.producer = tractor
+        self.producer_generation += 1
+        framecache.sequence_changed()
        
     def display_tractor_producer(self):
         self.producer = self.tracktor_producer
@@ -350,13 +354,21 @@ class Player:
         # GUI update path starts here.
         if update_gui:
             updater.update_frame_displayers(frame)
-            
-        frame = self.producer.get_frame()
+
+        # Tools like Titler and Rotomask request same frames repeatedly. 
+        key = (self.producer_generation, frame, self.profile.width(), self.profile.height())
+        rgb = framecache.player_frames.get(key)
+        if rgb != None:
+            return rgb
+
+        generation = framecache.player_frames.generation
+        mlt_frame = self.producer.get_frame()
         # And make sure we deinterlace if input is interlaced.
-        frame.set("consumer_deinterlace", 1)
+        mlt_frame.set("consumer_deinterlace", 1)
 
         # Now we are ready to get the image and save it.        
-        rgb = frame.get_image(int(mlt.mlt_image_rgba), int(self.profile.width()), int(self.profile.height()))
+        rgb = mlt_frame.get_image(int(mlt.mlt_image_rgba), int(self.profile.width()), int(self.profile.height()))
+        framecache.player_frames.put(key, rgb, generation)
         return rgb
 
     def display_inside_sequence_length(self, new_seq_len):
@@ -376,7 +388,7 @@ class Player:
         if loop_clips and current_frame >= self.get_active_length() and timeline_visible() == False: # Looping for clips
             self.seek_frame(0, False) #NOTE: False==GUI not updated
             self.producer.set_speed(1)
-            updater.update_frame_displayers(current_frame)
+            updater.update_playback_frame_displayers(current_frame)
             return
 
         # Stop ticker if playback has stopped.
@@ -398,13 +410,13 @@ class Player:
 
         # Frame displayers update
         if timeline_visible() == False:
-            updater.update_frame_displayers(current_frame)
+            updater.update_playback_frame_displayers(current_frame)
         else:
             # If prefs set and frame out tline view, move tline view
             range_moved = updater.maybe_move_playback_tline_range(current_frame) # range_moved flag returned just to avoid two updates
             if range_moved == False:
                 # Just display tline
-                updater.update_frame_displayers(current_frame)
+                updater.update_playback_frame_displayers(current_frame)
         
     def get_active_length(self):
         # Displayed range is different
@@ -29,7 +29,6 @@ try:
 except:
     import mlt
 import os
-import xml.dom.minidom
 
 import appconsts
 from editorstate import PROJECT
@@ -37,6 +36,7 @@ import mltrefhold
 import mltfilters
 import propertyparse
 import respaths
+import startupinit
 
 # Attr and node names in compositors.xml
 NAME = appconsts.NAME
@@ -328,6 +328,7 @@ class CompositorObject:
         self.clip_in = -1 # ducktyping for clip for property editors
         self.clip_out = -1 # ducktyping for clip for property editors
         self.planted = False
+        self.plant_index = -1 # Order of planting in field, set when planted.
         self.compositor_index = None
         self.name = None # ducktyping as clip for property editors
         self.selected = False
@@ -392,7 +393,7 @@ def load_compositors_xml(transitions):
     Load filters document and create MLTCompositorInfo objects and
     put them in dict mlt_compositor_infos with names as keys.
     """
-    compositors_doc = xml.dom.minidom.parse(respaths.COMPOSITORS_XML_DOC)
+    compositors_doc = startupinit.parse_xml(respaths.COMPOSITORS_XML_DOC)
 
     print("Loading transitions...")
     compositor_nodes = compositors_doc.getElementsByTagName(COMPOSITOR)
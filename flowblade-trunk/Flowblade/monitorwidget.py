@@ -33,6 +33,7 @@ import appconsts
 import cairoarea
 import editorstate
 from editorstate import PLAYER
+import framecache
 from editorstate import PROJECT
 import respaths
 import utils
@@ -69,6 +70,11 @@ _last_render_time = 0.0
 _producer = None
 _consumer = None
 _frame_write_on = False
+
+# Decoded match frames for Roll and Slip trim views, filled ahead of mouse by prefetcher.
+_match_frames = framecache.FrameCache("match frame", framecache.MATCH_FRAME_CACHE_MAX_BYTES)
+_match_prefetcher = None
+_match_decode_lock = threading.Lock()
             
 _widget = None
 
@@ -174,7 +180,8 @@ class MonitorWidget:
             pass
         
         self.match_frame_surface = None
-                
+        _stop_match_prefetch()
+
         self.view = DEFAULT_VIEW
         
         self.left_display.set_pref_size(1, 1)
@@ -857,6 +864,7 @@ class MonitorMatchFrameWriter(threading.Thread):
         if _widget.view != START_TRIM_VIEW and _widget.view != END_TRIM_VIEW:
             _producer = producer
             _consumer = consumer
+            _start_match_prefetch(producer)
 
         # Connect and write image
         consumer.connect(producer)
@@ -881,19 +889,17 @@ class MatchSurfaceCreator(threading.Thread):
             print("MatchSurfaceCreator: waiting for _producer")
             time.sleep(0.01)
             
-        image_producer = _producer.cut(int(self.match_frame), int(self.match_frame))
-        image_producer.set_speed(0)
-        image_producer.seek(0)
-        
-        # Get MLT rgb frame data
-        frame = image_producer.get_frame()
-        # And make sureto deinterlace if input is interlaced
-        frame.set("consumer_deinterlace", 1)
         size = _widget.get_match_frame_panel_size()
-        mlt_rgb = frame.get_image(mlt.mlt_image_rgba, *size) 
-   
+        if _match_prefetcher != None:
+            _match_prefetcher.scrub_position(self.match_frame)
+
+        cairo_buf = _match_frames.get((self.match_frame, size))
+        if cairo_buf is None:
+            generation = _match_frames.generation
+            cairo_buf = _decode_match_frame(_producer, self.match_frame, size)
+            _match_frames.put((self.match_frame, size), cairo_buf, generation)
+
         # Create cairo surface
-        cairo_buf = _widget._get_cairo_buf_from_mlt_rgb(mlt_rgb, *size)
         img_w, img_h = size
         stride = cairo.ImageSurface.format_stride_for_width(cairo.FORMAT_RGB24, img_w)
         surface = cairo.ImageSurface.create_for_data(cairo_buf, cairo.FORMAT_RGB24, img_w, img_h, stride)
@@ -905,3 +911,39 @@ class MatchSurfaceCreator(threading.Thread):
 
         
         
+
+
+# ---------------------------------------------------------------------------------- match frame cache
+def _decode_match_frame(producer, match_frame, size):
+    with _match_decode_lock:
+        image_producer = producer.cut(int(match_frame), int(match_frame))
+        image_producer.set_speed(0)
+        image_producer.seek(0)
+        
+        # Get MLT rgb frame data
+        frame = image_producer.get_frame()
+        # And make sure to deinterlace if input is interlaced
+        frame.set("consumer_deinterlace", 1)
+        mlt_rgb = frame.get_image(mlt.mlt_image_rgba, *size) 
+
+    return _widget._get_cairo_buf_from_mlt_rgb(mlt_rgb, *size)
+
+def _start_match_prefetch(producer):
+    # Roll and Slip trims scrub match frame with mouse, frames ahead of
+    # mouse move direction are decoded in background.
+    global _match_prefetcher
+    _stop_match_prefetch()
+    _match_frames.invalidate()
+    
+    size = _widget.get_match_frame_panel_size()
+    _match_prefetcher = framecache.ScrubPrefetcher(_match_frames, 
+                                                   lambda f: (f, size),
+                                                   lambda f: _decode_match_frame(producer, f, size),
+                                                   0, producer.get_length() - 1)
+    _match_prefetcher.start()
+
+def _stop_match_prefetch():
+    global _match_prefetcher
+    if _match_prefetcher != None:
+        _match_prefetcher.stop()
+        _match_prefetcher = None
@@ -137,6 +137,9 @@ def _general_options_panel():
     disk_cache_warning_combo.append_text(_("1 GB"))
     disk_cache_warning_combo.append_text(_("2 GB"))
     disk_cache_warning_combo.set_active(prefs.disk_space_warning)
+
+    disk_cache_auto_prune_check = Gtk.CheckButton()
+    disk_cache_auto_prune_check.set_active(prefs.disk_cache_auto_prune)
     
     # Layout
     row1 = _row(guiutils.get_two_column_box(Gtk.Label(label=_("Default Profile:")), default_profile_combo, PREFERENCES_LEFT))
@@ -147,6 +150,7 @@ def _general_options_panel():
     row9 = _row(guiutils.get_two_column_box(Gtk.Label(label=_("Media look-up order on load:")), load_order_combo, PREFERENCES_LEFT))
     row10 = _row(guiutils.get_two_column_box(Gtk.Label(label=_("Default render directory:")), render_folder_select, PREFERENCES_LEFT))
     row11 = _row(guiutils.get_two_column_box(Gtk.Label(label=_("Warning on Disk Cache Size:")), disk_cache_warning_combo, PREFERENCES_LEFT))
+    row12 = _row(guiutils.get_checkbox_row_box(disk_cache_auto_prune_check, Gtk.Label(label=_("Remove least recently used Thumbnails and Audio Levels when over warning size"))))
 
     vbox = Gtk.VBox(False, 2)
     vbox.pack_start(row1, False, False, 0)
@@ -157,13 +161,15 @@ def _general_options_panel():
     vbox.pack_start(row3, False, False, 0)
     vbox.pack_start(row9, False, False, 0)
     vbox.pack_start(row11, False, False, 0)
+    vbox.pack_start(row12, False, False, 0)
     vbox.pack_start(Gtk.Label(), True, True, 0)
 
     guiutils.set_margins(vbox, 12, 0, 12, 12)
 
     # Aug-2019 - SvdB - AS - Added autosave_combo
     return vbox, ( default_profile_combo, open_in_last_opened_check, open_in_last_rendered_check,
-                    undo_max_spin, load_order_combo, autosave_combo, render_folder_select, disk_cache_warning_combo)
+                    undo_max_spin, load_order_combo, autosave_combo, render_folder_select, disk_cache_warning_combo,
+                    disk_cache_auto_prune_check)
 
 def _edit_prefs_panel():
     prefs = editorpersistance.prefs
@@ -431,25 +437,42 @@ def _performance_panel():
     perf_drop_frames = Gtk.CheckButton()
     perf_drop_frames.set_active(prefs.perf_drop_frames)
 
+    idle_proxy_budget_combo = Gtk.ComboBoxText()
+    idle_proxy_budget_combo.append_text(_("Off"))
+    idle_proxy_budget_combo.append_text(_("2 GB"))
+    idle_proxy_budget_combo.append_text(_("5 GB"))
+    idle_proxy_budget_combo.append_text(_("10 GB"))
+    idle_proxy_budget_combo.append_text(_("20 GB"))
+    idle_proxy_budget_combo.set_active(prefs.idle_proxy_disk_budget)
+
+    smart_render_check = Gtk.CheckButton()
+    smart_render_check.set_active(prefs.smart_render)
+
     # Tooltips
     perf_render_threads.set_tooltip_text(_("Between 1 and the number of CPU Cores"))
     perf_drop_frames.set_tooltip_text(_("Allow Frame Dropping for real-time rendering, when needed"))
+    idle_proxy_budget_combo.set_tooltip_text(_("Proxy files for media that is slow to decode are created when application is idle,\nuntil proxy files folder reaches this size"))
+    smart_render_check.set_tooltip_text(_("Parts of timeline that show source media unchanged are copied to render file\nwithout re-encoding when source media matches render encoding"))
 
     # Layout
     row0 = _row(guiutils.get_left_justified_box([warning_icon, warning_label]))
     row1 = _row(guiutils.get_two_column_box(Gtk.Label(label=_("Render Threads:")), perf_render_threads, PREFERENCES_LEFT))
     row2 = _row(guiutils.get_checkbox_row_box(perf_drop_frames, Gtk.Label(label=_("Allow Frame Dropping"))))
+    row3 = _row(guiutils.get_two_column_box(Gtk.Label(label=_("Idle Time Proxy Files Disk Budget:")), idle_proxy_budget_combo, PREFERENCES_LEFT))
+    row4 = _row(guiutils.get_checkbox_row_box(smart_render_check, Gtk.Label(label=_("Copy Unchanged Media Segments When Rendering"))))
 
     vbox = Gtk.VBox(False, 2)
     vbox.pack_start(row0, False, False, 0)
     vbox.pack_start(guiutils.pad_label(12, 12), False, False, 0)
     vbox.pack_start(row1, False, False, 0)
     vbox.pack_start(row2, False, False, 0)
+    vbox.pack_start(row3, False, False, 0)
+    vbox.pack_start(row4, False, False, 0)
     vbox.pack_start(Gtk.Label(), True, True, 0)
 
     guiutils.set_margins(vbox, 12, 0, 12, 12)
 
-    return vbox, (perf_render_threads, perf_drop_frames)
+    return vbox, (perf_render_threads, perf_drop_frames, idle_proxy_budget_combo, smart_render_check)
 
 def _jog_shuttle_panel():
     prefs = editorpersistance.prefs
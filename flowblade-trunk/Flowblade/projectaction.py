@@ -46,6 +46,7 @@ from gi.repository import Gtk
 from gi.repository import Gdk
 from gi.repository import GLib
 
+import analysiscache
 import audiowaveformrenderer
 import appconsts
 import batchrendering
@@ -76,6 +77,7 @@ import kftoolmode
 import medialinker
 import medialog
 import mediaplugin
+import mediaprobecache
 import modesetting
 import movemodes
 import mltprofiles
@@ -92,6 +94,7 @@ import render
 import renderconsumer
 import rendergui
 import sequence
+import sequencesegments
 import tlinewidgets
 import undo
 import updater
@@ -428,23 +431,31 @@ class UpdateMediaLengthsThread(threading.Thread):
         self.dialog = dialog
 
     def run(self):
+        # Media lengths are probed here after project load, stats are printed for this pass only.
+        mediaprobecache.reset_stats()
+
+        media_files = []
         for key, media_file in PROJECT().media_files.items():
             if media_file.type == appconsts.VIDEO or media_file.type == appconsts.IMAGE_SEQUENCE:
-                guiutils.update_text_idle(self.dialog.info, media_file.name)
-        
-                producer = mlt.Producer(PROJECT().profile, str(media_file.path))
-                if producer.is_valid() == False:
-                    print("not valid producer")
-                    continue
+                media_files.append(media_file)
 
-                length = producer.get_length()
-                media_file.length = length
+        guiutils.update_text_idle(self.dialog.info, str(len(media_files)) + " " + _("files"))
+        probes = mediaprobecache.probe_files([media_file.path for media_file in media_files], PROJECT().profile)
+
+        for media_file in media_files:
+            media_probe = probes[media_file.path]
+            if media_probe == None:
+                print("not valid producer")
+                continue
+
+            media_file.length = media_probe.length
                 
         PROJECT().update_media_lengths_on_load = False
         
         GLib.idle_add(dialogutils.dialog_destroy, self.dialog, None)
         
         print("Updating media lengths done.")
+        mediaprobecache.print_stats()
         
 def _duplicates_info(duplicates):
     primary_txt = _("Media files already present in project were opened!")
@@ -1684,8 +1695,9 @@ def create_sequence_link_container_clip_from_selected():
     uuid_str = hashlib.md5(str(os.urandom(32)).encode('utf-8')).hexdigest()
     write_file = folder + uuid_str + ".xml"
     
+    segment_signatures = sequencesegments.get_segment_signatures(selected_sequence)
     render_player = renderconsumer.XMLRenderPlayer( write_file, _sequence_link_xml_render_done_callback, 
-                                                    (selected_sequence, write_file, media_name), selected_sequence, 
+                                                    (selected_sequence, write_file, media_name, segment_signatures), selected_sequence, 
                                                     PROJECT(), PLAYER())
     render_player.start()
 
@@ -1741,19 +1753,19 @@ def _do_create_sequence_link_container(dialog, response_id, data):
     uuid_str = hashlib.md5(str(os.urandom(32)).encode('utf-8')).hexdigest()
     write_file = folder + uuid_str + ".xml"
     
+    segment_signatures = sequencesegments.get_segment_signatures(selected_sequence)
     render_player = renderconsumer.XMLRenderPlayer( write_file, _sequence_link_xml_render_done_callback, 
-                                                    (selected_sequence, write_file, media_name), selected_sequence, 
+                                                    (selected_sequence, write_file, media_name, segment_signatures), selected_sequence, 
                                                     PROJECT(), PLAYER())
     render_player.start()
 
 def _sequence_link_xml_render_done_callback(data):
     # We do GUI updates on add, so we need GLib thread.
-    selected_sequence, write_file, media_name = data
     GLib.idle_add(_do_sequence_link_item_add, data)
 
 def _do_sequence_link_item_add(data):
-    selected_sequence, xml_file_path, media_name = data
-    containerclip.create_sequence_link_media_item(xml_file_path, media_name, selected_sequence.uid)
+    selected_sequence, xml_file_path, media_name, segment_signatures = data
+    containerclip.create_sequence_link_media_item(xml_file_path, media_name, selected_sequence.uid, segment_signatures)
     
 def append_all_media_clips_into_timeline():
     media_files = []
@@ -2501,7 +2513,7 @@ def media_file_menu_item_selected(action, variant, data):
     if item_id == "Render Proxy File":
         proxyediting.create_proxy_menu_item_selected(media_file)
     if item_id == "Recreate Icon":
-        (icon_path, length, info) = projectdata.thumbnailer.write_image(media_file.path)
+        (icon_path, length, info) = projectdata.thumbnailer.write_image(media_file.path, False)
         media_file.info = info
         media_file.icon_path = icon_path
         media_file.create_icon()
@@ -2638,7 +2650,7 @@ def _stabilizing_dialog_callback(dialog, response_id, stab_widgets, media_file):
     profile_desc = PROJECT().profile_desc.replace(" ", "_")
     clip_path = media_file.path
     if media_file.is_proxy_file:
-        folder, clip_path = os.path.split(media_file.second_file_path)
+        clip_path = media_file.second_file_path
 
     # Parameters for stabilizing data render.
     accuracy = stab_widgets.accuracy.get_adjustment().get_value()
@@ -2676,7 +2688,15 @@ def _stabilizing_dialog_callback(dialog, response_id, stab_widgets, media_file):
             "smoothing:" + str(smoothing),
             "zoom:" + str(zoom))
 
+    params = (shakiness, accuracy, smoothing, zoom)
+    analysis_key = analysiscache.get_analysis_key(analysiscache.STABILIZE_ANALYSIS, clip_path, None, None, params, profile_desc)
+    results_file = analysiscache.get_results_file(analysis_key)
+    if results_file != None:
+        _stabilizing_data_render_complete(media_file, render_params, results_file)
+        return
+
     job = jobs.StablizedMediaItemDataRenderJobQueueObject(session_id, media_file, render_params, _stabilizing_data_render_complete, args)
+    job.analysis_key = analysis_key
     job.add_to_queue()
     
 def _stabilizing_data_render_complete(media_file, render_params, results_file):
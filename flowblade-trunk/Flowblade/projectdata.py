@@ -31,11 +31,14 @@ except:
 import hashlib
 import os
 import shutil
+import time
 
 from gi.repository import GdkPixbuf
 
 import appconsts
+import diskcacheledger
 import editorpersistance
+import mediaprobecache
 from editorstate import PROJECT
 import mltprofiles
 import patternproducer
@@ -68,7 +71,8 @@ thumbnailer = None
 _project_properties_default_values = {appconsts.P_PROP_TLINE_SHRINK_VERTICAL:False, # Shink timeline max height if < 9 tracks
                                       appconsts.P_PROP_LAST_RENDER_SELECTIONS: None, # tuple for last render selections data
                                       appconsts.P_PROP_TRANSITION_ENCODING: None, # tuple for last rendered transition render selections data
-                                      appconsts.P_PROP_DEFAULT_FADE_LENGTH: 10}  
+                                      appconsts.P_PROP_DEFAULT_FADE_LENGTH: 10,
+                                      appconsts.P_PROP_IDLE_PROXIES: None} # list of proxies created by proxyscheduler.py
 
 # Flag used to decide if user should be prompt to save project on project exit.
 media_files_changed_since_last_save = False
@@ -620,7 +624,7 @@ class Thumbnailer:
     def set_context(self, profile):
         self.profile = profile
     
-    def write_image(self, file_path):
+    def write_image(self, file_path, use_cache=True):
         """
         Writes thumbnail image from file producer
         """
@@ -629,6 +633,12 @@ class Thumbnailer:
         thumbnail_path = userfolders.get_thumbnail_dir() + md_str + ".png"
         render_image_path = userfolders.get_cache_dir() + "thumbnail%03d.png"
 
+        # Unchanged files with existing thumbnail don't need a producer.
+        if use_cache == True:
+            media_probe = mediaprobecache.get_probe(file_path, self.profile)
+            if media_probe != None and _thumbnail_is_current(thumbnail_path, file_path):
+                return (thumbnail_path, media_probe.length, media_probe.info)
+
         # Create consumer
         consumer = mlt.Consumer(self.profile, "avformat", 
                                      render_image_path)
@@ -636,12 +646,17 @@ class Thumbnailer:
         consumer.set("vcodec", "png")
 
         # Create one frame producer
+        start_time = time.monotonic()
         producer = mlt.Producer(self.profile, str(file_path))
         if producer.is_valid() == False:
             msg = _("MLT reports that file is not a valid media producer.")
             raise ProducerNotValidError(msg, file_path)
             
-        info = utils.get_file_producer_info(producer)
+        media_probe = mediaprobecache.add_producer_probe(file_path, self.profile, producer, start_time)
+        if media_probe != None:
+            info = media_probe.info
+        else:
+            info = utils.get_file_producer_info(producer)
 
         length = producer.get_length()
         frame = length // 2
@@ -652,7 +667,9 @@ class Thumbnailer:
         consumer.run()
         
         # consumer.run() blocks until done so the thubnailfile is now ready to be copied.
+        previous_size = diskcacheledger.get_file_size(thumbnail_path)
         shutil.copyfile(userfolders.get_cache_dir() + "thumbnail001.png", thumbnail_path)
+        diskcacheledger.file_written(thumbnail_path, previous_size)
         
         return (thumbnail_path, length, info)
 
@@ -660,11 +677,20 @@ class Thumbnailer:
         # This is used for audio files which don't need a thumbnail written
         # but do need file length known
 
-        producer = mlt.Producer(self.profile, str(file_path))
-        if producer.get("seekable") == "0":
+        media_probe = mediaprobecache.probe(file_path, self.profile)
+        if media_probe == None:
+            msg = _("MLT reports that file is not a valid media producer.")
+            raise ProducerNotValidError(msg, file_path)
+        if media_probe.seekable == False:
             msg = _("Audio file not seekable, cannot be edited.\n\n")
             raise ProducerNotValidError(msg, file_path)
-        return producer.get_length()
+        return media_probe.length
+
+def _thumbnail_is_current(thumbnail_path, file_path):
+    try:
+        return os.path.getmtime(thumbnail_path) >= os.path.getmtime(file_path)
+    except OSError:
+        return False
 
 
 # ----------------------------------- project and media log events
@@ -34,6 +34,7 @@ from gi.repository import Gtk
 import animatedvalue
 import appconsts
 from editorstate import current_sequence
+import framecache
 import mlttransitions
 import mltfilters
 import propertyparse
@@ -206,6 +207,45 @@ def get_non_mlt_editable_properties(clip, filter_object, filter_index, track, cl
     
     return editable_properties
 
+# -------------------------------------------- keyframes string building
+class KeyframesStringBuilder:
+    """
+    Builds keyframes property value strings. Encoded keyframe strings are cached
+    so that when e.g. a single keyframe is being edited only that keyframe gets
+    re-encoded when the value string is rebuilt.
+
+    encode_func(kf) returns keyframe string, key_func(kf) returns a hashable
+    value that changes when keyframe string changes, default is keyframe itself.
+    """
+    def __init__(self, encode_func, key_func=None, separator=";"):
+        self.encode_func = encode_func
+        self.key_func = key_func
+        self.separator = separator
+        self.encoded = {}
+
+    def build(self, keyframes):
+        encoded = {}
+        parts = []
+        for kf in keyframes:
+            if self.key_func == None:
+                key = kf
+            else:
+                key = self.key_func(kf)
+            try:
+                kf_str = self.encoded[key]
+            except KeyError:
+                kf_str = self.encode_func(kf)
+            encoded[key] = kf_str
+            parts.append(kf_str)
+        self.encoded = encoded
+        return self.separator.join(parts)
+
+def _rect_kf_key(kf):
+    # Geometry keyframes have rect as list that is edited in place.
+    frame, rect, opac, kf_type = kf
+    return (frame, tuple(rect), opac, kf_type)
+
+
 # -------------------------------------------- property wrappers objs
 class AbstractProperty:
     """
@@ -224,6 +264,8 @@ class AbstractProperty:
         self.track = None # set in creator loops
         self.clip_index = None # set in creator loops
         self.name = None # mlt property name. set by extending classes
+        self.kf_str_builder = None # KeyframesStringBuilder, created by extending classes on first keyframes write
+        self.live_write = False # When True only MLT value is written, persistent value is written with commit_value()
         self._set_input_range()
         self._set_output_range()
     
@@ -348,6 +390,21 @@ class AbstractProperty:
         edited with keyframe editor.
         """
         print("write_out_keyframes() not overridden")
+
+    def write_keyframes_value(self, str_value):
+        # Keyframe editors set 'live_write' while drag updates are being done.
+        if self.live_write == True:
+            self.write_mlt_property_str_value(str_value)
+            self.value = str_value
+        else:
+            self.write_value(str_value)
+
+    def commit_value(self):
+        """
+        Writes current value to persistent python object after live writes.
+        Properties that do not do live writes have nothing to commit.
+        """
+        pass
         
     def get_clip_length(self):
         return self.clip.clip_out - self.clip.clip_in + 1
@@ -423,6 +480,7 @@ class EditableProperty(AbstractProperty):
         # mlt property value
         filter_object = self._get_filter_object()
         filter_object.mlt_filter.set(str(self.name), str(str_value))
+        framecache.sequence_changed()
         
     def write_filter_object_property(self, str_value):
         # Persistent python object
@@ -430,6 +488,9 @@ class EditableProperty(AbstractProperty):
         prop = (str(self.name), str(str_value), self.type)
         filter_object.properties[self.property_index] = prop
 
+    def commit_value(self):
+        self.write_filter_object_property(self.value)
+
 
 class TransitionEditableProperty(AbstractProperty):
     """
@@ -463,12 +524,16 @@ class TransitionEditableProperty(AbstractProperty):
 
     def write_mlt_property_str_value(self, str_value):
         self.transition.mlt_transition.set(str(self.name), str(str_value))
+        framecache.sequence_changed()
         
     def write_transition_object_property(self, str_value):
         # Persistent python object
         prop = (str(self.name), str(str_value), self.type)
         self.transition.properties[self.property_index] = prop
 
+    def commit_value(self):
+        self.write_transition_object_property(self.value)
+
 
 class NonMltEditableProperty(AbstractProperty):
     """
@@ -640,16 +705,17 @@ class OpacityInGeomKeyframeProperty(TransitionEditableProperty):
 
     def write_out_keyframes(self, keyframes):
         # key frame array of tuples (frame, opacity)
-        val_str = ""
-        for kf in keyframes:
-            frame, opac = kf
-            val_str += str(int(frame)) + "=" # frame
-            val_str += "0/0:" # pos
-            val_str += str(self.screen_size_str) + ":" # size
-            val_str += str(self.get_out_value(opac)) + ";" # opac with converted range from slider
-        
-        val_str = val_str.strip(";")
-        self.write_value(val_str)
+        if self.kf_str_builder == None:
+            self.kf_str_builder = KeyframesStringBuilder(self._get_keyframe_str)
+        self.write_keyframes_value(self.kf_str_builder.build(keyframes))
+
+    def _get_keyframe_str(self, kf):
+        frame, opac = kf
+        val_str = str(int(frame)) + "=" # frame
+        val_str += "0/0:" # pos
+        val_str += str(self.screen_size_str) + ":" # size
+        val_str += str(self.get_out_value(opac)) # opac with converted range from slider
+        return val_str
 
 
 class LUTTableProperty(EditableProperty):
@@ -700,19 +766,20 @@ class KeyFrameGeometryOpacityProperty(TransitionEditableProperty):
 
     def write_out_keyframes(self, keyframes):
         # key frame array of tuples (frame, [x, y, width, height], opacity)
-        val_str = ""
-        for kf in keyframes:
-            frame, rect, opac, kf_type = kf
-            
-            eq_str = animatedvalue.TYPE_TO_EQ_STRING[kf_type]
-                        
-            val_str += str(int(frame)) + eq_str # frame
-            val_str += str(int(rect[0])) + "/" + str(int(rect[1])) + ":" # pos
-            val_str += str(int(rect[2])) + "x" + str(int(rect[3])) + ":" # size
-            val_str += str(self.get_out_value(opac)) + ";" # opac with converted range from slider
+        if self.kf_str_builder == None:
+            self.kf_str_builder = KeyframesStringBuilder(self._get_keyframe_str, _rect_kf_key)
+        self.write_keyframes_value(self.kf_str_builder.build(keyframes))
+
+    def _get_keyframe_str(self, kf):
+        frame, rect, opac, kf_type = kf
         
-        val_str = val_str.strip(";")
-        self.write_value(val_str)
+        eq_str = animatedvalue.TYPE_TO_EQ_STRING[kf_type]
+                    
+        val_str = str(int(frame)) + eq_str # frame
+        val_str += str(int(rect[0])) + "/" + str(int(rect[1])) + ":" # pos
+        val_str += str(int(rect[2])) + "x" + str(int(rect[3])) + ":" # size
+        val_str += str(self.get_out_value(opac)) # opac with converted range from slider
+        return val_str
 
 
 class KeyFrameFilterGeometryRectProperty(EditableProperty):
@@ -725,20 +792,21 @@ class KeyFrameFilterGeometryRectProperty(EditableProperty):
         
     def write_out_keyframes(self, keyframes):
         # key frame array of tuples (frame, [x, y, width, height], opacity)
-        val_str = ""
-        for kf in keyframes:
-            frame, rect, opac, kf_type = kf
-            
-            eq_str = animatedvalue.TYPE_TO_EQ_STRING[kf_type]
-                        
-            val_str += str(int(frame)) + eq_str # frame
-            val_str += str(int(rect[0])) + " " + str(int(rect[1])) + " " # pos
-            val_str += str(int(rect[2])) + " " + str(int(rect[3])) + " " # size
-            val_str += "1"
-            val_str += str(self.get_out_value(opac)) + ";" # opac with converted range from slider
+        if self.kf_str_builder == None:
+            self.kf_str_builder = KeyframesStringBuilder(self._get_keyframe_str, _rect_kf_key)
+        self.write_keyframes_value(self.kf_str_builder.build(keyframes))
 
-        val_str = val_str.strip(";")
-        self.write_value(val_str)
+    def _get_keyframe_str(self, kf):
+        frame, rect, opac, kf_type = kf
+        
+        eq_str = animatedvalue.TYPE_TO_EQ_STRING[kf_type]
+                    
+        val_str = str(int(frame)) + eq_str # frame
+        val_str += str(int(rect[0])) + " " + str(int(rect[1])) + " " # pos
+        val_str += str(int(rect[2])) + " " + str(int(rect[3])) + " " # size
+        val_str += "1"
+        val_str += str(self.get_out_value(opac)) # opac with converted range from slider
+        return val_str
 
 
 class KeyFrameFilterRotatingGeometryProperty:
@@ -1319,16 +1387,14 @@ class KeyFrameHCSFilterProperty(EditableProperty):
         return Gtk.Adjustment(value=float(0.1), lower=float(lower), upper=float(upper), step_increment=float(step), page_increment=float(step)*page_factor)
         
     def write_out_keyframes(self, keyframes):
-        val_str = ""
-        for kf in keyframes:
-            frame, val, kf_type = kf
-            
-            eq_str = animatedvalue.TYPE_TO_EQ_STRING[kf_type]
-            
-            val_str += str(frame) + eq_str + str(self.get_out_value(val)) + ";"
-        
-        val_str = val_str.strip(";")
-        self.write_value(val_str)
+        if self.kf_str_builder == None:
+            self.kf_str_builder = KeyframesStringBuilder(self._get_keyframe_str)
+        self.write_keyframes_value(self.kf_str_builder.build(keyframes))
+
+    def _get_keyframe_str(self, kf):
+        frame, val, kf_type = kf
+        eq_str = animatedvalue.TYPE_TO_EQ_STRING[kf_type]
+        return str(frame) + eq_str + str(self.get_out_value(val))
 
 
 class RotoJSONProperty(EditableProperty):
@@ -1363,13 +1429,13 @@ class KeyFrameHCSTransitionProperty(TransitionEditableProperty):
         return Gtk.Adjustment(value=float(0.1), lower=float(lower), upper=float(upper), step_increment=float(step), page_increment=float(step)*page_factor)
 
     def write_out_keyframes(self, keyframes):
-        val_str = ""
-        for kf in keyframes:
-            frame, val, type = kf
-            val_str += str(frame) + "=" + str(self.get_out_value(val)) + ";"
+        if self.kf_str_builder == None:
+            self.kf_str_builder = KeyframesStringBuilder(self._get_keyframe_str)
+        self.write_keyframes_value(self.kf_str_builder.build(keyframes))
 
-        val_str = val_str.strip(";")
-        self.write_value(val_str)
+    def _get_keyframe_str(self, kf):
+        frame, val, type = kf
+        return str(frame) + "=" + str(self.get_out_value(val))
 
 
 class ColorProperty(EditableProperty):
@@ -807,6 +807,9 @@ def create_rotating_geometry_editor_property(clip, editable_properties):
     ep.write_out_keyframes = lambda w_kf : propertyparse.rotating_ge_write_out_keyframes(ep, w_kf)
     ep.update_prop_value = lambda : propertyparse.rotating_ge_update_prop_value(ep) # This is needed to get good update after adding kfs with fade buttons, iz all kinda fugly
                                                                                     # We need this to reinit GUI components after programmatically added kfs.
+    # Values are written straight to packed properties, so deferred keyframe writes have nothing to commit.
+    ep.live_write = False
+    ep.commit_value = lambda : None
     x_tokens = ep.x.value.split(";")
     y_tokens = ep.y.value.split(";")
     x_scale_tokens = ep.x_scale.value.split(";")
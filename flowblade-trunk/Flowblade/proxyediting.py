@@ -37,6 +37,7 @@ import gui
 import guiutils
 import jobs
 import persistance
+import proxyscheduler
 import render
 import renderconsumer
 import sequence
@@ -71,6 +72,7 @@ class ProxyRenderItemData:
         self.media_file_path = media_file_path
         self.proxy_profile_desc = proxy_profile_desc
         self.lookup_path = lookup_path # For img seqs only
+        self.low_priority = False # Set for renders started by proxyscheduler.py
         
         # We're packing this to go, jobs.py is imported into this module and we wish to not import this into jobs.py.
         self.do_auto_re_convert_func = _auto_re_convert_after_proxy_render_in_proxy_mode
@@ -102,41 +104,7 @@ class ProxyRenderRunnerThread(threading.Thread):
 
         proxy_render_items = []
         for media_file in self.files_to_render:
-            if media_file.type != appconsts.IMAGE_SEQUENCE:
-                
-                
-                proxy_encoding = renderconsumer.proxy_encodings[enc_index]
-                proxy_file_path = media_file.create_proxy_path(proxy_w, proxy_h, proxy_encoding.extension)
-
-                # Bit rates for proxy files are counted using 2500kbs for 
-                # PAL size image as starting point.
-                pal_pix_count = 720.0 * 576.0
-                pal_proxy_rate = 2500.0
-                proxy_pix_count = float(proxy_w * proxy_h)
-                proxy_rate = pal_proxy_rate * (proxy_pix_count / pal_pix_count)
-                proxy_rate = int(proxy_rate / 100) * 100 # Make proxy rate even hundred
-                # There are no practical reasons to have bitrates lower than 500kbs.
-                if proxy_rate < 500:
-                    proxy_rate = 500
-
-                item_data = ProxyRenderItemData(media_file.id, proxy_w, proxy_h, enc_index,
-                                                proxy_file_path, proxy_rate, media_file.path,
-                                                self.proxy_profile.description(), 
-                                                None)
-            else:
-
-                asset_folder, asset_file_name = os.path.split(media_file.path)
-                lookup_filename = utils.get_img_seq_glob_lookup_name(asset_file_name)
-                lookup_path = asset_folder + "/" + lookup_filename
-
-                proxy_file_path = media_file.create_proxy_path(proxy_w, proxy_h, None)
-        
-                # media_file.path, proxy_file_path, proxy_w, proxy_h, lookup_path
-                item_data = ProxyRenderItemData(media_file.id, proxy_w, proxy_h, -1,
-                                proxy_file_path, -1, media_file.path,
-                                self.proxy_profile.description(),
-                                lookup_path)
-                
+            item_data = _create_render_item_data(media_file, self.proxy_profile, proxy_w, proxy_h, enc_index)
             proxy_render_items.append(item_data)
         
         GLib.idle_add(self._create_job_queue_objects, proxy_render_items)
@@ -212,6 +180,11 @@ class ProxyManagerDialog:
         proxy_status_value = Gtk.Label(label=str(proxy_files) + _(" proxy file(s) for ") + str(video_files) + _(" video file(s)"))
         row_proxy_status = guiutils.get_two_column_box_right_pad(proxy_status_label, proxy_status_value, 150, 150)
 
+        idle_proxies_label = Gtk.Label(label=_("Created When Idle:"))
+        idle_proxies_button = Gtk.Button(label=str(len(proxyscheduler.get_created_proxies())) + _(" proxy file(s)"))
+        idle_proxies_button.connect("clicked", lambda w: proxyscheduler.show_created_proxies())
+        row_idle_proxies = guiutils.get_two_column_box_right_pad(idle_proxies_label, idle_proxies_button, 150, 150)
+
         proxy_mode_label = Gtk.Label(label=_("Current Proxy Mode:"))
         self.proxy_mode_value = Gtk.Label()
         self.set_mode_display_value()
@@ -240,6 +213,7 @@ class ProxyManagerDialog:
 
         vbox_onoff = Gtk.VBox(False, 2)
         vbox_onoff.pack_start(row_proxy_status, False, False, 0)
+        vbox_onoff.pack_start(row_idle_proxies, False, False, 0)
         vbox_onoff.pack_start(row_proxy_mode, False, False, 0)
         vbox_onoff.pack_start(guiutils.pad_label(12, 12), False, False, 0)
         vbox_onoff.pack_start(self.info_label, False, False, 0)
@@ -485,12 +459,56 @@ def _set_media_files_to_use_unique_proxies(media_files_list):
 def _create_proxy_files(media_files_to_render):
     proxy_profile = _get_proxy_profile(editorstate.PROJECT())
 
+    # Idle time render for same file would write into same proxy file.
+    proxyscheduler.cancel_renders_for(media_files_to_render)
+
     global runner_thread
     #progress_window = ProxyRenderProgressDialog()
     runner_thread = ProxyRenderRunnerThread(proxy_profile, media_files_to_render)
     runner_thread.start()
 
 # ------------------------------------------------------------------ module functions
+def get_proxy_render_item_data(media_file):
+    """
+    Returns ProxyRenderItemData for rendering proxy for media file with current project proxy settings.
+    """
+    proxy_profile = _get_proxy_profile(editorstate.PROJECT())
+    proxy_w, proxy_h =  _get_proxy_dimensions(proxy_profile, editorstate.PROJECT().proxy_data.size)
+    enc_index = editorstate.PROJECT().proxy_data.encoding
+    return _create_render_item_data(media_file, proxy_profile, proxy_w, proxy_h, enc_index)
+
+def _create_render_item_data(media_file, proxy_profile, proxy_w, proxy_h, enc_index):
+    if media_file.type != appconsts.IMAGE_SEQUENCE:
+        proxy_encoding = renderconsumer.proxy_encodings[enc_index]
+        proxy_file_path = media_file.create_proxy_path(proxy_w, proxy_h, proxy_encoding.extension)
+
+        # Bit rates for proxy files are counted using 2500kbs for 
+        # PAL size image as starting point.
+        pal_pix_count = 720.0 * 576.0
+        pal_proxy_rate = 2500.0
+        proxy_pix_count = float(proxy_w * proxy_h)
+        proxy_rate = pal_proxy_rate * (proxy_pix_count / pal_pix_count)
+        proxy_rate = int(proxy_rate / 100) * 100 # Make proxy rate even hundred
+        # There are no practical reasons to have bitrates lower than 500kbs.
+        if proxy_rate < 500:
+            proxy_rate = 500
+
+        return ProxyRenderItemData(media_file.id, proxy_w, proxy_h, enc_index,
+                                   proxy_file_path, proxy_rate, media_file.path,
+                                   proxy_profile.description(), 
+                                   None)
+    else:
+        asset_folder, asset_file_name = os.path.split(media_file.path)
+        lookup_filename = utils.get_img_seq_glob_lookup_name(asset_file_name)
+        lookup_path = asset_folder + "/" + lookup_filename
+
+        proxy_file_path = media_file.create_proxy_path(proxy_w, proxy_h, None)
+
+        return ProxyRenderItemData(media_file.id, proxy_w, proxy_h, -1,
+                                   proxy_file_path, -1, media_file.path,
+                                   proxy_profile.description(),
+                                   lookup_path)
+
 def _get_proxy_encoding():
     enc_index = editorstate.PROJECT().proxy_data.encoding
     return renderconsumer.proxy_encodings[enc_index]
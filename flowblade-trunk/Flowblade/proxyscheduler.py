@@ -0,0 +1,351 @@
+"""
+    Flowblade Movie Editor is a nonlinear video editor.
+    Copyright 2012 Janne Liljeblad.
+
+    This file is part of Flowblade Movie Editor <https://github.com/jliljebl/flowblade/>.
+
+    Flowblade Movie Editor is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Flowblade Movie Editor is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Flowblade Movie Editor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+"""
+Module creates proxy files for media that is slow to decode when application is idle.
+
+Decode cost of video media files is estimated from probed codec, image size, frame rate
+and bit depth, relative to 8-bit 1080p30 H.264 media. Files above threshold get
+proxy files rendered one at a time with lowest CPU and IO priority, files used in
+current sequence first.
+
+Render process is stopped during playback and renders, and continued when app is idle
+again. If other jobs are added render is cancelled and started again later, so that it
+does not keep them in queue. Renders are only started while project is using original
+media, so that completed renders do not force project reload, and while proxy files
+folder stays inside disk budget set in preferences.
+"""
+
+from gi.repository import GLib
+from gi.repository import Gtk
+
+import hashlib
+import os
+import re
+import time
+
+import appconsts
+import batchrendering
+import dialogutils
+import editorpersistance
+import editorstate
+import guiutils
+import jobs
+import proxyediting
+import renderconsumer
+import userfolders
+
+CHECK_INTERVAL_MS = 1000
+IDLE_SECONDS = 8.0 # app needs to be idle this long before render is started or continued
+
+DECODE_COST_THRESHOLD = 2.0
+REFERENCE_PIXEL_RATE = 1920.0 * 1080.0 * 30.0
+
+# Long codec name substring -> decode cost relative to H.264, first match is used.
+CODEC_COSTS = [("hevc", 2.5), ("h.265", 2.5), ("av1", 3.0), ("vp9", 2.0), ("h.264", 1.0),
+               ("prores", 0.6), ("dnx", 0.6), ("mpeg-2", 0.5), ("jpeg", 0.8)]
+HIGH_BIT_DEPTH_COST = 1.5
+CHROMA_COSTS = [("444", 1.4), ("422", 1.2)]
+
+GB = 1024 * 1024 * 1024
+DISK_BUDGETS = [0, 2 * GB, 5 * GB, 10 * GB, 20 * GB] # Index is editorpersistance.prefs.idle_proxy_disk_budget, 0 is off.
+
+_timeout_id = None
+_project = None
+_idle_since = None
+
+_current_job = None
+_current_media_file = None
+_current_cost = None
+_skipped_ids = set() # media file ids of failed, cancelled or over budget renders for current project
+
+
+# ------------------------------------------------------ interface
+def start():
+    global _timeout_id
+    if _timeout_id == None:
+        _timeout_id = GLib.timeout_add(CHECK_INTERVAL_MS, _check)
+
+def shutdown():
+    global _timeout_id
+    if _timeout_id != None:
+        GLib.source_remove(_timeout_id)
+        _timeout_id = None
+    _cancel_current_job()
+
+def cancel_renders_for(media_files):
+    # Called when user requests proxy renders, idle render for same file would write same proxy file.
+    if _current_job != None and _current_media_file in media_files:
+        _cancel_current_job()
+
+def get_created_proxies():
+    """
+    Returns list of (media file name, proxy file path, decode cost, creation time) tuples for current project.
+    """
+    created = editorstate.PROJECT().get_project_property(appconsts.P_PROP_IDLE_PROXIES)
+    if created == None:
+        return []
+    return created
+
+
+# ------------------------------------------------------ decode cost
+def get_decode_cost(media_file):
+    """
+    Returns estimated decode cost of media file relative to 8-bit 1080p30 H.264 or None if not known.
+    """
+    info = media_file.info
+    if info == None or info["width"] <= 0 or info["height"] <= 0:
+        return None
+
+    fps = 30.0
+    if info["fps_den"] > 0:
+        fps = info["fps_num"] / info["fps_den"]
+    cost = info["width"] * info["height"] * fps / REFERENCE_PIXEL_RATE
+
+    vcodec = str(info["vcodec"]).lower()
+    for codec_name, codec_cost in CODEC_COSTS:
+        if codec_name in vcodec:
+            cost = cost * codec_cost
+            break
+
+    pixel_format = str(info.get("pixel_format"))
+    bit_depth_match = re.search(r"p(\d+)(le|be)$", pixel_format)
+    if bit_depth_match != None and int(bit_depth_match.group(1)) > 8:
+        cost = cost * HIGH_BIT_DEPTH_COST
+    for chroma, chroma_cost in CHROMA_COSTS:
+        if chroma in pixel_format:
+            cost = cost * chroma_cost
+            break
+
+    return cost
+
+def _get_candidates():
+    # Returns list of (media file, cost) for files predicted to need proxies, most needed first.
+    project = editorstate.PROJECT()
+    used_paths = set()
+    for seq in project.sequences:
+        for track in seq.tracks:
+            for clip in track.clips:
+                if clip.is_blanck_clip == False:
+                    used_paths.add(clip.path)
+
+    candidates = []
+    for media_file in project.media_files.values():
+        if media_file.type != appconsts.VIDEO or media_file.is_proxy_file == True \
+            or media_file.has_proxy_file == True or media_file.container_data != None:
+            continue
+        if media_file.id in _skipped_ids:
+            continue
+        cost = get_decode_cost(media_file)
+        if cost == None or cost < DECODE_COST_THRESHOLD:
+            continue
+        candidates.append((media_file.path in used_paths, cost, media_file))
+
+    candidates.sort(key=lambda item: (item[0], item[1]), reverse=True)
+    return [(media_file, cost) for in_use, cost, media_file in candidates]
+
+
+# ------------------------------------------------------ scheduling
+def _check():
+    global _idle_since
+    if editorstate.PROJECT() is not _project:
+        _project_changed()
+
+    busy = _app_is_busy()
+    if busy == True:
+        _idle_since = None
+    elif _idle_since == None:
+        _idle_since = time.monotonic()
+    idle = (busy == False and time.monotonic() - _idle_since > IDLE_SECONDS)
+
+    if _current_job != None and _current_job.status in (jobs.QUEUED, jobs.RENDERING) \
+        and _other_jobs_active() == True:
+        # Paused or queued idle render would keep added jobs from starting, it is
+        # cancelled and rendered again from start when app is next time idle.
+        _requeue_current_job()
+    elif _current_job != None:
+        _update_current_job(busy, idle)
+    elif idle == True and _can_render() == True:
+        _start_next_render()
+
+    return True
+
+def _app_is_busy():
+    if editorstate.project_is_loading == True or proxyediting.load_thread != None:
+        return True
+    if editorstate.PLAYER() == None or editorstate.PLAYER().is_playing() == True:
+        return True
+    if batchrendering.single_render_launch_thread != None and batchrendering.single_render_launch_thread.is_alive():
+        return True
+    return _other_jobs_active()
+
+def _other_jobs_active():
+    for job in jobs.get_active_jobs():
+        if job is not _current_job:
+            return True
+    return False
+
+def _can_render():
+    project = editorstate.PROJECT()
+    if project.proxy_data.proxy_mode != appconsts.USE_ORIGINAL_MEDIA:
+        return False
+    if _get_disk_budget() == 0 or len(renderconsumer.proxy_encodings) == 0:
+        return False
+    return True
+
+def _start_next_render():
+    global _current_job, _current_media_file, _current_cost
+    candidates = _get_candidates()
+    if len(candidates) == 0:
+        return
+
+    media_file, cost = candidates[0]
+    render_data = proxyediting.get_proxy_render_item_data(media_file)
+    if _get_proxies_folder_size() + _get_estimated_proxy_size(media_file, render_data) > _get_disk_budget():
+        _skipped_ids.add(media_file.id)
+        return
+    render_data.low_priority = True
+
+    print("Idle time proxy render for", media_file.name, "decode cost %.1f" % cost)
+    session_id = hashlib.md5(str(os.urandom(32)).encode('utf-8')).hexdigest()
+    _current_job = jobs.ProxyRenderJobQueueObject(session_id, render_data)
+    _current_media_file = media_file
+    _current_cost = cost
+    _current_job.add_to_queue()
+
+def _update_current_job(busy, idle):
+    global _current_job, _current_media_file
+    if _current_job.status == jobs.COMPLETED:
+        if _proxy_file_written(_current_job.render_data.proxy_file_path) == True:
+            _add_created_proxy(_current_media_file, _current_job.render_data.proxy_file_path, _current_cost)
+        else:
+            _skipped_ids.add(_current_media_file.id)
+        _current_job = None
+        _current_media_file = None
+    elif _current_job.status == jobs.CANCELLED:
+        _skipped_ids.add(_current_media_file.id)
+        _current_job = None
+        _current_media_file = None
+    elif _current_job.status == jobs.RENDERING:
+        if busy == True and _current_job.paused == False:
+            _current_job.pause_render()
+        elif idle == True and _current_job.paused == True:
+            _current_job.resume_render()
+
+def _cancel_current_job():
+    global _current_job, _current_media_file
+    if _current_job == None:
+        return
+    if _current_job.status in (jobs.QUEUED, jobs.RENDERING):
+        jobs.cancel_job(_current_job)
+    _current_job = None
+    _current_media_file = None
+
+def _requeue_current_job():
+    global _current_job, _current_media_file
+    # Media file is not added to skipped files so it gets picked again.
+    jobs.cancel_job(_current_job)
+    _current_job = None
+    _current_media_file = None
+
+def _project_changed():
+    global _project, _idle_since
+    # Media file ids of new project could match ids of rendered media.
+    _cancel_current_job()
+    _skipped_ids.clear()
+    _project = editorstate.PROJECT()
+    _idle_since = None
+
+def _add_created_proxy(media_file, proxy_path, cost):
+    created = list(get_created_proxies())
+    created.append((media_file.name, proxy_path, cost, time.time()))
+    editorstate.PROJECT().set_project_property(appconsts.P_PROP_IDLE_PROXIES, created)
+
+
+# ------------------------------------------------------ disk budget
+def _get_disk_budget():
+    try:
+        return DISK_BUDGETS[editorpersistance.prefs.idle_proxy_disk_budget]
+    except IndexError:
+        return 0
+
+def _get_proxies_folder_size():
+    size = 0
+    try:
+        with os.scandir(userfolders.get_proxies_dir()) as entries:
+            for entry in entries:
+                if entry.is_file(follow_symlinks=False):
+                    size += entry.stat(follow_symlinks=False).st_size
+    except OSError:
+        pass
+    return size
+
+def _get_estimated_proxy_size(media_file, render_data):
+    seconds = float(media_file.length) / editorstate.PROJECT().profile.fps()
+    return int(render_data.proxy_rate * 1000 / 8 * seconds)
+
+def _proxy_file_written(proxy_path):
+    try:
+        return os.path.getsize(proxy_path) > 0
+    except OSError:
+        return False
+
+
+# ------------------------------------------------------ review
+def show_created_proxies():
+    created = get_created_proxies()
+
+    grid = Gtk.Grid()
+    grid.set_column_spacing(24)
+    grid.set_row_spacing(4)
+    headers = [_("Media File"), _("Decode Cost"), _("Proxy Size"), _("Created")]
+    for column in range(0, len(headers)):
+        grid.attach(guiutils.bold_label(headers[column]), column, 0, 1, 1)
+
+    total_size = 0
+    for row in range(0, len(created)):
+        name, proxy_path, cost, created_time = created[row]
+        try:
+            size = os.path.getsize(proxy_path)
+            size_str = "%.1f MB" % (size / (1024.0 * 1024.0))
+            total_size += size
+        except OSError:
+            size_str = _("Deleted")
+        values = [name, "x%.1f" % cost, size_str, time.strftime("%Y-%m-%d %H:%M", time.localtime(created_time))]
+        for column in range(0, len(values)):
+            label = Gtk.Label(label=values[column])
+            label.set_xalign(0.0)
+            grid.attach(label, column, row + 1, 1, 1)
+
+    info_text = str(len(created)) + _(" proxy file(s), ") + "%.2f GB" % (total_size / float(GB))
+    budget = _get_disk_budget()
+    if budget == 0:
+        info_text += ", " + _("idle time proxy creation is off")
+    else:
+        info_text += ", " + _("proxy files folder") + " %.2f / %.0f GB" % (_get_proxies_folder_size() / float(GB), budget / GB)
+    info_label = Gtk.Label(label=info_text)
+    info_label.set_xalign(0.0)
+
+    vbox = Gtk.VBox(False, 2)
+    vbox.pack_start(grid, False, False, 0)
+    vbox.pack_start(guiutils.pad_label(12, 12), False, False, 0)
+    vbox.pack_start(info_label, False, False, 0)
+
+    dialogutils.panel_ok_dialog(_("Proxy Files Created When Idle"), vbox)
@@ -28,14 +28,15 @@ except:
     import mlt
 import time
 import threading
-import xml.dom.minidom
 import os
 import subprocess
 
 import appconsts
+import capabilitycache
 import editorpersistance
 import mltenv
 import respaths
+import startupinit
 import translations
 
 # File describing existing encoding and quality options
@@ -101,6 +102,7 @@ quality_option_groups = {}
 quality_option_groups_default_index = {}
 non_user_encodings = []
 proxy_encodings = None
+ffmpeg_cli_available = False
 
 # We pick this up on init to get alpha encoding later on request.
 _default_alpha_enc_opt = None
@@ -241,10 +243,16 @@ def load_render_profiles():
     print("Loading render profiles...")
     file_path = respaths.ROOT_PATH + RENDER_ENCODING_FILE
     global render_encoding_doc
-    render_encoding_doc = xml.dom.minidom.parse(file_path)
-
-    ret_code = _test_command(FFMPEG_TEST, True)
-    if (ret_code == 0):
+    render_encoding_doc = startupinit.parse_xml(file_path)
+
+    # ffmpeg test result is cached until system changes.
+    global ffmpeg_cli_available
+    ffmpeg_cli_available = capabilitycache.get_result(capabilitycache.FFMPEG_CLI)
+    if ffmpeg_cli_available == None:
+        ret_code = _test_command(FFMPEG_TEST, True)
+        ffmpeg_cli_available = (ret_code == 0)
+        capabilitycache.save_result(capabilitycache.FFMPEG_CLI, ffmpeg_cli_available)
+    if ffmpeg_cli_available == True:
         print("ffmpeg CLI available")
     else:
         print("ffmpeg CLI NOT available")
@@ -47,6 +47,7 @@ import threading
 
 import appconsts
 import atomicfile
+import capabilitycache
 import editorpersistance
 import editorstate
 import renderconsumer
@@ -61,23 +62,45 @@ import utils
 CURRENT_TEST_RENDER_ARGS_VALS_LIST = "gpu_test_render.argsvalslist"
 CURRENT_TEST_RENDER_OUT_FILE = "outfile"
 
+GPU_TEST_DELAY_MS = 3000 # Test renders are not launched while app is starting up.
+
 test_thread = None
 
 test_results = {}
 
 
 def test_gpu_rendering_options(selector_update_func):
+    # Cached results for unchanged system are applied immediately, test renders
+    # are done after startup.
+    cached_results = capabilitycache.get_result(capabilitycache.GPU_ENCODERS)
+    if cached_results != None and _all_encoders_tested(cached_results):
+        print("Using cached GPU test results")
+        test_runner_thread = GPUTestRunnerThread(selector_update_func, cached_results)
+        test_runner_thread.run()
+        return
+
+    GLib.timeout_add(GPU_TEST_DELAY_MS, _launch_test_runner_thread, selector_update_func)
+
+def _launch_test_runner_thread(selector_update_func):
     test_runner_thread = GPUTestRunnerThread(selector_update_func)
     test_runner_thread.start()
+    return False
+
+def _all_encoders_tested(results):
+    for name, enc_opt in renderconsumer.NVENC_encs + renderconsumer.VAAPI_encs:
+        if name not in results:
+            return False
+    return True
 
 def _update_encode_selector(selector_update_func):
     selector_update_func()
 
 
 class GPUTestRunnerThread(threading.Thread):
-    def __init__(self, selector_update_func):
+    def __init__(self, selector_update_func, cached_results=None):
         threading.Thread.__init__(self)
         self.selector_update_func = selector_update_func
+        self.cached_results = cached_results
 
     def run(self):
         profile = mltprofiles.get_default_profile()
@@ -86,7 +109,7 @@ class GPUTestRunnerThread(threading.Thread):
         working_NVENC_encs = []
         for item in renderconsumer.NVENC_encs:
             name, enc_opt = item
-            returncode = self._test_encoder_option(name, enc_opt)
+            returncode = self._get_test_result(name, enc_opt)
             test_results[name] = returncode
             if returncode == 0:
                 working_NVENC_encs.append((enc_opt.name, enc_opt))
@@ -100,7 +123,7 @@ class GPUTestRunnerThread(threading.Thread):
         working_VAAPI_encs = []
         for item in renderconsumer.VAAPI_encs:
             name, enc_opt = item
-            returncode = self._test_encoder_option(name, enc_opt)
+            returncode = self._get_test_result(name, enc_opt)
             test_results[name] = returncode
             if returncode == 0:
                 working_VAAPI_encs.append((enc_opt.name, enc_opt))
@@ -111,10 +134,18 @@ class GPUTestRunnerThread(threading.Thread):
             renderconsumer.categorized_encoding_options.insert(1, (translations.get_encoder_group_name(appconsts.PRESET_GROUP_VAAPI), working_VAAPI_encs))
 
         print("GPU test results", test_results)
-        
+        # Timed out tests may pass on a less busy system and are not cached.
+        if self.cached_results == None and -1 not in test_results.values():
+            capabilitycache.save_result(capabilitycache.GPU_ENCODERS, dict(test_results))
+
         if len(working_VAAPI_encs) > 0 or len(working_NVENC_encs) > 0:
             GLib.idle_add(_update_encode_selector, self.selector_update_func)
 
+    def _get_test_result(self, name, enc_opt):
+        if self.cached_results != None:
+            return self.cached_results[name]
+        return self._test_encoder_option(name, enc_opt)
+
     def _test_encoder_option(self, name, enc_opt):
 
         # Create and write to disk argsvals list for test render.
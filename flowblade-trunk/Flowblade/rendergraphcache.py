@@ -0,0 +1,137 @@
+"""
+    Flowblade Movie Editor is a nonlinear video editor.
+    Copyright 2012 Janne Liljeblad.
+
+    This file is part of Flowblade Movie Editor <https://github.com/jliljebl/flowblade/>.
+
+    Flowblade Movie Editor is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Flowblade Movie Editor is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Flowblade Movie Editor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+"""
+Module keeps a cache of render graphs of sequences as MLT XML files for render processes.
+
+Building MLT graph for render requires loading saved project and building all its
+sequences and opening their producers. When same sequence is rendered again with
+e.g. another encoding, graph is loaded from MLT XML written by first render.
+
+Graphs are keyed by hash of pickled rendered sequence, project profile and size and
+modification time of media files used by sequence, so any edit to sequence or change
+to media creates a new graph.
+"""
+
+try:
+    import mlt7 as mlt
+except:
+    import mlt
+import hashlib
+import os
+import pickle
+import time
+
+import mltprofiles
+import persistance
+import userfolders
+
+GRAPHS_DIR = "render_graphs/"
+MAX_GRAPHS = 12
+
+
+def get_render_producer(project_file_path):
+    """
+    Returns MLT producer for rendering current sequence of saved project.
+    """
+    s_project = persistance.unpickle(project_file_path)
+    graph_key = get_graph_key(s_project)
+    graph_path = _get_graphs_dir() + graph_key + ".xml"
+
+    if os.path.exists(graph_path):
+        profile = mltprofiles.get_profile(s_project.profile_desc)
+        producer = mlt.Producer(profile, "xml", str(graph_path))
+        if producer.is_valid() == True:
+            print("Render graph loaded from cache", graph_key)
+            os.utime(graph_path) # Keeps recently used graphs when pruning.
+            return producer
+
+    project = persistance.load_project(project_file_path, False)
+    project.c_seq.fix_v1_for_render()
+    producer = project.c_seq.tractor
+    _write_graph(producer, project.profile, graph_path)
+    return producer
+
+def get_graph_key(s_project):
+    # 's_project' is unpickled project data, sequences have not been built.
+    s_seq = s_project.sequences[s_project.c_seq_index]
+    seq_hash = hashlib.md5(pickle.dumps(s_seq)).hexdigest()
+
+    media_stats = []
+    stat_paths = set()
+    for track in s_seq.tracks:
+        for clip in track.clips:
+            path = getattr(clip, "path", None)
+            if path == None or path in stat_paths:
+                continue
+            stat_paths.add(path)
+            try:
+                stat = os.stat(path)
+                media_stats.append((path, stat.st_size, stat.st_mtime))
+            except (OSError, TypeError):
+                media_stats.append((path, None))
+
+    key_str = str((seq_hash, s_project.profile_desc, media_stats))
+    return hashlib.md5(key_str.encode("utf-8")).hexdigest()
+
+def _write_graph(producer, profile, graph_path):
+    temp_path = graph_path + "." + str(os.getpid()) + ".tmp"
+    xml_consumer = mlt.Consumer(profile, "xml", str(temp_path))
+    xml_consumer.connect(producer)
+    xml_consumer.start()
+    producer.set_speed(1)
+    while xml_consumer.is_stopped() == False:
+        time.sleep(0.05)
+    xml_consumer.stop()
+
+    # Render starts from state producer had before being written.
+    producer.set_speed(0)
+    producer.seek(0)
+
+    try:
+        os.replace(temp_path, graph_path)
+    except OSError as e:
+        print("Render graph cache write failed:", e)
+        return
+    _prune()
+
+def _prune():
+    graphs_dir = _get_graphs_dir()
+    graphs = []
+    for file_name in os.listdir(graphs_dir):
+        if file_name.endswith(".xml") == False:
+            continue
+        try:
+            graphs.append((os.path.getmtime(graphs_dir + file_name), graphs_dir + file_name))
+        except OSError:
+            pass
+
+    graphs.sort(reverse=True)
+    for mtime, graph_path in graphs[MAX_GRAPHS:]:
+        try:
+            os.remove(graph_path)
+        except OSError:
+            pass
+
+def _get_graphs_dir():
+    graphs_dir = userfolders.get_cache_dir() + GRAPHS_DIR
+    if not os.path.exists(graphs_dir):
+        os.mkdir(graphs_dir)
+    return graphs_dir
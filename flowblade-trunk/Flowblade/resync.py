@@ -29,22 +29,39 @@ from editorstate import current_sequence
 # Setting sync means calculating and saving the position difference between where first frames of clips
 # would be on the timeline.
 #
-# After every edit sync states of all child clips is calculated, and it 
-# gets displayed to the user in the next timeline redraw using red, green and gray colors
+# After every edit sync states of child clips are calculated, and they 
+# get displayed to the user in the next timeline redraw using red, green and gray colors.
+#
+# Sync states are computed incrementally. Edit ops in edit.py report tracks they change with
+# track_changed() and only those tracks get their clip positions recomputed. Child clips are
+# then only recomputed if their position, parent position or sync data changed since
+# the last computation.
 
 # Maps clip -> track
 sync_children = {}
 
+# Maps track -> {clip: clip start frame on timeline}, only valid for tracks not in _dirty_tracks.
+_track_positions = {}
+
+# Tracks changed since last sync states computation.
+_dirty_tracks = set()
+
+# Maps child clip -> inputs used on last sync state computation.
+_computed_sync_keys = {}
+
+
 # ----------------------------------------- sync display updating
 def clip_added_to_timeline(clip, track):
     if clip.sync_data != None:
         sync_children[clip] = track
+    track_changed(track)
 
 def clip_removed_from_timeline(clip):
     try:
         sync_children.pop(clip)
     except KeyError:
         pass
+    _computed_sync_keys.pop(clip, None)
 
 def clip_sync_cleared(clip):
     # This and the method above are called for different purposes, so we'll 
@@ -53,37 +70,93 @@ def clip_sync_cleared(clip):
         sync_children.pop(clip)
     except KeyError:
         pass
+    _computed_sync_keys.pop(clip, None)
+
+def track_changed(track):
+    _dirty_tracks.add(track)
 
 def sequence_changed(new_sequence):
-    global sync_children
+    global sync_children, _track_positions, _dirty_tracks, _computed_sync_keys
     sync_children = {}
+    _track_positions = {}
+    _dirty_tracks = set()
+    _computed_sync_keys = {}
     for track in new_sequence.tracks:
         for clip in track.clips:
             clip_added_to_timeline(clip, track)
     calculate_and_set_child_clip_sync_states()
 
 def calculate_and_set_child_clip_sync_states():
+    for track in _dirty_tracks:
+        _track_positions.pop(track, None)
+    _dirty_tracks.clear()
+
     for child_clip, track in sync_children.items():
-        child_index = track.clips.index(child_clip)
-        child_clip_start = track.clip_start(child_index) - child_clip.clip_in
+        sync_data = child_clip.sync_data
+        child_clip_start = _get_clip_start(track, child_clip)
+        parent_clip_start = _get_clip_start(sync_data.master_clip_track, sync_data.master_clip)
 
-        parent_clip = child_clip.sync_data.master_clip
-        parent_track = child_clip.sync_data.master_clip_track 
-        try:
-            parent_index = parent_track.clips.index(parent_clip)
-        except:
-            child_clip.sync_data.sync_state = appconsts.SYNC_PARENT_GONE
+        sync_key = (child_clip_start, child_clip.clip_in, parent_clip_start, sync_data.master_clip.clip_in,
+                    sync_data, sync_data.pos_offset, sync_data.master_clip, sync_data.master_clip_track)
+        if _computed_sync_keys.get(child_clip) == sync_key:
             continue
+        _computed_sync_keys[child_clip] = sync_key
+
+        _set_child_clip_sync_state(child_clip, child_clip_start, parent_clip_start)
+
+def get_full_child_clip_sync_states():
+    """
+    Returns dict child clip -> (sync state, sync diff) computed from clip lists of current
+    sequence without using or changing incremental state. Used to check incremental results.
+    """
+    track_positions = {}
+    states = {}
+    for track in current_sequence().tracks:
+        for child_clip in track.clips:
+            sync_data = child_clip.sync_data
+            if sync_data == None:
+                continue
+            child_clip_start = _get_track_positions(track, track_positions).get(child_clip)
+            parent_clip_start = _get_track_positions(sync_data.master_clip_track, track_positions).get(sync_data.master_clip)
+            states[child_clip] = _compute_sync_state(child_clip, child_clip_start, parent_clip_start)
+    return states
+
+def _set_child_clip_sync_state(child_clip, child_clip_start, parent_clip_start):
+    sync_state, sync_diff = _compute_sync_state(child_clip, child_clip_start, parent_clip_start)
+    child_clip.sync_data.sync_state = sync_state
+    if sync_diff != None:
+        child_clip.sync_diff = sync_diff
+
+def _compute_sync_state(child_clip, child_clip_start, parent_clip_start):
+    # Returns (sync state, sync diff), sync diff is None if parent clip is not on timeline.
+    if parent_clip_start == None:
+        return (appconsts.SYNC_PARENT_GONE, None)
+
+    pos_offset = (child_clip_start - child_clip.clip_in) - (parent_clip_start - child_clip.sync_data.master_clip.clip_in)
+
+    if pos_offset == child_clip.sync_data.pos_offset:
+        sync_state = appconsts.SYNC_CORRECT
+    else:
+        sync_state = appconsts.SYNC_OFF
+    
+    return (sync_state, pos_offset - child_clip.sync_data.pos_offset)
 
-        parent_clip_start = parent_track.clip_start(parent_index) - parent_clip.clip_in
-        pos_offset = child_clip_start - parent_clip_start
+def _get_clip_start(track, clip):
+    # Returns timeline position of clip first frame or None if clip is not on track.
+    return _get_track_positions(track, _track_positions).get(clip)
 
-        if pos_offset == child_clip.sync_data.pos_offset:
-            child_clip.sync_data.sync_state = appconsts.SYNC_CORRECT
-        else:
-            child_clip.sync_data.sync_state = appconsts.SYNC_OFF
-        
-        child_clip.sync_diff = pos_offset - child_clip.sync_data.pos_offset
+def _get_track_positions(track, track_positions):
+    # Returns dict clip -> clip start frame on timeline, computed once for track into 'track_positions'.
+    try:
+        return track_positions[track]
+    except KeyError:
+        positions = {}
+        frame = 0
+        for track_clip in track.clips:
+            positions[track_clip] = frame
+            frame += track_clip.clip_out - track_clip.clip_in + 1 # +1, end inclusive
+        track_positions[track] = positions
+        return positions
 
 def get_resync_data_list_for_clip_list(clips_list):
     # Input is list of (clip, track) tuples
@@ -33,6 +33,7 @@ import os
 import appconsts
 import edit
 import editorstate
+import framecache
 import mltfilters
 import mlttransitions
 import mltrefhold
@@ -97,6 +98,8 @@ AUDIO_MIX_DOWN_TRACK = 0
 SCOPE_MIX_VALUES = [0.0, 0.2, 0.5, 0.8, 1.0]
 _scope_over_lay_mix = 2
 
+_compositor_plant_count = 0 # Compositors get increasing plant indexes, see Sequence.restack_compositors()
+
 class Sequence:
     """
     Multitrack MLT object
@@ -111,6 +114,7 @@ class Sequence:
         self.master_audio_pan = NO_PAN
         self.tracks = []
         self.compositors = []
+        self.origin_clip_compositors = {} # origin clip id -> compositors list, not saved, rebuilt on restack
         self.markers = [] # markers are tuples (name_str, frame_int)
         self.proxyclips = {}
         self.rendered_versions = {} 
@@ -637,10 +641,17 @@ class Sequence:
         return compositor
 
     def restack_compositors(self):
+        """
+        MLT field composites transitions in planting order and transitions can only be
+        planted last. Compositors at the start of sorted list that are already planted in
+        sorted order are kept as is, the rest are replanted. Tracks are read from transition
+        properties when compositing so changed tracks alone do not require replanting.
+        """
         self.sort_compositors()
 
-        new_compositors = []
-        for compositor in self.compositors:
+        keep_count = self._get_planted_in_order_count()
+        new_compositors = self.compositors[0:keep_count]
+        for compositor in self.compositors[keep_count:]:
             if compositor.planted == False:
                 self._plant_compositor(compositor)
                 new_compositors.append(compositor)
@@ -648,12 +659,26 @@ class Sequence:
                 clone_compositor = self._create_and_plant_clone_compositor(compositor)
                 new_compositors.append(clone_compositor)
         self.compositors = new_compositors
+        self._rebuild_origin_clip_index()
+
+    def _get_planted_in_order_count(self):
+        # Returns number of compositors from list start that are planted in list order.
+        last_plant_index = -1
+        for i in range(0, len(self.compositors)):
+            compositor = self.compositors[i]
+            if compositor.planted == False or compositor.plant_index < last_plant_index:
+                return i
+            last_plant_index = compositor.plant_index
+        return len(self.compositors)
 
     def _plant_compositor(self, compositor):
+        global _compositor_plant_count
         self.field.plant_transition(compositor.transition.mlt_transition, 
                                     int(compositor.transition.a_track), 
                                     int(compositor.transition.b_track))
         compositor.planted = True
+        compositor.plant_index = _compositor_plant_count
+        _compositor_plant_count += 1
 
     def _create_and_plant_clone_compositor(self, old_compositor):
         # Remove old compositor
@@ -681,6 +706,7 @@ class Sequence:
                 clone_compositor = self._create_and_plant_clone_compositor_for_sequnce_clone(old_compositor, track_delta)
                 new_compositors.append(clone_compositor)
         self.compositors = new_compositors
+        self._rebuild_origin_clip_index()
 
     def _create_and_plant_clone_compositor_for_sequnce_clone(self, old_compositor, track_delta):      
         # Create and plant new compositor
@@ -696,6 +722,7 @@ class Sequence:
 
     def add_compositor(self, compositor):
         self.compositors.append(compositor)
+        self.origin_clip_compositors.setdefault(compositor.origin_clip_id, []).append(compositor)
         
     def remove_compositor(self, old_compositor):
         try:
@@ -712,11 +739,25 @@ class Sequence:
             
         self.field.disconnect_service(old_compositor.transition.mlt_transition)
 
+        try:
+            origin_compositors = self.origin_clip_compositors[old_compositor.origin_clip_id]
+            origin_compositors.remove(old_compositor)
+            if len(origin_compositors) == 0:
+                del self.origin_clip_compositors[old_compositor.origin_clip_id]
+        except (KeyError, ValueError):
+            self._rebuild_origin_clip_index()
+
     def destroy_compositors(self):
         # This can be called when undo stack destroyed too.
         for compositor in self.compositors:
             self.field.disconnect_service(compositor.transition.mlt_transition)
         self.compositors = []
+        self.origin_clip_compositors = {}
+
+    def _rebuild_origin_clip_index(self):
+        self.origin_clip_compositors = {}
+        for compositor in self.compositors:
+            self.origin_clip_compositors.setdefault(compositor.origin_clip_id, []).append(compositor)
 
     def add_full_track_compositors(self):
         #print("Adding full track compositors")
@@ -745,11 +786,7 @@ class Sequence:
         raise ValueError('compositor for id not found')
 
     def get_clip_compositors(self, clip):
-        clip_compositors = []
-        for compositor in self.compositors:
-            if compositor.origin_clip_id == clip.id:
-                clip_compositors.append(compositor)
-        return clip_compositors
+        return list(self.origin_clip_compositors.get(clip.id, []))
         
     def sort_compositors(self):
         """
@@ -1280,6 +1317,8 @@ class Sequence:
         else: # TRACK_MUTE_NOTHING, TRACK_MUTE_VIDEO
             track.set("hide", int(track.mute_state))
             track.gain_filter.set("gain", str(track.audio_gain))
+
+        framecache.sequence_changed()
             
     def drop_audio_levels(self):
         for i in range(1, len(self.tracks)):
@@ -0,0 +1,124 @@
+"""
+    Flowblade Movie Editor is a nonlinear video editor.
+    Copyright 2012 Janne Liljeblad.
+
+    This file is part of Flowblade Movie Editor <https://github.com/jliljebl/flowblade/>.
+
+    Flowblade Movie Editor is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Flowblade Movie Editor is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Flowblade Movie Editor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+"""
+Module splits sequences into fixed length segments and computes a signature for
+each segment from everything on the timeline that affects its frames.
+
+Sequence link container clips save segment signatures when the linked sequence is
+exported, and only segments with changed signatures are rendered again.
+Rendered segments are kept in a segment store in container clip session folder.
+"""
+
+import hashlib
+import os
+
+SEGMENT_LENGTH = 250 # frames
+SEGMENT_SIGNATURES = "seq_link_segment_signatures" # container_data.data_slots key
+SEGMENT_RENDER_PLAN = "segment_render_plan" # session folder data file name
+SEGMENTS_DIR = "sequence_segments/" # in container clips folder, one store per container clip uid
+
+
+def get_segment_signatures(seq):
+    """
+    Returns list of signature strings, one for each SEGMENT_LENGTH frames of sequence.
+    """
+    seq_length = 0
+    track_items = [] # (start, end, item data str) for all clips
+    for track_index in range(0, len(seq.tracks)):
+        track = seq.tracks[track_index]
+        track_data = str((track_index, track.mute_state, track.audio_gain, track.audio_pan))
+        track_items.append((0, None, track_data)) # Track state affects all segments.
+        pos = 0
+        for clip in track.clips:
+            length = clip.clip_out - clip.clip_in + 1
+            if clip.is_blanck_clip == False:
+                track_items.append((pos, pos + length - 1, str(track_index) + _get_clip_data_str(clip, pos)))
+            pos += length
+        seq_length = max(seq_length, pos)
+
+    for compositor in seq.compositors:
+        track_items.append((compositor.clip_in, compositor.clip_out, _get_compositor_data_str(compositor)))
+
+    seq_state = str(getattr(seq, "compositing_mode", None))
+
+    segments_count = (seq_length + SEGMENT_LENGTH - 1) // SEGMENT_LENGTH
+    hashes = [hashlib.md5(seq_state.encode("utf-8")) for i in range(0, segments_count)]
+    for start, end, item_str in track_items:
+        if end == None:
+            first, last = 0, segments_count - 1
+        else:
+            first = max(0, start // SEGMENT_LENGTH)
+            last = min(segments_count - 1, end // SEGMENT_LENGTH)
+        item_bytes = item_str.encode("utf-8")
+        for i in range(first, last + 1):
+            hashes[i].update(item_bytes)
+
+    return [h.hexdigest() for h in hashes]
+
+def _get_clip_data_str(clip, pos):
+    # Filter property strings include keyframes outside segment, changing them invalidates all
+    # segments that clip covers.
+    filters_data = [(f.info.mlt_service_id, f.active, str(f.properties), str(f.non_mlt_properties)) for f in clip.filters]
+    mute = clip.mute_filter != None
+    return str((pos, clip.path, clip.clip_in, clip.clip_out, mute, filters_data))
+
+def _get_compositor_data_str(compositor):
+    transition = compositor.transition
+    return str((transition.info.mlt_service_id, transition.a_track, transition.b_track,
+                compositor.clip_in, compositor.clip_out, str(transition.properties)))
+
+def get_render_segments(signatures, range_in, range_out):
+    """
+    Returns list of (segment range in, segment range out, signature) tuples covering render range
+    or None if signatures do not cover render range.
+    """
+    if signatures == None or range_out >= len(signatures) * SEGMENT_LENGTH:
+        return None
+
+    segments = []
+    first = range_in // SEGMENT_LENGTH
+    last = range_out // SEGMENT_LENGTH
+    for i in range(first, last + 1):
+        seg_in = max(range_in, i * SEGMENT_LENGTH)
+        seg_out = min(range_out, (i + 1) * SEGMENT_LENGTH - 1)
+        segments.append((seg_in, seg_out, signatures[i]))
+    return segments
+
+def get_segment_file_path(segments_dir, seg_in, seg_out, signature, settings_str, file_extension):
+    # Segments with same content, range and render settings share file.
+    key_str = signature + settings_str + str(seg_in) + "_" + str(seg_out)
+    return segments_dir + "/" + hashlib.md5(key_str.encode("utf-8")).hexdigest() + file_extension
+
+def create_render_plan(segments_dir, segments, settings_str, file_extension):
+    """
+    Returns render plan dict read by render process. Segments that already
+    exist in segment store are not rendered.
+    """
+    if not os.path.exists(segments_dir):
+        os.makedirs(segments_dir)
+
+    plan_segments = []
+    for seg_in, seg_out, signature in segments:
+        path = get_segment_file_path(segments_dir, seg_in, seg_out, signature, settings_str, file_extension)
+        needs_render = (os.path.isfile(path) == False)
+        plan_segments.append((seg_in, seg_out, path, needs_render))
+
+    return {"segments_dir":segments_dir, "segments":plan_segments}
@@ -0,0 +1,112 @@
+"""
+    Flowblade Movie Editor is a nonlinear video editor.
+    Copyright 2012 Janne Liljeblad.
+
+    This file is part of Flowblade Movie Editor <https://github.com/jliljebl/flowblade/>.
+
+    Flowblade Movie Editor is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Flowblade Movie Editor is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Flowblade Movie Editor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+"""
+Module runs application startup init stages and reports time used by them.
+
+Stages not depending on each other are run concurrently, and XML documents
+needed later in startup are parsed ahead while MLT environment is being detected.
+"""
+
+import concurrent.futures
+import threading
+import time
+import xml.dom.minidom
+
+STARTUP_THREADS = 4
+
+_start_time = None
+_phase_start = None
+_phases = [] # (name, seconds, concurrent)
+_phases_lock = threading.Lock()
+
+_executor = None
+_xml_futures = {} # path -> Future for parsed document
+
+
+# ------------------------------------------------------ timing
+def start():
+    global _start_time, _phase_start
+    _start_time = time.monotonic()
+    _phase_start = _start_time
+
+def phase_done(name):
+    # Records time since previous phase on main thread.
+    global _phase_start
+    if _start_time == None:
+        return
+    now = time.monotonic()
+    with _phases_lock:
+        _phases.append((name, now - _phase_start, False))
+    _phase_start = now
+
+def _timed(name, func):
+    stage_start = time.monotonic()
+    func()
+    with _phases_lock:
+        _phases.append((name, time.monotonic() - stage_start, True))
+
+def print_report():
+    if _start_time == None:
+        return
+    print("Startup phases:")
+    with _phases_lock:
+        for name, seconds, is_concurrent in _phases:
+            if is_concurrent == True:
+                name = name + " (concurrent)"
+            print("    %-40s %6.3fs" % (name, seconds))
+    print("Startup total: %.3fs" % (time.monotonic() - _start_time))
+
+
+# ------------------------------------------------------ concurrent stages
+def run_concurrently(stages):
+    """
+    Runs list of (name, func) stages in parallel and returns when all are done.
+    Exception in a stage is raised here after all stages have completed.
+    """
+    futures = [_get_executor().submit(_timed, name, func) for name, func in stages]
+    concurrent.futures.wait(futures)
+    for future in futures:
+        future.result()
+
+def prefetch_xml(path):
+    if path not in _xml_futures:
+        _xml_futures[path] = _get_executor().submit(xml.dom.minidom.parse, path)
+
+def parse_xml(path):
+    """
+    Returns parsed document, prefetched documents are only used once.
+    """
+    future = _xml_futures.pop(path, None)
+    if future != None:
+        return future.result()
+    return xml.dom.minidom.parse(path)
+
+def shutdown():
+    global _executor
+    if _executor != None:
+        _executor.shutdown(wait=False)
+        _executor = None
+
+def _get_executor():
+    global _executor
+    if _executor == None:
+        _executor = concurrent.futures.ThreadPoolExecutor(max_workers=STARTUP_THREADS)
+    return _executor
@@ -0,0 +1,123 @@
+"""
+Times keyframes property write back with 5000 keyframes when a single keyframe
+is changed on each update, as happens during keyframe slider drags.
+
+    before: value string is built by concatenating all keyframes and written to
+            both MLT filter and persistent filter object property on every update.
+    after:  value string is built with KeyframesStringBuilder that only encodes the
+            changed keyframe, and only MLT value is written during drag.
+
+Run from Flowblade folder: python3 tests/benchmark_keyframes.py
+"""
+
+import gettext
+import os
+import sys
+import time
+
+modules_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, modules_path)
+
+import processutils
+processutils.update_sys_path(modules_path)
+
+try:
+    import mlt7 as mlt
+except:
+    import mlt
+
+import animatedvalue
+import appconsts
+import propertyedit
+
+KEYFRAMES_COUNT = 5000
+UPDATES_COUNT = 200
+
+
+class FakeClip:
+
+    def __init__(self, filter_object):
+        self.filters = [filter_object]
+
+
+class FakeFilterObject:
+
+    def __init__(self, mlt_filter):
+        self.mlt_filter = mlt_filter
+        self.properties = [("level", "", appconsts.PROP_EXPRESSION)]
+
+
+def _create_property(mlt_filter):
+    # KeyFrameHCSFilterProperty without filter info args, ranges are set directly.
+    ep = propertyedit.KeyFrameHCSFilterProperty.__new__(propertyedit.KeyFrameHCSFilterProperty)
+    ep.name = "level"
+    ep.type = appconsts.PROP_EXPRESSION
+    ep.property_index = 0
+    ep.filter_index = 0
+    ep.is_compositor_filter = False
+    ep.clip = FakeClip(FakeFilterObject(mlt_filter))
+    ep.input_range = (0.0, 1.0)
+    ep.output_range = (0.0, 1.0)
+    ep.kf_str_builder = None
+    ep.live_write = False
+    ep.value = ""
+    return ep
+
+def _write_out_keyframes_before(ep, keyframes):
+    # Implementation before KeyframesStringBuilder and live writes.
+    val_str = ""
+    for kf in keyframes:
+        frame, val, kf_type = kf
+        eq_str = animatedvalue.TYPE_TO_EQ_STRING[kf_type]
+        val_str += str(frame) + eq_str + str(ep.get_out_value(val)) + ";"
+    val_str = val_str.strip(";")
+    ep.write_value(val_str)
+
+def _write_out_keyframes_after(ep, keyframes):
+    ep.live_write = True
+    ep.write_out_keyframes(keyframes)
+
+def _build_string_before(ep, keyframes):
+    val_str = ""
+    for kf in keyframes:
+        frame, val, kf_type = kf
+        eq_str = animatedvalue.TYPE_TO_EQ_STRING[kf_type]
+        val_str += str(frame) + eq_str + str(ep.get_out_value(val)) + ";"
+    return val_str.strip(";")
+
+def _build_string_after(ep, keyframes):
+    if ep.kf_str_builder == None:
+        ep.kf_str_builder = propertyedit.KeyframesStringBuilder(ep._get_keyframe_str)
+    return ep.kf_str_builder.build(keyframes)
+
+def _time_updates(ep, update_func):
+    # Returns mean milliseconds per update, keyframe in the middle is dragged.
+    keyframes = [(i * 10, 0.5, appconsts.KEYFRAME_LINEAR) for i in range(0, KEYFRAMES_COUNT)]
+    drag_index = KEYFRAMES_COUNT // 2
+    update_func(ep, keyframes) # first write encodes all keyframes
+    start = time.perf_counter()
+    for i in range(0, UPDATES_COUNT):
+        frame, val, kf_type = keyframes[drag_index]
+        keyframes[drag_index] = (frame, (i % 100) / 100.0, kf_type)
+        update_func(ep, keyframes)
+    return (time.perf_counter() - start) * 1000.0 / UPDATES_COUNT
+
+def main():
+    gettext.install("flowblade") # animatedvalue.init() uses _()
+    animatedvalue.init()
+    mlt.Factory().init()
+    profile = mlt.Profile()
+    mlt_filter = mlt.Filter(profile, "brightness")
+
+    results = [("string build", _build_string_before, _build_string_after),
+               ("string build and write", _write_out_keyframes_before, _write_out_keyframes_after)]
+
+    print(KEYFRAMES_COUNT, "keyframes,", UPDATES_COUNT, "updates with one changed keyframe")
+    for name, before_func, after_func in results:
+        before = _time_updates(_create_property(mlt_filter), before_func)
+        after = _time_updates(_create_property(mlt_filter), after_func)
+        print("%-24s before %7.3f ms  after %7.3f ms" % (name, before, after))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Flowblade modules are imported as top level modules, set sys.path up like launch scripts do.
+modules_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, modules_path)
+
+import processutils
+processutils.update_sys_path(modules_path)
@@ -0,0 +1,149 @@
+"""
+Checks Sequence.restack_compositors() against a full rebuild using a fake MLT field
+that records transition planting order, after randomized compositor edits.
+"""
+
+import importlib.util
+import os
+import random
+
+import pytest
+
+pytest.importorskip("gi")
+if importlib.util.find_spec("mlt7") == None and importlib.util.find_spec("mlt") == None:
+    pytest.skip("MLT is not available", allow_module_level=True)
+
+import appconsts
+import sequence
+
+EDITS_COUNT = 300
+TRACKS_COUNT = 6
+
+
+class FakeField:
+    # MLT field composites planted transitions in planting order.
+    def __init__(self):
+        self.planted = []
+
+    def plant_transition(self, mlt_transition, a_track, b_track):
+        self.planted.append(mlt_transition)
+
+    def disconnect_service(self, mlt_transition):
+        self.planted.remove(mlt_transition)
+
+
+class FakeMltTransition:
+
+    def set(self, name, value):
+        pass
+
+
+class FakeTransition:
+
+    def __init__(self):
+        self.mlt_transition = FakeMltTransition()
+        self.a_track = 0
+        self.b_track = 0
+
+    def set_tracks(self, a_track, b_track):
+        self.a_track = a_track
+        self.b_track = b_track
+
+
+class FakeCompositor:
+
+    def __init__(self, type_id):
+        self.type_id = type_id
+        self.transition = FakeTransition()
+        self.planted = False
+        self.plant_index = -1
+        self.clip_in = -1
+        self.clip_out = -1
+        self.origin_clip_id = None
+        self.obey_autofollow = True
+        self.destroy_id = os.urandom(16)
+
+    def clone_properties(self, source_compositor):
+        self.origin_clip_id = source_compositor.origin_clip_id
+        self.destroy_id = source_compositor.destroy_id
+
+    def set_in_and_out(self, in_frame, out_frame):
+        self.clip_in = in_frame
+        self.clip_out = out_frame
+
+
+def _create_sequence(compositing_mode):
+    # Only compositor data of Sequence is needed, MLT objects are not created.
+    seq = sequence.Sequence.__new__(sequence.Sequence)
+    seq.field = FakeField()
+    seq.compositors = []
+    seq.origin_clip_compositors = {}
+    seq.compositing_mode = compositing_mode
+    seq.create_compositor = lambda compositor_type: FakeCompositor(compositor_type)
+    return seq
+
+def _get_full_rebuild_order(seq, compositors_before):
+    # Full rebuild sorts compositors and replants all of them in sorted order.
+    rebuild_seq = _create_sequence(seq.compositing_mode)
+    rebuild_seq.compositors = list(compositors_before)
+    rebuild_seq.sort_compositors()
+    return [compositor.destroy_id for compositor in rebuild_seq.compositors]
+
+def _restack_and_check(seq, compositors_before):
+    seq.restack_compositors()
+
+    assert seq.field.planted == [compositor.transition.mlt_transition for compositor in seq.compositors]
+    assert [compositor.destroy_id for compositor in seq.compositors] == _get_full_rebuild_order(seq, compositors_before)
+    for compositor in seq.compositors:
+        assert compositor in seq.origin_clip_compositors[compositor.origin_clip_id]
+
+def _add_compositor(rng, seq):
+    compositor = seq.create_compositor("##fake")
+    compositor.transition.set_tracks(1, rng.randint(1, TRACKS_COUNT))
+    compositor.set_in_and_out(0, rng.randint(1, 100))
+    compositor.origin_clip_id = rng.randint(0, 10)
+    seq.add_compositor(compositor)
+
+@pytest.mark.parametrize("compositing_mode", [appconsts.COMPOSITING_MODE_TOP_DOWN_FREE_MOVE,
+                                              appconsts.COMPOSITING_MODE_STANDARD_FULL_TRACK])
+@pytest.mark.parametrize("seed", range(0, 6))
+def test_restack_matches_full_rebuild(seed, compositing_mode):
+    rng = random.Random(seed)
+    seq = _create_sequence(compositing_mode)
+
+    kept_compositors = 0
+    for i in range(0, EDITS_COUNT):
+        edit = rng.randint(0, 2)
+        if edit == 0 or len(seq.compositors) == 0:
+            _add_compositor(rng, seq)
+        elif edit == 1:
+            compositor = rng.choice(seq.compositors)
+            compositor.transition.set_tracks(1, rng.randint(1, TRACKS_COUNT))
+        else:
+            seq.remove_compositor(rng.choice(seq.compositors))
+
+        compositors_before = list(seq.compositors)
+        _restack_and_check(seq, compositors_before)
+        kept_compositors += len([c for c in compositors_before if c in seq.compositors])
+
+    # Restacks keep planted compositors, they are not all replanted every time.
+    assert kept_compositors > 0
+
+def test_adding_topmost_compositor_keeps_others():
+    seq = _create_sequence(appconsts.COMPOSITING_MODE_TOP_DOWN_FREE_MOVE)
+    for b_track in [2, 3, 4]:
+        compositor = seq.create_compositor("##fake")
+        compositor.transition.set_tracks(1, b_track)
+        seq.add_compositor(compositor)
+    seq.restack_compositors()
+    planted = list(seq.compositors)
+
+    compositor = seq.create_compositor("##fake")
+    compositor.transition.set_tracks(1, 1)
+    seq.add_compositor(compositor)
+    compositors_before = list(seq.compositors)
+    _restack_and_check(seq, compositors_before)
+
+    # Top down mode composites highest track first, lowest track compositor is planted last.
+    assert seq.compositors[0:3] == planted
+    assert seq.compositors[3] is compositor
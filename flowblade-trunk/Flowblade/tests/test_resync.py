@@ -0,0 +1,149 @@
+"""
+Checks incrementally computed child clip sync states against a full recompute
+after randomized edit sequences done on fake tracks.
+"""
+
+import random
+
+import pytest
+
+import editorstate
+import resync
+
+EDITS_COUNT = 400
+
+
+class FakeClip:
+
+    def __init__(self, length, clip_in=0, is_blank=False):
+        self.clip_in = clip_in
+        self.clip_out = clip_in + length - 1 # end inclusive
+        self.is_blanck_clip = is_blank
+        self.sync_data = None
+
+
+class FakeSyncData:
+
+    def __init__(self, master_clip, master_clip_track, pos_offset):
+        self.master_clip = master_clip
+        self.master_clip_track = master_clip_track
+        self.pos_offset = pos_offset
+        self.sync_state = None
+
+
+class FakeTrack:
+
+    def __init__(self):
+        self.clips = []
+
+
+class FakeSequence:
+
+    def __init__(self, tracks_count):
+        self.tracks = [FakeTrack() for i in range(0, tracks_count)]
+
+
+class FakeProject:
+
+    def __init__(self, seq):
+        self.c_seq = seq
+
+
+# Edits report changes to resync the same way atomic edit ops in edit.py do.
+def _insert_clip(track, index, clip):
+    track.clips.insert(index, clip)
+    resync.clip_added_to_timeline(clip, track)
+
+def _insert_blank(track, index, length):
+    track.clips.insert(index, FakeClip(length, 0, True))
+    resync.track_changed(track)
+
+def _remove_clip(track, index):
+    clip = track.clips.pop(index)
+    resync.clip_removed_from_timeline(clip)
+    resync.track_changed(track)
+    return clip
+
+def _set_sync(child_clip, child_track, parent_clip, parent_track, pos_offset):
+    child_clip.sync_data = FakeSyncData(parent_clip, parent_track, pos_offset)
+    resync.clip_added_to_timeline(child_clip, child_track)
+
+def _clear_sync(child_clip):
+    child_clip.sync_data = None
+    resync.clip_sync_cleared(child_clip)
+
+
+def _do_random_edit(rng, seq, removed_clips):
+    parent_track = seq.tracks[1]
+    edit_tracks = seq.tracks[1:]
+    track = rng.choice(edit_tracks)
+    index = rng.randint(0, len(track.clips))
+    edit = rng.randint(0, 6)
+
+    if edit == 0:
+        _insert_clip(track, index, FakeClip(rng.randint(1, 50), rng.randint(0, 20)))
+    elif edit == 1:
+        _insert_blank(track, index, rng.randint(1, 30))
+    elif edit == 2 and len(track.clips) > 0:
+        removed_clips.append(_remove_clip(track, rng.randrange(len(track.clips))))
+    elif edit == 3 and len(removed_clips) > 0:
+        # Undo puts back the same clip objects.
+        _insert_clip(track, index, removed_clips.pop(rng.randrange(len(removed_clips))))
+    elif edit == 4:
+        parents = [clip for clip in parent_track.clips if clip.is_blanck_clip == False]
+        children = []
+        for child_track in seq.tracks[2:]:
+            children += [(clip, child_track) for clip in child_track.clips if clip.is_blanck_clip == False]
+        if len(parents) > 0 and len(children) > 0:
+            child_clip, child_track = rng.choice(children)
+            _set_sync(child_clip, child_track, rng.choice(parents), parent_track, rng.randint(-20, 20))
+    elif edit == 5:
+        children = [clip for clip in resync.sync_children]
+        if len(children) > 0:
+            _clear_sync(rng.choice(children))
+    elif edit == 6 and len(track.clips) > 0:
+        # Trims are done by replacing clip with a new one with changed in and out.
+        remove_index = rng.randrange(len(track.clips))
+        clip = track.clips[remove_index]
+        if clip.is_blanck_clip == False and clip.sync_data == None:
+            _remove_clip(track, remove_index)
+            _insert_clip(track, remove_index, FakeClip(rng.randint(1, 50), rng.randint(0, 20)))
+
+def _assert_matches_full_recompute(seq):
+    full_states = resync.get_full_child_clip_sync_states()
+    assert set(resync.sync_children.keys()) == set(full_states.keys())
+    for child_clip, (sync_state, sync_diff) in full_states.items():
+        assert child_clip.sync_data.sync_state == sync_state
+        if sync_diff != None:
+            assert child_clip.sync_diff == sync_diff
+
+
+@pytest.mark.parametrize("seed", range(0, 8))
+def test_incremental_sync_states_match_full_recompute(seed, monkeypatch):
+    rng = random.Random(seed)
+    seq = FakeSequence(5) # black track, parent track V1, three child tracks
+    monkeypatch.setattr(editorstate, "project", FakeProject(seq))
+    resync.sequence_changed(seq)
+
+    removed_clips = []
+    for i in range(0, EDITS_COUNT):
+        _do_random_edit(rng, seq, removed_clips)
+        resync.calculate_and_set_child_clip_sync_states()
+        _assert_matches_full_recompute(seq)
+
+def test_sequence_changed_computes_states_of_loaded_children(monkeypatch):
+    seq = FakeSequence(3)
+    parent_track = seq.tracks[1]
+    child_track = seq.tracks[2]
+    parent_clip = FakeClip(20, 5)
+    child_clip = FakeClip(10, 0)
+    parent_track.clips = [FakeClip(10, 0, True), parent_clip]
+    child_track.clips = [FakeClip(15, 0, True), child_clip]
+    child_clip.sync_data = FakeSyncData(parent_clip, parent_track, 0)
+    monkeypatch.setattr(editorstate, "project", FakeProject(seq))
+
+    resync.sequence_changed(seq)
+
+    # Child first frame is at 15 - 0, parent first frame at 10 - 5.
+    assert child_clip.sync_diff == 10
+    _assert_matches_full_recompute(seq)
@@ -0,0 +1,159 @@
+"""
+Checks incremental sequence link cycle test in undo.py against a full DFS
+over the whole link graph after randomized link edits.
+"""
+
+import random
+
+import pytest
+
+pytest.importorskip("gi")
+
+import undo
+
+EDITS_COUNT = 300
+
+
+class FakeClip:
+
+    def __init__(self, link_seq_data=None):
+        self.link_seq_data = link_seq_data
+
+
+class FakeTrack:
+
+    def __init__(self):
+        self.clips = []
+
+
+class FakeSequence:
+
+    def __init__(self, uid, tracks_count=3):
+        self.uid = uid
+        self.tracks = [FakeTrack() for i in range(0, tracks_count)]
+
+
+class FakeProject:
+
+    def __init__(self):
+        self.sequences = []
+
+
+def _full_graph_is_cyclic(project):
+    # Builds link graph from all clips and does a full DFS with white, grey and black colors.
+    graph = {}
+    for seq in project.sequences:
+        targets = set()
+        for track in seq.tracks:
+            for clip in track.clips:
+                if clip.link_seq_data != None:
+                    targets.add(clip.link_seq_data)
+        graph[seq.uid] = targets
+
+    WHITE, GREY, BLACK = 0, 1, 2
+    colors = dict((uid, WHITE) for uid in graph)
+
+    def visit(uid):
+        colors[uid] = GREY
+        for target_uid in graph[uid]:
+            if target_uid not in colors:
+                continue # link to deleted sequence
+            if colors[target_uid] == GREY:
+                return True
+            if colors[target_uid] == WHITE and visit(target_uid) == True:
+                return True
+        colors[uid] = BLACK
+        return False
+
+    for uid in graph:
+        if colors[uid] == WHITE and visit(uid) == True:
+            return True
+    return False
+
+def _insert_link_clip(track, index, link_seq_uid):
+    track.clips.insert(index, FakeClip(link_seq_uid))
+    undo.seq_link_track_changed(track)
+
+def _remove_clip(track, index):
+    clip = track.clips.pop(index)
+    if clip.link_seq_data != None:
+        undo.seq_link_track_changed(track)
+    return clip
+
+
+@pytest.mark.parametrize("seed", range(0, 8))
+def test_incremental_cycle_test_matches_full_dfs(seed):
+    rng = random.Random(seed)
+    project = FakeProject()
+    next_uid = 0
+    for i in range(0, 3):
+        project.sequences.append(FakeSequence(next_uid))
+        next_uid += 1
+    assert undo._seq_link_graph_is_cyclic(project) == False
+
+    cycles_found = 0
+    for i in range(0, EDITS_COUNT):
+        seq = rng.choice(project.sequences)
+        track = rng.choice(seq.tracks)
+        edit = rng.randint(0, 9)
+        if edit < 5:
+            target_seq = rng.choice(project.sequences)
+            index = rng.randint(0, len(track.clips))
+            _insert_link_clip(track, index, target_seq.uid)
+            revert = lambda: _remove_clip(track, index)
+        elif edit < 7:
+            track.clips.insert(rng.randint(0, len(track.clips)), FakeClip())
+            revert = None
+        elif edit < 9 and len(track.clips) > 0:
+            index = rng.randrange(len(track.clips))
+            _remove_clip(track, index)
+            revert = None
+        elif edit == 9 and len(project.sequences) < 8:
+            new_seq = FakeSequence(next_uid)
+            next_uid += 1
+            new_seq.tracks[0].clips.append(FakeClip(rng.choice(project.sequences).uid))
+            project.sequences.append(new_seq)
+            revert = lambda: project.sequences.remove(new_seq)
+        else:
+            continue
+
+        is_cyclic = undo._seq_link_graph_is_cyclic(project)
+        assert is_cyclic == _full_graph_is_cyclic(project)
+
+        if is_cyclic == True:
+            # Edit creating cycle is reverted like forced undo does.
+            cycles_found += 1
+            revert()
+            assert undo._seq_link_graph_is_cyclic(project) == False
+            assert _full_graph_is_cyclic(project) == False
+
+    assert cycles_found > 0
+
+def test_self_link_is_cyclic():
+    project = FakeProject()
+    seq = FakeSequence(0)
+    project.sequences.append(seq)
+    assert undo._seq_link_graph_is_cyclic(project) == False
+
+    _insert_link_clip(seq.tracks[0], 0, seq.uid)
+    assert undo._seq_link_graph_is_cyclic(project) == True
+
+def test_removed_link_clears_edge():
+    project = FakeProject()
+    seq_a = FakeSequence(0)
+    seq_b = FakeSequence(1)
+    project.sequences += [seq_a, seq_b]
+    _insert_link_clip(seq_a.tracks[0], 0, seq_b.uid)
+    _insert_link_clip(seq_a.tracks[1], 0, seq_b.uid)
+    assert undo._seq_link_graph_is_cyclic(project) == False
+
+    # One of two link clips removed, edge a -> b is still there.
+    _remove_clip(seq_a.tracks[0], 0)
+    _insert_link_clip(seq_b.tracks[0], 0, seq_a.uid)
+    assert undo._seq_link_graph_is_cyclic(project) == True
+
+    _remove_clip(seq_b.tracks[0], 0)
+    _remove_clip(seq_a.tracks[1], 0)
+    undo._seq_link_graph_is_cyclic(project)
+    _insert_link_clip(seq_b.tracks[0], 0, seq_a.uid)
+    assert undo._seq_link_graph_is_cyclic(project) == False
@@ -908,6 +908,8 @@ def sync_all_compositors():
     
     for sync_item in full_sync_data:
         destroy_id, orig_in, orig_out, clip_start, clip_end, clip_track, orig_compositor_track = sync_item
+        if orig_in == clip_start and orig_out == clip_end:
+            continue # Already in sync, no edit needed.
         compositor = current_sequence().get_compositor_for_destroy_id(destroy_id)
         data = {"compositor":compositor,"clip_in":clip_start,"clip_out":clip_end}
         action = edit.move_compositor_action(data)
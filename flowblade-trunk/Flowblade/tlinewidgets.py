@@ -138,6 +138,7 @@ CLOSE_MATCH_ICON = None
 COMPOSITOR_ICON = None
 TITLE_ICON = None
 TC_POINTER_HEAD = None
+POINTER_HEAD_HALF_WIDTH = 8 # TC_POINTER_HEAD is drawn centered on frame pointer
 
 # tc frame scale consts
 SCALE_LINE_Y = 4.5 # scale horizontal line pos
@@ -628,6 +629,19 @@ def _get_standard_mode_compositor_rect(scale_in, scale_length, y):
     return (scale_mid - side_half, y, side_half * 2, side_half * 2)
         
 # --------------------------------------- edit mode overlay draw handling
+def _queue_pointer_areas_draw(widget, drawn_pointer_x, half_width):
+    if drawn_pointer_x == None:
+        widget.queue_draw()
+        return
+
+    frame_x = math.floor((PLAYER().tracktor_producer.frame() - pos) * pix_per_frame) + 0.5
+    if frame_x == drawn_pointer_x:
+        return
+
+    h = widget.get_allocated_height()
+    for x in (drawn_pointer_x, frame_x):
+        widget.queue_draw_area(int(x) - half_width - 1, 0, 2 * half_width + 3, h)
+
 def set_edit_mode(data, draw_func):
     global canvas_widget
     canvas_widget.edit_mode_data = data
@@ -1474,6 +1488,7 @@ class TimeLineCanvas:
         
         # Edit mode
         self.edit_mode_data = None
+        self.drawn_pointer_x = None
         self.edit_mode_overlay_draw_func = draw_insert_overlay
         
         # Drag state
@@ -1713,6 +1728,7 @@ class TimeLineCanvas:
         cr.line_to(frame_x, h)
         cr.set_line_width(1.0)
         cr.stroke()
+        self.drawn_pointer_x = frame_x
 
         # Draw edit mode overlay
         if self.edit_mode_overlay_draw_func != None:
@@ -1720,6 +1736,16 @@ class TimeLineCanvas:
         
         audiowaveformrenderer.launch_queued_renders()
 
+    def queue_playhead_draw(self):
+        """
+        Redraws areas of previous and current frame pointer, or whole
+        canvas if edit mode overlay is being displayed.
+        """
+        if self.edit_mode_data != None or EDIT_MODE() == editorstate.SLIDE_TRIM:
+            self.widget.queue_draw()
+            return
+        _queue_pointer_areas_draw(self.widget, self.drawn_pointer_x, 1)
+
     def draw_track(self, cr, track, y, width):
         """
         Draws visible clips in track.
@@ -2638,6 +2664,7 @@ class TimeLineFrameScale:
         self.widget.mouse_scroll_func = mouse_scroll_listener
         self.drag_on = False
         self.set_default_callback = set_default_callback
+        self.drawn_pointer_x = None
 
         global FRAME_SCALE_SELECTED_COLOR_GRAD, FRAME_SCALE_SELECTED_COLOR_GRAD_L, MARK_COLOR 
         FRAME_SCALE_SELECTED_COLOR_GRAD = DARK_FRAME_SCALE_SELECTED_COLOR_GRAD
@@ -2841,6 +2868,13 @@ class TimeLineFrameScale:
         # Draw pos triangle
         cr.set_source_surface(TC_POINTER_HEAD, frame_x - 7.5, 0)
         cr.paint()
+        self.drawn_pointer_x = frame_x
+
+    def queue_playhead_draw(self):
+        """
+        Redraws areas of previous and current frame pointer.
+        """
+        _queue_pointer_areas_draw(self.widget, self.drawn_pointer_x, POINTER_HEAD_HALF_WIDTH)
 
     def draw_mark_in(self, cr, h):
         """
@@ -57,6 +57,8 @@ import mltprofiles
 import persistance
 import respaths
 import renderconsumer
+import rendergraphcache
+import smartrender
 import toolguicomponents
 import userfolders
 import utils
@@ -124,25 +126,25 @@ class QueueRunnerThread(threading.Thread):
             project_file_path = get_projects_dir() + identifier + ".flb"
             persistance.show_messages = False
 
-            project = persistance.load_project(project_file_path, False)
-
-            project.c_seq.fix_v1_for_render()
+            producer = rendergraphcache.get_render_producer(project_file_path)
 
             maybe_create_render_folder(render_item.render_path)
         
-            producer = project.c_seq.tractor
             profile = mltprofiles.get_profile(render_item.render_data.profile_name)
-            consumer = renderconsumer.get_mlt_render_consumer(render_item.render_path, 
-                                                              profile,
-                                                              render_item.args_vals_list)
 
             # Get render range
             start_frame, end_frame, wait_for_stop_render = get_render_range(render_item)
             
             # Create and launch render thread
-            global render_thread 
-            render_thread = renderconsumer.FileRenderPlayer(None, producer, consumer, start_frame, end_frame) # None == file name not needed this time when using FileRenderPlayer because callsite keeps track of things
-            render_thread.wait_for_producer_end_stop = wait_for_stop_render
+            global render_thread
+            render_thread = get_smart_render_player(render_item, project_file_path, producer, profile,
+                                                    start_frame, end_frame, wait_for_stop_render)
+            if render_thread == None:
+                consumer = renderconsumer.get_mlt_render_consumer(render_item.render_path, 
+                                                                  profile,
+                                                                  render_item.args_vals_list)
+                render_thread = renderconsumer.FileRenderPlayer(None, producer, consumer, start_frame, end_frame) # None == file name not needed this time when using FileRenderPlayer because callsite keeps track of things
+                render_thread.wait_for_producer_end_stop = wait_for_stop_render
             render_thread.start()
 
             # Set render start time and item state
@@ -684,6 +686,26 @@ def get_render_range(render_item):
     
     return (start_frame, end_frame, wait_for_stop_render)
 
+def get_smart_render_player(render_item, project_file_path, producer, profile, start_frame, end_frame, wait_for_stop_render):
+    """
+    Returns smartrender.SmartRenderPlayer if smart render is on and some segments
+    of render range can be copied from source media, otherwise None.
+    """
+    if editorpersistance.prefs.smart_render == False or renderconsumer.ffmpeg_cli_available == False:
+        return None
+
+    try:
+        segments = smartrender.get_render_plan(project_file_path, render_item.args_vals_list, profile, start_frame, end_frame)
+    except Exception as e:
+        print("Smart render planning failed:", e)
+        return None
+    if segments == None:
+        return None
+
+    return smartrender.SmartRenderPlayer(render_item.render_path, producer, profile,
+                                         render_item.args_vals_list, segments, wait_for_stop_render)
+
+
 
 # -------------------------------------------------------------------- gui
 class BatchRenderWindow:
@@ -1316,11 +1338,7 @@ class SingleRenderThread(threading.Thread):
         project_file_path = hidden_dir + CURRENT_RENDER_PROJECT_FILE
         persistance.show_messages = False
 
-        project = persistance.load_project(project_file_path, False)
-
-        project.c_seq.fix_v1_for_render()
-
-        producer = project.c_seq.tractor
+        producer = rendergraphcache.get_render_producer(project_file_path)
         profile = mltprofiles.get_profile(render_item.render_data.profile_name)
         
         vcodec = self.get_vcodec(render_item)
@@ -1329,23 +1347,29 @@ class SingleRenderThread(threading.Thread):
         # We just autocreate folder if for some reason it has been deleted.
         maybe_create_render_folder(render_item.render_path)
 
+        # Get render range
+        start_frame, end_frame, wait_for_stop_render = get_render_range(render_item)
+
         if self.is_frame_sequence_render(vcodec) == True and vformat == None:
             # Frame sequence render
+            render_thread = None
             consumer = renderconsumer.get_img_seq_render_consumer_codec_ext(render_item.render_path,
                                                                              profile,  
                                                                              vcodec, 
                                                                              self.get_frame_seq_ext(vcodec))
         else: # All other renders
-            consumer = renderconsumer.get_mlt_render_consumer(render_item.render_path, 
-                                                              profile,
-                                                              render_item.args_vals_list)
+            render_thread = get_smart_render_player(render_item, project_file_path, producer, profile,
+                                                    start_frame, end_frame, wait_for_stop_render)
+            consumer = None
+            if render_thread == None:
+                consumer = renderconsumer.get_mlt_render_consumer(render_item.render_path, 
+                                                                  profile,
+                                                                  render_item.args_vals_list)
 
-        # Get render range
-        start_frame, end_frame, wait_for_stop_render = get_render_range(render_item)
-        
         # Create and launch render thread
-        render_thread = renderconsumer.FileRenderPlayer(None, producer, consumer, start_frame, end_frame) # None == file name not needed this time when using FileRenderPlayer because callsite keeps track of things
-        render_thread.wait_for_producer_end_stop = wait_for_stop_render
+        if render_thread == None:
+            render_thread = renderconsumer.FileRenderPlayer(None, producer, consumer, start_frame, end_frame) # None == file name not needed this time when using FileRenderPlayer because callsite keeps track of things
+            render_thread.wait_for_producer_end_stop = wait_for_stop_render
         render_thread.start()
 
         # Set render start time and item state
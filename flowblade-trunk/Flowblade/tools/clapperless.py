@@ -24,7 +24,8 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import logging, time, struct, subprocess, sys, os, array, argparse
-import tempfile, hashlib, re
+import tempfile, hashlib, re, pickle
+import concurrent.futures
 import numpy
 
 import userfolders
@@ -33,6 +34,12 @@ OFFSETS_DATA_FILE = "audio_offsets_data"
 OFFSETS_DATA_FILE_ID_DEFAULT = "idstr_default"
 
 MAGIC_SEPARATOR = "##¤¤%%¤¤##¤¤%%¤¤##"
+NO_LEVELS_FILE = "-"
+
+# Coarse-to-fine alignment tuning.
+PYRAMID_MIN_LENGTH = 64   # Envelopes are not decimated below this length.
+COARSE_MAX_LENGTH = 4096  # Full cross-correlation is done at first level this short.
+SEARCH_WINDOW = 4         # Lag search radius in samples at each finer level.
 
 __version__ = "0.99.8"
 
@@ -143,9 +150,177 @@ def rigidalign(reference, targets):
         # Sign reversed to move the target instead of the reference
     return shifts
 
+def decimate(envelope):
+    """
+    Halve the samplerate of an envelope by averaging sample pairs.
+    """
+    n = len(envelope) // 2
+    return 0.5 * (envelope[0:2 * n:2] + envelope[1:2 * n:2])
+
+
+def build_pyramid(envelope):
+    """
+    Build a list of progressively decimated envelopes.
+
+    Level 0 is the full rate envelope normalized to zero mean and unit
+    variance, each following level has half the samplerate of the previous.
+
+    @param envelope: the amplitude envelope
+    @type envelope: Sequence(Number)
+    @returns: envelopes from finest to coarsest
+    @rtype: list(numpy.ndarray)
+
+    """
+    level = numpy.asarray(envelope, dtype=numpy.float64)
+    level = level - numpy.mean(level)
+    std = numpy.std(level)
+    if std > 0.0:
+        level = level / std
+    pyramid = [level]
+    while len(pyramid[-1]) >= 2 * PYRAMID_MIN_LENGTH:
+        pyramid.append(decimate(pyramid[-1]))
+    return pyramid
+
+
+def _correlation_at(reference, target, lag):
+    """
+    Normalized correlation of reference[n] and target[n + lag] over their overlap.
+    """
+    start = max(0, -lag)
+    end = min(len(reference), len(target) - lag)
+    if end - start < 2:
+        return -1.0
+    r = reference[start:end]
+    t = target[start + lag:end + lag]
+    r = r - numpy.mean(r)
+    t = t - numpy.mean(t)
+    norm = numpy.sqrt(numpy.dot(r, r) * numpy.dot(t, t))
+    if norm == 0.0:
+        return 0.0
+    return float(numpy.dot(r, t) / norm)
+
+
+def coarse_to_fine_align(reference_pyramid, target_pyramid):
+    """
+    Estimate the shift between two envelopes using their pyramids.
+
+    A full FFT cross-correlation is only computed at the first pyramid level
+    where both envelopes are shorter than COARSE_MAX_LENGTH. The found lag is
+    then refined on each finer level by searching +-SEARCH_WINDOW samples
+    around the doubled lag of the level above.
+
+    @param reference_pyramid: pyramid of the waveform to regard as fixed
+    @param target_pyramid: pyramid of the waveform to align to reference
+    @returns: (shift, confidence), shift uses the same convention as
+        rigidalign() and confidence is the normalized correlation
+        at the found shift in range -1.0 - 1.0
+    @rtype: (L{float}, L{float})
+
+    """
+    levels = min(len(reference_pyramid), len(target_pyramid))
+    coarse = levels - 1
+    for i in range(0, levels):
+        if max(len(reference_pyramid[i]), len(target_pyramid[i])) <= COARSE_MAX_LENGTH:
+            coarse = i
+            break
+
+    # rigidalign() returns negated lag, lag here maximizes dot(reference[n], target[n + lag]).
+    lag = -int(round(rigidalign(reference_pyramid[coarse], [target_pyramid[coarse]])[0]))
+
+    scores = {}
+    for i in range(coarse, -1, -1):
+        if i != coarse:
+            lag = lag * 2
+        reference = reference_pyramid[i]
+        target = target_pyramid[i]
+        scores = {}
+        for candidate in range(lag - SEARCH_WINDOW, lag + SEARCH_WINDOW + 1):
+            scores[candidate] = _correlation_at(reference, target, candidate)
+        lag = max(scores, key=scores.get)
+
+    confidence = scores[lag]
+    subsample_shift = 0.0
+    if (lag - 1) in scores and (lag + 1) in scores:
+        denominator = (2 * scores[lag] - scores[lag - 1] - scores[lag + 1])
+        if denominator > 0.0:
+            subsample_shift = submax(scores[lag - 1], scores[lag], scores[lag + 1])
+
+    return (-(lag + subsample_shift), confidence)
+
+
+def _align_pair(pair_data):
+    # Process pool worker, pair_data is (i, j, pyramid_i, pyramid_j).
+    i, j, pyramid_i, pyramid_j = pair_data
+    shift, confidence = coarse_to_fine_align(pyramid_i, pyramid_j)
+    return (i, j, shift, confidence)
+
+
+def solve_offsets(pyramids, reference_index=0, max_workers=None):
+    """
+    Solve offsets of all envelopes relative to the reference envelope.
+
+    All pairwise shifts are computed in one batch on a process pool and
+    combined with a confidence weighted least squares fit, so that weak 
+    pairs are supported by their links through other files.
+
+    @param pyramids: envelope pyramids as returned by build_pyramid()
+    @returns: list of (offset, confidence) for each envelope and list
+        of (i, j, shift, confidence) for all computed pairs
+    @rtype: (list((L{float}, L{float})), list)
+
+    """
+    count = len(pyramids)
+    pairs_data = []
+    for i in range(0, count):
+        for j in range(i + 1, count):
+            pairs_data.append((i, j, pyramids[i], pyramids[j]))
+
+    if len(pairs_data) == 1:
+        pair_results = [_align_pair(pairs_data[0])]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+            pair_results = list(executor.map(_align_pair, pairs_data))
+
+    # Shift of pair (i, j) is offset[j] - offset[i], solve for offsets
+    # with offset[reference_index] fixed to zero.
+    unknowns = [k for k in range(0, count) if k != reference_index]
+    column = {k:c for c, k in enumerate(unknowns)}
+    rows = []
+    values = []
+    weights = []
+    for i, j, shift, confidence in pair_results:
+        row = numpy.zeros(len(unknowns))
+        if j in column:
+            row[column[j]] = 1.0
+        if i in column:
+            row[column[i]] = -1.0
+        rows.append(row)
+        values.append(shift)
+        weights.append(max(confidence, 0.0) + 1e-6)
+
+    weights = numpy.sqrt(numpy.array(weights))
+    a = numpy.array(rows) * weights[:, None]
+    b = numpy.array(values) * weights
+    solution = numpy.linalg.lstsq(a, b, rcond=None)[0]
+
+    results = []
+    for k in range(0, count):
+        if k == reference_index:
+            results.append((0.0, 1.0))
+            continue
+        offset = float(solution[column[k]])
+        confidence = 0.0
+        for i, j, shift, pair_confidence in pair_results:
+            if reference_index in (i, j) and k in (i, j):
+                confidence = pair_confidence
+        results.append((offset, confidence))
+
+    return (results, pair_results)
+
+
 class Envelope:
     
-    def __init__(self, filename, args):
+    def __init__(self, filename, args, levels_file=NO_LEVELS_FILE):
         
         "read and generate envelope for filename" 
         
@@ -166,6 +341,13 @@ class Envelope:
 
         self.filename = parts[0]
         
+        # Audio levels rendered for timeline waveforms are used if available,
+        # they are only valid for full length files.
+        if levels_file != NO_LEVELS_FILE and len(parts) == 1:
+            self.read_levels_file(levels_file)
+        if self.envelope:
+            return
+
         # use filename with optionale time slice info for caching
         if args.use_cache:
             self.read_cache(filename)
@@ -268,6 +450,16 @@ class Envelope:
         if args.use_cache:
             self.write_cache()
             
+    def read_levels_file(self, levels_file):
+        try:
+            with open(levels_file, 'rb') as f:
+                levels = pickle.load(f)
+            self.envelope = array.array('f', [float(v) for v in levels])
+            logging.info("use audio levels file: %s" % levels_file)
+        except Exception as e:
+            logging.debug("could not use audio levels file %s: %s" % (levels_file, e))
+            self.envelope = None
+
     def read_cache(self, name):
         hash = "%s-%s" % (os.path.basename(sys.argv[0]),
                           hashlib.md5(name.encode('utf-8')).hexdigest())
@@ -317,28 +509,45 @@ def cl_parser():
     parser.add_argument('-c', '--use-cache', action='store_true')
     parser.add_argument('--cache-dir', nargs=1,default=[tempfile.gettempdir()],
                         help="default: %s" % tempfile.gettempdir())
+    parser.add_argument('--levels', nargs='+', default=None,
+        help="cached audio levels files in FILE order, '%s' for none" % NO_LEVELS_FILE)
+    parser.add_argument('-j', '--jobs', default=None, type=int,
+        help="max number of processes for pairwise alignment")
     parser.add_argument('-d', '--debug', action='store_true')
     parser.add_argument('-V','--version',version=__version__, action='version') 
     args = parser.parse_args()
 
     return args
 
+def _create_envelope(envelope_data):
+    filename, args, levels_file = envelope_data
+    return Envelope(filename, args, levels_file)
+
 def process_files(args):
-    envelopes = [Envelope(n, args) for n in args.files]
-    reference = envelopes[0].envelope
+    levels_files = args.levels
+    if levels_files == None or len(levels_files) != len(args.files):
+        levels_files = [NO_LEVELS_FILE] * len(args.files)
+
+    # Envelope decoding is done by ffmpeg processes, threads are enough here.
+    envelopes_data = [(n, args, levels_files[i]) for i, n in enumerate(args.files)]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=args.jobs) as executor:
+        envelopes = list(executor.map(_create_envelope, envelopes_data))
+
+    logging.info("build envelope pyramids...")
+    pyramids = [build_pyramid(e.envelope) for e in envelopes]
 
-    envelopes_envelope = list([x.envelope for x in envelopes])
     logging.info("calculate offsets...")
-    offsets = rigidalign(reference, envelopes_envelope)
-    logging.debug("got offsets: %s" % offsets) 
+    results, pair_results = solve_offsets(pyramids, 0, args.jobs)
+    for i, j, shift, confidence in pair_results:
+        logging.info("pair %d-%d shift: %f confidence: %f" % (i, j, shift, confidence))
+    logging.debug("got offsets: %s" % results) 
 
-    for n in range(len(offsets)):
-        envelopes[n].offset = offsets[n]
+    for n in range(len(results)):
+        envelopes[n].offset, envelopes[n].confidence = results[n]
       
     offsets_output = []
     for e in envelopes[1:]:
-        offset = e.offset
-        offsets_output.append((e.filename, offset))
+        offsets_output.append((e.filename, e.offset, e.confidence))
     
     return offsets_output
 
@@ -351,8 +560,8 @@ def main():
     # Write out offsets data
     out_str = ""
     for file_offset in offsets_output:
-        f, offset = file_offset
-        out_str = out_str + f + MAGIC_SEPARATOR + str(offset) + "\n"
+        f, offset, confidence = file_offset
+        out_str = out_str + f + MAGIC_SEPARATOR + str(offset) + MAGIC_SEPARATOR + str(confidence) + "\n"
     
     userfolders.init()
     output_file = userfolders.get_cache_dir() + OFFSETS_DATA_FILE + "_" + args.idstr
@@ -37,9 +37,11 @@ https://github.com/jliljebl/flowblade/issues/666
 import atomicfile
 import editorstate
 
+import concurrent.futures
 import os
 import subprocess
 import sys
+import threading
 import xml.etree.ElementTree
 
 ##############################################################################
@@ -49,6 +51,9 @@ import xml.etree.ElementTree
 # path to ffmpeg program
 CMD_FFMPEG = 'ffmpeg'
 
+# MediaPoolTranscoder of the export in progress
+_active_transcoder = None
+
 # Flowblade does not have a project-level audio sample rate
 # 48kHz is extremely common on film and TV projects around the world
 DEFAULT_SAMPLE_RATE = 48000
@@ -435,6 +440,7 @@ class Project:
                     if candidate_name not in reserved:
                         source_name = candidate_name
                         break
+                    count += 1
 
             # set the unique base name to use for transcoded media
             media.transcode_media_basename = source_name
@@ -536,17 +542,21 @@ def create_project_from_mlt_xml(xml_file,
                 # file. but what we want to do here is de-dupe those
                 # entries so that we only have one media instance per
                 # source media file.
-                if source_media not in path_to_media:
+                # the same file can also be referenced through different
+                # paths (e.g. symlinked media folders), so real paths are
+                # used as keys to only transcode it once.
+                media_key = os.path.realpath(source_media)
+                if media_key not in path_to_media:
                     media = Media(in_point, out_point)
                     media.source_media = source_media
                     media.sample_rate = sample_rate
                     media.channels = channels
 
                     # add this unique Media instance to the path to media map
-                    path_to_media[source_media] = media
+                    path_to_media[media_key] = media
 
                 # add this producer to the producer to path map
-                producer_to_path[producer_id] = source_media
+                producer_to_path[producer_id] = media_key
 
         if "playlist" == element.tag:
             playlist_id = element.attrib['id']
@@ -751,67 +761,141 @@ def _is_audio_file(path):
 
     return False
 
-def _transcode_ardour_audio_channel(basedir,
-                                    sample_rate,
-                                    media,
-                                    channel,
-                                    num_channels):
-
+def _get_transcode_command(basedir, sample_rate, media):
     """
-    Transcode a single mono channel from the input media file into a wav file.
+    Build a single ffmpeg command that splits all channels of the input media
+    into mono wav files in one decode pass.
+
+    Returns tuple (command, list of destination paths).
 
     """
 
     audiofiles_dir = _get_ardour_audiofiles_dir(basedir)
-    dest_file = _get_audio_channel_name(media, channel, num_channels) + ".wav"
-    dest_path = os.path.join(audiofiles_dir, dest_file)
-
-    # N.B. we're using heuristics here, and it isn't perfect
-    # ffmpeg map channel format: [file.stream.channel]
-    # we're assuming that if we have a video, then it will have sound on
-    # ffmpeg stream 1, and if we have an audio file, it will have sound on
-    # ffmpeg stream 0. this will basically work for a lot of common formats,
-    # but would probably not withstand anything slightly unusual
-    audio = _is_audio_file(media.source_media)
-    if audio:
-        map_channel = "0.0." + str(channel - 1)
-    else:
-        map_channel = "0.1." + str(channel - 1)
 
     cmd_stack = [CMD_FFMPEG,
                  "-hide_banner",
                  "-loglevel", "error",
-                 "-i", media.source_media,
-                 "-vn",
-                 "-acodec", "pcm_s24le",
-                 "-ar", str(sample_rate),
-                 "-map_channel", map_channel, dest_path]
+                 "-nostdin",
+                 "-i", media.source_media]
 
-    print(" ".join(cmd_stack))
+    # N.B. we're using heuristics here, and it isn't perfect
+    # we're assuming that the first audio stream of the file holds all
+    # the channels we want. this will basically work for a lot of common
+    # formats, but would probably not withstand anything slightly unusual
+    dest_paths = []
+    for channel in range(1, (media.channels + 1)):
+        dest_file = _get_audio_channel_name(media, channel, media.channels) + ".wav"
+        dest_path = os.path.join(audiofiles_dir, dest_file)
+        dest_paths.append(dest_path)
+
+        cmd_stack += ["-map", "0:a:0",
+                      "-af", "pan=mono|c0=c" + str(channel - 1),
+                      "-acodec", "pcm_s24le",
+                      "-ar", str(sample_rate),
+                      dest_path]
+
+    return (cmd_stack, dest_paths)
 
-    result = subprocess.call(cmd_stack)
-    if 0 != result:
-        raise Exception("error transcoding '" + media.source_media +
-                        "' to '" + dest_path + "'")
 
-def _transcode_ardour_media_pool(basedir, project):
+class MediaPoolTranscoder:
+    """
+    Transcodes the media pool into Ardour audio files.
+
+    Each media file is decoded once by a single ffmpeg process writing all
+    of its channels, and files are transcoded in parallel with a bounded
+    number of concurrent processes.
+
+    progress_callback(completed_count, total_count, media) is called from
+    worker threads after each media file is done. cancel() can be called
+    from any thread, it kills running processes and makes run() raise.
+
+    """
+
+    def __init__(self, basedir, project, progress_callback=None, max_workers=None):
+        self.basedir = basedir
+        self.project = project
+        self.progress_callback = progress_callback
+        if max_workers == None:
+            max_workers = max(1, min(4, os.cpu_count() or 1))
+        self.max_workers = max_workers
+
+        self.cancelled = False
+        self.completed_count = 0
+        self.total_count = len(project.media_pool)
+        self.processes = []
+        self.lock = threading.Lock()
+
+    def run(self):
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(self._transcode_media, media) for media in self.project.media_pool]
+            try:
+                for future in concurrent.futures.as_completed(futures):
+                    future.result()
+            except Exception:
+                self.cancel()
+                raise
+
+        if self.cancelled:
+            raise Exception("Ardour media transcoding cancelled")
+
+    def cancel(self):
+        with self.lock:
+            self.cancelled = True
+            for process in self.processes:
+                if process.poll() == None:
+                    process.kill()
+
+    def _transcode_media(self, media):
+        cmd_stack, dest_paths = _get_transcode_command(self.basedir,
+                                                       self.project.sample_rate,
+                                                       media)
+        with self.lock:
+            if self.cancelled:
+                return
+            print(" ".join(cmd_stack))
+            process = subprocess.Popen(cmd_stack)
+            self.processes.append(process)
+
+        result = process.wait()
+
+        with self.lock:
+            self.processes.remove(process)
+            if self.cancelled:
+                return
+            if 0 != result:
+                raise Exception("error transcoding '" + media.source_media +
+                                "' to '" + ", ".join(dest_paths) + "'")
+            self.completed_count += 1
+            completed_count = self.completed_count
+
+        if self.progress_callback != None:
+            self.progress_callback(completed_count, self.total_count, media)
+
+def _transcode_ardour_media_pool(basedir, project, progress_callback=None):
     """
     Transcode all of the media pool files from the project, and place the
     results in the Ardour audiofiles directory.
 
     """
 
-    dest_dir = _get_ardour_audiofiles_dir(basedir)
+    global _active_transcoder
+    _active_transcoder = MediaPoolTranscoder(basedir, project, progress_callback)
+    try:
+        _active_transcoder.run()
+    finally:
+        _active_transcoder = None
 
-    for media in project.media_pool:
-        for channel in range(1, (media.channels + 1)):
-            _transcode_ardour_audio_channel(basedir,
-                                            project.sample_rate,
-                                            media,
-                                            channel,
-                                            media.channels)
-
-def create_ardour_project(basedir, project):
+def cancel_media_pool_transcode():
+    """
+    Cancel media pool transcoding of the export in progress, if any.
+
+    """
+
+    transcoder = _active_transcoder
+    if transcoder != None:
+        transcoder.cancel()
+
+def create_ardour_project(basedir, project, progress_callback=None):
     """
     Create an Ardour project, using the given base directory and Project
 
@@ -834,7 +918,7 @@ def create_ardour_project(basedir, project):
     _create_ardour_project_dirs(basedir)
 
     # transcode input media files for ardour
-    _transcode_ardour_media_pool(basedir, project)
+    _transcode_ardour_media_pool(basedir, project, progress_callback)
 
     # create the ardour XML project file
     _create_ardour_project_file(basedir, project)
@@ -1809,7 +1893,8 @@ def _create_ardour_project_file(basedir, project):
 
 def launch_export_ardour_session_from_flowblade(mlt_xml_file,
                                                 ardour_project_dir,
-                                                sample_rate=None):
+                                                sample_rate=None,
+                                                progress_callback=None):
 
     if sample_rate == None:
         sample_rate = DEFAULT_SAMPLE_RATE
@@ -1825,5 +1910,5 @@ def launch_export_ardour_session_from_flowblade(mlt_xml_file,
                                           audio_tracks_count)
 
     # create a new Ardour project, using our Project instance
-    create_ardour_project(ardour_project_dir, project)
+    create_ardour_project(ardour_project_dir, project, progress_callback)
 
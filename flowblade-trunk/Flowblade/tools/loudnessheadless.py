@@ -0,0 +1,308 @@
+"""
+    Flowblade Movie Editor is a nonlinear video editor.
+    Copyright 2012 Janne Liljeblad.
+
+    This file is part of Flowblade Movie Editor <https://github.com/jliljebl/flowblade/>.
+
+    Flowblade Movie Editor is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Flowblade Movie Editor is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Flowblade Movie Editor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+"""
+Module does offline EBU R128 loudness analysis of clips, tracks and sequence master output.
+
+Analyzed items are split into frame ranges that are analyzed in parallel in a pool of
+worker processes as fast as audio can be decoded. MLT 'loudness_meter' filter gives
+momentary and short-term loudness and true peak for each frame, and integrated loudness
+is computed here from momentary values of all ranges with BS.1770 gating, so ranges
+can be analyzed independently.
+
+Each range is preceded by preroll frames that fill meter measurement windows, values
+for preroll frames are not used.
+"""
+
+try:
+    import mlt7 as mlt
+except:
+    import mlt
+import math
+import multiprocessing
+import os
+import pickle
+import threading
+import time
+import xml.dom.minidom
+
+import atomicfile
+import ccrutils
+import editorpersistance
+import mltheadlessutils
+import mltinit
+import mltprofiles
+import respaths
+import userfolders
+import utils
+
+ANALYSIS_PLAN = "loudness_analysis_plan"
+ANALYSIS_RESULTS = "loudness_analysis_results"
+
+MEDIA_SOURCE = "media"
+XML_SOURCE = "xml"
+
+RANGE_LENGTH = 1500 # frames
+PREROLL_SECONDS = 3.0 # short-term loudness window
+MAX_WORKERS = 4
+
+ABSOLUTE_GATE = -70.0 # LUFS
+RELATIVE_GATE = -10.0 # LU
+
+_render_thread = None
+
+# Worker process globals.
+_worker_profile = None
+
+
+# ----------------------------------------------------- module interface with message files
+# We are using message files to communicate with application.
+def session_render_complete(parent_folder, session_id):
+    return ccrutils.session_render_complete(parent_folder, session_id)
+
+def get_session_status(parent_folder, session_id):
+    msg = ccrutils.get_session_status_message(parent_folder, session_id)
+    if msg == None:
+        return None
+    fraction, elapsed = msg.split(" ")
+    return (fraction, elapsed)
+
+def abort_render(parent_folder, session_id):
+    ccrutils.abort_render(parent_folder, session_id)
+
+def delete_session_folders(parent_folder, session_id):
+     ccrutils.delete_internal_folders(parent_folder, session_id)
+
+def get_results(parent_folder, session_id):
+    """
+    Returns dict with keys "clips" (clip key -> result), "tracks" (track index -> result)
+    and "master", results are dicts created by get_loudness_result().
+    """
+    return utils.unpickle(ccrutils.get_session_folder(parent_folder, session_id) + "/" + ANALYSIS_RESULTS)
+
+
+# --------------------------------------------------- loudness math
+def get_integrated_loudness(momentary_values):
+    # BS.1770 gated loudness of measurement blocks, blocks here are momentary (400ms) values for frames.
+    blocks = [value for value in momentary_values if value > ABSOLUTE_GATE]
+    if len(blocks) == 0:
+        return float("-inf")
+
+    relative_gate = _get_mean_loudness(blocks) + RELATIVE_GATE
+    gated = [value for value in blocks if value > relative_gate]
+    if len(gated) == 0:
+        return float("-inf")
+    return _get_mean_loudness(gated)
+
+def _get_mean_loudness(values):
+    energy = sum([math.pow(10.0, value / 10.0) for value in values]) / len(values)
+    return 10.0 * math.log10(energy)
+
+def get_loudness_result(momentary_values, short_term_values, true_peak):
+    if len(short_term_values) > 0:
+        short_term_max = max(short_term_values)
+    else:
+        short_term_max = float("-inf")
+    return {"integrated":get_integrated_loudness(momentary_values),
+            "short_term_max":short_term_max,
+            "true_peak":true_peak,
+            "frames":len(momentary_values)}
+
+
+# --------------------------------------------------- analysis process launch
+def main(root_path, session_id, parent_folder, profile_desc):
+
+    mltheadlessutils.mlt_env_init(root_path, parent_folder, session_id)
+
+    global _render_thread
+    _render_thread = LoudnessAnalysisRunnerThread(root_path, profile_desc)
+    _render_thread.start()
+    _render_thread.join()
+
+
+class LoudnessAnalysisRunnerThread(threading.Thread):
+
+    def __init__(self, root_path, profile_desc):
+        threading.Thread.__init__(self)
+        self.root_path = root_path
+        self.profile_desc = profile_desc
+        self.abort = False
+
+    def run(self):
+        self.start_time = time.monotonic()
+
+        session_folder = ccrutils.session_folder_saved_global()
+        plan = utils.unpickle(session_folder + "/" + ANALYSIS_PLAN)
+        profile = mltprofiles.get_profile(self.profile_desc)
+        preroll = int(math.ceil(PREROLL_SECONDS * profile.fps()))
+
+        # Items are (item id, source, first frame, last frame).
+        items = []
+        for clip_key, path, clip_in, clip_out in plan["clips"]:
+            items.append((("clip", clip_key), (MEDIA_SOURCE, path), clip_in, clip_out))
+        for track_index in plan["tracks"]:
+            track_xml = _write_solo_track_xml(plan["xml_path"], track_index, session_folder)
+            items.append((("track", track_index), (XML_SOURCE, track_xml), 0, plan["length"] - 1))
+        if plan["length"] > 0:
+            items.append((("master", None), (XML_SOURCE, plan["xml_path"]), 0, plan["length"] - 1))
+
+        # Units are (unit index, source, preroll start, range start, range end).
+        units = []
+        unit_items = []
+        for item_id, source, first, last in items:
+            for start in range(first, last + 1, RANGE_LENGTH):
+                end = min(last, start + RANGE_LENGTH - 1)
+                preroll_start = max(first, start - preroll)
+                units.append((len(units), source, preroll_start, start, end))
+                unit_items.append(item_id)
+        total_frames = sum([end - preroll_start + 1 for index, source, preroll_start, start, end in units])
+
+        workers = max(1, min(MAX_WORKERS, os.cpu_count() or 1, len(units)))
+        print("Loudness analysis,", len(items), "items,", len(units), "ranges,", workers, "processes")
+
+        # Spawned workers do not inherit MLT state from this process.
+        context = multiprocessing.get_context("spawn")
+        pool = context.Pool(workers, _init_worker, (self.root_path, self.profile_desc))
+        pending = [pool.apply_async(_analyze_range, (unit,)) for unit in units]
+        unit_results = [None] * len(units)
+        done_frames = 0
+        while len(pending) > 0:
+            self.check_abort_requested()
+            if self.abort == True:
+                pool.terminate()
+                return
+
+            still_pending = []
+            for async_result in pending:
+                if async_result.ready() == False:
+                    still_pending.append(async_result)
+                    continue
+                index, momentary, short_term, true_peak = async_result.get()
+                unit_results[index] = (momentary, short_term, true_peak)
+                index, source, preroll_start, start, end = units[index]
+                done_frames += end - preroll_start + 1
+            pending = still_pending
+
+            self.render_update(float(done_frames) / float(max(1, total_frames)))
+            time.sleep(0.3)
+
+        pool.close()
+        pool.join()
+
+        # Combine range values into item results.
+        item_values = {}
+        for i in range(0, len(units)):
+            momentary, short_term, true_peak = unit_results[i]
+            item_momentary, item_short_term, item_peak = item_values.get(unit_items[i], ([], [], float("-inf")))
+            item_values[unit_items[i]] = (item_momentary + momentary, item_short_term + short_term, max(item_peak, true_peak))
+
+        results = {"clips":{}, "tracks":{}, "master":None}
+        for (item_type, item_key), values in item_values.items():
+            result = get_loudness_result(*values)
+            if item_type == "clip":
+                results["clips"][item_key] = result
+            elif item_type == "track":
+                results["tracks"][item_key] = result
+            else:
+                results["master"] = result
+
+        with atomicfile.AtomicFileWriter(session_folder + "/" + ANALYSIS_RESULTS, "wb") as afw:
+            write_file = afw.get_file()
+            pickle.dump(results, write_file)
+
+        print("Loudness analysis done in %.2fs" % (time.monotonic() - self.start_time))
+
+        # Write out completed flag file.
+        ccrutils.write_completed_message()
+
+    def check_abort_requested(self):
+        self.abort = ccrutils.abort_requested()
+
+    def render_update(self, fraction):
+        elapsed = time.monotonic() - self.start_time
+        msg = str(fraction) + " " + str(elapsed)
+        ccrutils.write_status_message(msg)
+
+
+def _write_solo_track_xml(xml_path, track_index, session_folder):
+    # Writes sequence XML with audio of all other tracks hidden.
+    doc = xml.dom.minidom.parse(xml_path)
+    tractors = [node for node in doc.documentElement.childNodes if node.nodeName == "tractor"]
+    main_tractor = tractors[-1]
+    tracks = main_tractor.getElementsByTagName("track")
+    for i in range(0, len(tracks)):
+        if i == track_index:
+            continue
+        hide = tracks[i].getAttribute("hide")
+        if hide == "video" or hide == "both":
+            tracks[i].setAttribute("hide", "both")
+        else:
+            tracks[i].setAttribute("hide", "audio")
+
+    track_xml = session_folder + "/track_" + str(track_index) + ".xml"
+    with open(track_xml, "w") as f:
+        doc.writexml(f)
+    return track_xml
+
+
+# --------------------------------------------------- worker processes
+def _init_worker(root_path, profile_desc):
+    respaths.set_paths(root_path)
+    userfolders.init()
+    editorpersistance.load()
+    mltinit.init_with_translations()
+
+    global _worker_profile
+    _worker_profile = mltprofiles.get_profile(profile_desc)
+
+def _analyze_range(unit):
+    index, source, preroll_start, start, end = unit
+    source_type, path = source
+    if source_type == XML_SOURCE:
+        producer = mlt.Producer(_worker_profile, "xml", str(path))
+    else:
+        producer = mlt.Producer(_worker_profile, str(path))
+
+    meter = mlt.Filter(_worker_profile, "loudness_meter")
+    producer.attach(meter)
+
+    momentary = []
+    short_term = []
+    true_peak = float("-inf")
+    for frame in range(preroll_start, end + 1):
+        producer.seek(frame)
+        mlt.frame_get_waveform(producer.get_frame(), 10, 50) # Pulls audio through meter.
+        if frame < start:
+            continue
+        momentary.append(_get_meter_value(meter, "momentary"))
+        short_term.append(_get_meter_value(meter, "shortterm"))
+        true_peak = max(true_peak, _get_meter_value(meter, "true_peak"))
+
+    return (index, momentary, short_term, true_peak)
+
+def _get_meter_value(meter, name):
+    # Meter values are not set for frames without audio.
+    value = meter.get(name)
+    if value == None:
+        return float("-inf")
+    try:
+        return float(value)
+    except ValueError:
+        return float("-inf")
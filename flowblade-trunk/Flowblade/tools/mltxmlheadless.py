@@ -32,6 +32,8 @@ try:
     import mlt7 as mlt
 except:
     import mlt
+import os
+import subprocess
 import threading
 import time
 
@@ -41,6 +43,7 @@ import mltheadlessutils
 import mltprofiles
 import renderconsumer
 import toolsencoding
+import utils
 
 
 _render_thread = None
@@ -62,8 +65,18 @@ def get_session_status(parent_folder, session_id):
     msg = ccrutils.get_session_status_message(parent_folder, session_id)
     if msg == None:
         return None
-    fraction, elapsed = msg.split(" ")
-    return (fraction, elapsed)
+    parts = msg.split(" ")
+    return (parts[0], parts[1])
+
+def get_segment_status(parent_folder, session_id):
+    # Returns (segment number, dirty segments count) or None if not doing segment render.
+    msg = ccrutils.get_session_status_message(parent_folder, session_id)
+    if msg == None:
+        return None
+    parts = msg.split(" ")
+    if len(parts) < 4:
+        return None
+    return (parts[2], parts[3])
     
 def abort_render(parent_folder, session_id):
     ccrutils.abort_render(session_id)
@@ -71,19 +84,19 @@ def abort_render(parent_folder, session_id):
 
 
 # --------------------------------------------------- render thread launch
-def main(root_path, session_id, parent_folder, xml_file_path, video_file_name, range_in, range_out, profile_desc):
+def main(root_path, session_id, parent_folder, xml_file_path, video_file_name, range_in, range_out, profile_desc, segment_plan=None):
     
     render_data = mltheadlessutils.mlt_env_init(root_path, parent_folder, session_id)
 
     global _render_thread
-    _render_thread = MLTXMLHeadlessRunnerThread(render_data, xml_file_path, video_file_name, range_in, range_out, profile_desc)
+    _render_thread = MLTXMLHeadlessRunnerThread(render_data, xml_file_path, video_file_name, range_in, range_out, profile_desc, segment_plan)
     _render_thread.start()
 
        
 
 class MLTXMLHeadlessRunnerThread(threading.Thread):
 
-    def __init__(self, render_data, xml_file_path, video_file_name, range_in, range_out, profile_desc):
+    def __init__(self, render_data, xml_file_path, video_file_name, range_in, range_out, profile_desc, segment_plan=None):
         threading.Thread.__init__(self)
 
         self.render_data = render_data # toolsencoding.ToolsRenderData object
@@ -93,6 +106,7 @@ class MLTXMLHeadlessRunnerThread(threading.Thread):
         self.range_out = int(range_out)
         self.length = self.range_out - self.range_in + 1
         self.profile_desc = profile_desc
+        self.segment_plan = segment_plan # name of render plan file in session folder, see sequencesegments.py
     
         self.abort = False
 
@@ -117,9 +131,17 @@ class MLTXMLHeadlessRunnerThread(threading.Thread):
             else:
                 file_path = self.render_data.render_dir + "/" + self.render_data.file_name + self.render_data.file_extension
 
-            consumer = renderconsumer.get_mlt_render_consumer(file_path, profile, args_vals_list)
-
             ccrutils.delete_rendered_frames() # in case we switched from img seq consumer we can now delete those frames to save space
+
+            if self.segment_plan != None and self.render_data.save_internally == True:
+                if self.render_segments(producer, profile, args_vals_list, file_path) == True:
+                    ccrutils.write_completed_message()
+                    return
+                if self.abort == True:
+                    return
+                print("Segment render failed, doing full render.")
+
+            consumer = renderconsumer.get_mlt_render_consumer(file_path, profile, args_vals_list)
         # img seq consumer
         else:
             # Image sequence gets project profile
@@ -129,6 +151,9 @@ class MLTXMLHeadlessRunnerThread(threading.Thread):
             else:
                 frame_name = self.render_data.frame_name
 
+            # Delete old rendered frames, frames may be hardlinks shared with clones and cached renders.
+            ccrutils.delete_rendered_frames()
+
             render_path = ccrutils.rendered_frames_folder() + frame_name + "_%04d." + "png"
 
             consumer = mlt.Consumer(project_profile, "avformat", str(render_path))
@@ -157,6 +182,77 @@ class MLTXMLHeadlessRunnerThread(threading.Thread):
         # Write out completed flag file.
         ccrutils.write_completed_message()
 
+    def render_segments(self, producer, profile, args_vals_list, file_path):
+        # Renders segments missing from segment store and concatenates all segments 
+        # into 'file_path' without re-encoding. Returns True on success.
+        try:
+            plan = utils.unpickle(ccrutils.session_folder_saved_global() + "/" + self.segment_plan)
+        except Exception as e:
+            print("Could not read segment render plan:", e)
+            return False
+
+        segments = plan["segments"]
+        dirty_segments = [seg for seg in segments if seg[3] == True]
+        dirty_length = sum([seg_out - seg_in + 1 for seg_in, seg_out, path, needs_render in dirty_segments])
+        done_length = 0
+        
+        for i in range(0, len(dirty_segments)):
+            seg_in, seg_out, seg_path, needs_render = dirty_segments[i]
+            seg_length = seg_out - seg_in + 1
+            tmp_path = os.path.dirname(seg_path) + "/tmp_" + os.path.basename(seg_path)
+
+            consumer = renderconsumer.get_mlt_render_consumer(tmp_path, profile, args_vals_list)
+            consumer.set("terminate_on_pause", 1)
+            seg_producer = producer.cut(seg_in, seg_out)
+            
+            self.render_player = renderconsumer.FileRenderPlayer("", seg_producer, consumer, 0, seg_length - 1)
+            self.render_player.start()
+            
+            while self.render_player.stopped == False:
+                if self.abort_requested() == True:
+                    self.render_player.shutdown()
+                    return False
+
+                seg_fraction = self.render_player.get_render_fraction()
+                fraction = float(done_length + seg_fraction * seg_length) / float(dirty_length)
+                self.segment_update_callback(fraction, i + 1, len(dirty_segments))
+                time.sleep(0.3)
+
+            # Segments are only added to store when complete, aborted renders leave tmp files.
+            os.replace(tmp_path, seg_path)
+            done_length += seg_length
+
+        self.segment_update_callback(1.0, len(dirty_segments), len(dirty_segments))
+        
+        # Concatenate segments.
+        list_path = plan["segments_dir"] + "/concat_list"
+        with open(list_path, "w") as f:
+            for seg_in, seg_out, seg_path, needs_render in segments:
+                f.write("file '" + seg_path.replace("'", "'\\''") + "'\n")
+        
+        command_list = ["ffmpeg", "-y", "-v", "error", "-f", "concat", "-safe", "0", "-i", list_path, "-c", "copy", file_path]
+        try:
+            ret_code = subprocess.call(command_list)
+        except OSError as e:
+            print("Segment concat failed:", e)
+            return False
+        if ret_code != 0:
+            return False
+
+        # Remove segments not used by current render.
+        used_files = set([os.path.basename(seg_path) for seg_in, seg_out, seg_path, needs_render in segments])
+        used_files.add(os.path.basename(list_path))
+        for f in os.listdir(plan["segments_dir"]):
+            if f not in used_files:
+                os.remove(plan["segments_dir"] + "/" + f)
+        
+        return True
+
+    def segment_update_callback(self, fraction, segment, segments_count):
+        elapsed = time.monotonic() - self.start_time
+        msg = str(fraction) + " " + str(elapsed) + " " + str(segment) + " " + str(segments_count)
+        self.write_status_message(msg)
+
     def abort_requested(self):
         self.abort = ccrutils.abort_requested()
         return self.abort
@@ -22,6 +22,7 @@ try:
     import mlt7 as mlt
 except:
     import mlt
+import os
 import threading
 import time
 
@@ -29,6 +30,11 @@ import ccrutils
 import mltheadlessutils
 import mltprofiles
 import renderconsumer
+import reverserender
+
+REVERSED_SOURCE_FILE = "/reversed_source.mkv"
+REVERSE_PHASE_FRACTION = 0.5 # part of progress used for creating reversed source
+REVERSE_EDGE_FRAMES = 2 # extra frames reversed at render range ends
 
 _render_thread = None
 
@@ -88,7 +94,24 @@ class MotionClipHeadlessRunnerThread(threading.Thread):
         self.start_time = time.monotonic()
 
         profile = mltprofiles.get_profile(self.profile_desc) 
-        motion_producer = mlt.Producer(profile, None, str("timewarp:" + str(self.speed) + ":" + str(self.source_path)))
+
+        # Reverse renders read forward from a reversed copy of source when possible.
+        self.progress_offset = 0.0
+        self.progress_scale = 1.0
+        frame_offset = 0
+        source_path = self.source_path
+        speed = float(self.speed)
+        if speed < 0.0 and renderconsumer.ffmpeg_cli_available == True:
+            reversed_path, frame_offset = self.create_reversed_source(profile, -speed)
+            if self.abort == True:
+                return
+            if reversed_path != None:
+                source_path = reversed_path
+                speed = -speed
+                self.progress_offset = REVERSE_PHASE_FRACTION
+                self.progress_scale = 1.0 - REVERSE_PHASE_FRACTION
+
+        motion_producer = mlt.Producer(profile, None, str("timewarp:" + str(speed) + ":" + str(source_path)))
 
         # Create tractor and track to get right length
         tractor = renderconsumer.get_producer_as_tractor(motion_producer, motion_producer.get_length() - 1)
@@ -96,8 +119,8 @@ class MotionClipHeadlessRunnerThread(threading.Thread):
         consumer = renderconsumer.get_render_consumer_for_encoding_and_quality(self.write_file, profile, self.encoding_option_index, self.quality_option_index)
         
         # start and end frames, renderer stop behaviour
-        start_frame = self.start_frame 
-        end_frame = self.end_frame
+        start_frame = self.start_frame - frame_offset
+        end_frame = min(self.end_frame - frame_offset, motion_producer.get_length() - 1)
 
         # Launch render
         self.render_player = renderconsumer.FileRenderPlayer(self.write_file, tractor, consumer, start_frame, end_frame)
@@ -110,16 +133,67 @@ class MotionClipHeadlessRunnerThread(threading.Thread):
             
             if self.abort == True:
                 self.render_player.shutdown()
+                self.remove_reversed_source(source_path)
                 return
             
             fraction = self.render_player.get_render_fraction()
-            self.render_update(fraction)
+            self.render_update(self.progress_offset + fraction * self.progress_scale)
 
             time.sleep(0.3)
 
+        self.remove_reversed_source(source_path)
+
         # Write out completed flag file.
         ccrutils.write_completed_message()
 
+    def create_reversed_source(self, profile, speed):
+        # Writes source frames needed for render range in reverse order into session folder.
+        # Returns (file path, frames cut from start of render range) or (None, 0) on failure.
+        info = reverserender.probe_source(self.source_path)
+        if info == None:
+            return (None, 0)
+
+        source_producer = mlt.Producer(profile, str(self.source_path))
+        source_length = source_producer.get_length()
+        fps = profile.fps()
+
+        # Reversed source starts at source frame displayed at output frame 'frame_offset',
+        # and timewarp maps output frames of reversed source from there.
+        frame_offset = max(0, self.start_frame - REVERSE_EDGE_FRAMES)
+        last_time = float(source_length - 1 - frame_offset * speed) / fps
+        first_time = float(source_length - 1 - (self.end_frame + REVERSE_EDGE_FRAMES) * speed) / fps
+        first = reverserender.get_frame_index(info, max(0.0, first_time))
+        last = reverserender.get_frame_index(info, last_time)
+
+        reversed_path = ccrutils.session_folder_saved_global() + REVERSED_SOURCE_FILE
+        reverser = reverserender.ChunkedReverser(self.source_path, info, first, last, 
+                                                 ccrutils.session_folder_saved_global(), 
+                                                 lambda fraction: self.render_update(fraction * REVERSE_PHASE_FRACTION))
+
+        results = []
+        reverse_thread = threading.Thread(target=lambda: results.append(reverser.create_reversed_file(reversed_path)))
+        reverse_thread.start()
+        while reverse_thread.is_alive():
+            self.check_abort_requested()
+            if self.abort == True:
+                reverser.abort()
+                reverse_thread.join()
+                self.remove_reversed_source(reversed_path)
+                return (None, 0)
+            time.sleep(0.3)
+
+        if results != [True]:
+            print("Chunked reverse failed, rendering from source with timewarp.")
+            self.remove_reversed_source(reversed_path)
+            return (None, 0)
+
+        return (reversed_path, frame_offset)
+
+    def remove_reversed_source(self, source_path):
+        # Session folder is deleted after render and must not contain other files then.
+        if source_path != self.source_path and os.path.exists(source_path):
+            os.remove(source_path)
+
     def check_abort_requested(self):
         self.abort = ccrutils.abort_requested()
 
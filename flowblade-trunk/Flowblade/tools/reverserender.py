@@ -0,0 +1,257 @@
+"""
+    Flowblade Movie Editor is a nonlinear video editor.
+    Copyright 2012 Janne Liljeblad.
+
+    This file is part of Flowblade Movie Editor <https://github.com/jliljebl/flowblade/>.
+
+    Flowblade Movie Editor is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Flowblade Movie Editor is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Flowblade Movie Editor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+"""
+Module creates reversed intermediate media files for reverse motion clip renders.
+
+Reading media backwards with MLT timewarp producer needs decoding from previous keyframe
+for every frame, which is very slow for long GOP media. Here source is decoded forward with
+ffmpeg in chunks starting at keyframes, ffmpeg 'reverse' and 'areverse' filters reverse
+each chunk in memory and reversed chunks are written to disk and concatenated in reverse order.
+
+Chunk length is limited so that decoded frames of all chunks being reversed in parallel
+fit in memory budget.
+"""
+
+import bisect
+import concurrent.futures
+import os
+import shutil
+import subprocess
+import threading
+
+CHUNK_MAX_FRAMES = 250
+CHUNK_MAX_BYTES = 512 * 1024 * 1024 # ffmpeg reverse filter keeps all decoded frames of chunk in memory
+MEMORY_BUDGET_FRACTION = 0.5 # of available memory, for all chunks reversed in parallel
+MAX_WORKERS = 4
+FALLBACK_AVAILABLE_MEMORY = 2 * 1024 * 1024 * 1024
+
+CHUNKS_DIR = "/reverse_chunks"
+
+
+class SourceInfo:
+
+    def __init__(self, fps, width, height, frame_times, keyframes):
+        self.fps = fps
+        self.width = width
+        self.height = height
+        self.frame_times = frame_times # seconds from file start, sorted in display order
+        self.keyframes = keyframes # set of frame indexes
+
+
+def probe_source(source_path):
+    """
+    Returns SourceInfo for first video stream of file or None if probing fails.
+    """
+    try:
+        stream_out = subprocess.check_output(["ffprobe", "-v", "error", "-select_streams", "v:0",
+                                              "-show_entries", "stream=width,height,r_frame_rate:format=start_time",
+                                              "-of", "default=noprint_wrappers=1", source_path], universal_newlines=True)
+        values = dict([line.split("=", 1) for line in stream_out.splitlines() if "=" in line])
+        num, den = values["r_frame_rate"].split("/")
+        fps = float(num) / float(den)
+        width = int(values["width"])
+        height = int(values["height"])
+        try:
+            file_start = float(values["start_time"])
+        except ValueError:
+            file_start = 0.0
+
+        # Packets are only demuxed, not decoded, so this is fast compared to reversing.
+        packets_out = subprocess.check_output(["ffprobe", "-v", "error", "-select_streams", "v:0",
+                                               "-show_entries", "packet=pts_time,flags",
+                                               "-of", "csv=p=0", source_path], universal_newlines=True)
+    except (OSError, subprocess.CalledProcessError, KeyError, ValueError, ZeroDivisionError) as e:
+        print("Reverse render source probe failed:", e)
+        return None
+
+    packets = []
+    for line in packets_out.splitlines():
+        pts_time, flags = (line.split(",") + [""])[0:2]
+        try:
+            packets.append((float(pts_time) - file_start, "K" in flags))
+        except ValueError:
+            continue # packets without pts
+
+    if len(packets) == 0 or fps <= 0.0:
+        return None
+
+    packets.sort()
+    frame_times = [pts for pts, is_key in packets]
+    keyframes = set([i for i in range(0, len(packets)) if packets[i][1] == True])
+    return SourceInfo(fps, width, height, frame_times, keyframes)
+
+def get_frame_index(info, time):
+    # Returns index of frame displayed at time.
+    index = bisect.bisect_right(info.frame_times, time + 0.5 / info.fps) - 1
+    return min(max(0, index), len(info.frame_times) - 1)
+
+def plan_chunks(info, first, last):
+    """
+    Returns list of (first frame, last frame) chunks covering range, chunks start
+    at keyframes when there is a keyframe in second half of maximum chunk length.
+    """
+    frame_bytes = max(1, info.width * info.height * 3 // 2) # yuv 4:2:0
+    max_frames = max(1, min(CHUNK_MAX_FRAMES, CHUNK_MAX_BYTES // frame_bytes))
+
+    chunks = []
+    start = first
+    while start <= last:
+        end = min(last, start + max_frames - 1)
+        if end < last:
+            for k in range(end + 1, start + max_frames // 2, -1):
+                if k in info.keyframes:
+                    end = k - 1
+                    break
+        chunks.append((start, end))
+        start = end + 1
+    return chunks
+
+def get_workers_count(info, chunks):
+    frame_bytes = max(1, info.width * info.height * 3 // 2)
+    chunk_bytes = max([end - start + 1 for start, end in chunks]) * frame_bytes
+    budget = int(_get_available_memory() * MEMORY_BUDGET_FRACTION)
+    cpus = os.cpu_count()
+    if cpus == None:
+        cpus = 1
+    return max(1, min(MAX_WORKERS, cpus // 2, budget // chunk_bytes, len(chunks)))
+
+def _get_available_memory():
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return FALLBACK_AVAILABLE_MEMORY
+
+def _get_video_codec_args():
+    # Intermediate is decoded forward only, so long GOP codec is fine and keeps disk use down.
+    try:
+        encoders = subprocess.check_output(["ffmpeg", "-hide_banner", "-encoders"], universal_newlines=True, stderr=subprocess.DEVNULL)
+    except (OSError, subprocess.CalledProcessError):
+        encoders = ""
+    if " libx264 " in encoders:
+        return ["-c:v", "libx264", "-preset", "veryfast", "-crf", "12"]
+    return ["-c:v", "ffv1"]
+
+
+class ChunkedReverser:
+
+    def __init__(self, source_path, info, first, last, work_folder, progress_callback):
+        self.source_path = source_path
+        self.info = info
+        self.first = first
+        self.last = last
+        self.chunks_folder = work_folder + CHUNKS_DIR
+        self.progress_callback = progress_callback # progress_callback(fraction)
+
+        self.aborted = False
+        self.processes = []
+        self.processes_lock = threading.Lock()
+        self.done_frames = 0
+
+    def create_reversed_file(self, write_file):
+        """
+        Writes frames first - last of source in reverse order to 'write_file'.
+        Returns True on success.
+        """
+        chunks = plan_chunks(self.info, self.first, self.last)
+        workers = get_workers_count(self.info, chunks)
+        codec_args = _get_video_codec_args()
+        total_frames = self.last - self.first + 1
+        print("Reversing", total_frames, "frames in", len(chunks), "chunks,", workers, "parallel")
+
+        if os.path.exists(self.chunks_folder):
+            shutil.rmtree(self.chunks_folder)
+        os.mkdir(self.chunks_folder)
+
+        try:
+            chunk_paths = [self.chunks_folder + "/chunk_" + str(i) + ".mkv" for i in range(0, len(chunks))]
+            with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(self._reverse_chunk, chunks[i], chunk_paths[i], codec_args, total_frames) for i in range(0, len(chunks))]
+                success = all([future.result() for future in futures])
+            if success == False or self.aborted == True:
+                return False
+
+            # Last chunk of source is first chunk of reversed file.
+            list_path = self.chunks_folder + "/concat_list"
+            with open(list_path, "w") as f:
+                for chunk_path in reversed(chunk_paths):
+                    f.write("file '" + chunk_path.replace("'", "'\\''") + "'\n")
+
+            command_list = ["ffmpeg", "-y", "-v", "error", "-nostdin", "-f", "concat", "-safe", "0", "-i", list_path, "-c", "copy", write_file]
+            return self._run(command_list)
+        finally:
+            shutil.rmtree(self.chunks_folder, ignore_errors=True)
+
+    def _reverse_chunk(self, chunk, chunk_path, codec_args, total_frames):
+        if self.aborted == True:
+            return False
+
+        start, end = chunk
+        frames = end - start + 1
+        duration = float(frames) / self.info.fps
+        half_frame = 0.5 / self.info.fps
+        start_time = self.info.frame_times[start]
+
+        command_list = ["ffmpeg", "-y", "-v", "error", "-nostdin"]
+        if start in self.info.keyframes:
+            # Seek lands on chunk start keyframe and nothing before it is decoded.
+            command_list += ["-noaccurate_seek", "-ss", "%.6f" % (start_time + half_frame * 0.5)]
+        else:
+            command_list += ["-ss", "%.6f" % max(0.0, start_time - half_frame)]
+        command_list += ["-i", self.source_path, "-map", "0:v:0", "-map", "0:a:0?",
+                         "-vf", "trim=end_frame=" + str(frames) + ",setpts=PTS-STARTPTS,reverse",
+                         "-af", "atrim=end=" + "%.6f" % duration + ",asetpts=PTS-STARTPTS,areverse"]
+        command_list += codec_args + ["-c:a", "pcm_s24le", "-f", "matroska", chunk_path]
+
+        if self._run(command_list) == False:
+            return False
+
+        with self.processes_lock:
+            self.done_frames += frames
+            fraction = float(self.done_frames) / float(total_frames)
+        self.progress_callback(fraction)
+        return True
+
+    def _run(self, command_list):
+        try:
+            process = subprocess.Popen(command_list, stdin=subprocess.DEVNULL)
+        except OSError as e:
+            print("Reverse render ffmpeg launch failed:", e)
+            return False
+
+        with self.processes_lock:
+            self.processes.append(process)
+        ret_code = process.wait()
+        with self.processes_lock:
+            self.processes.remove(process)
+
+        if ret_code != 0 and self.aborted == False:
+            print("Reverse render ffmpeg failed:", " ".join(command_list))
+        return ret_code == 0 and self.aborted == False
+
+    def abort(self):
+        self.aborted = True
+        with self.processes_lock:
+            for process in self.processes:
+                process.kill()
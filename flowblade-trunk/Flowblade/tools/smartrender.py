@@ -0,0 +1,467 @@
+"""
+    Flowblade Movie Editor is a nonlinear video editor.
+    Copyright 2012 Janne Liljeblad.
+
+    This file is part of Flowblade Movie Editor <https://github.com/jliljebl/flowblade/>.
+
+    Flowblade Movie Editor is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Flowblade Movie Editor is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Flowblade Movie Editor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+"""
+Module does smart renders that copy unchanged parts of source media to output without re-encoding.
+
+Timeline ranges where a single clip without filters, mute or speed change is the only
+content on timeline and no compositor is active, are copied from source media with ffmpeg
+if source streams already match target encoding and profile. Copied ranges start and end
+at source keyframes, frames between range edges and keyframes and all other frames are
+rendered normally with MLT using target encoding.
+
+Segments are written to intermediate files and joined with ffmpeg concat demuxer without
+re-encoding. If any step fails, whole range is rendered normally.
+"""
+
+import bisect
+import json
+import os
+import shutil
+import subprocess
+import threading
+import time
+
+import appconsts
+import persistance
+import renderconsumer
+import reverserender
+import userfolders
+import utils
+
+SEGMENTS_DIR = "smart_render_segments_"
+
+MIN_COPY_SECONDS = 2.0 # shorter copyable ranges are rendered, launching copy for them is not worth it
+
+# MLT avformat vcodec -> (ffprobe codec name, intermediate format, intermediate extension)
+# Long GOP codecs use MPEG-TS intermediates that repeat parameter sets on keyframes, so that
+# copied and rendered segments with different encoder parameters can be joined.
+VCODEC_STREAMS = {"libx264":("h264", "mpegts", "ts"),
+                  "h264_nvenc":("h264", "mpegts", "ts"),
+                  "h264_vaapi":("h264", "mpegts", "ts"),
+                  "libx265":("hevc", "mpegts", "ts"),
+                  "hevc_nvenc":("hevc", "mpegts", "ts"),
+                  "mpeg2video":("mpeg2video", "mpegts", "ts"),
+                  "prores":("prores", "matroska", "mkv"),
+                  "prores_ks":("prores", "matroska", "mkv"),
+                  "dnxhd":("dnxhd", "matroska", "mkv"),
+                  "ffv1":("ffv1", "matroska", "mkv")}
+
+# MLT avformat acodec -> ffprobe codec name
+ACODEC_STREAMS = {"aac":"aac",
+                  "libmp3lame":"mp3",
+                  "mp2":"mp2",
+                  "ac3":"ac3",
+                  "pcm_s24le":"pcm_s24le",
+                  "flac":"flac"}
+
+# MPEG-TS can not contain these, targets using them are only joined through Matroska.
+NON_TS_ACODECS = ["pcm_s24le", "flac"]
+
+DEFAULT_PIX_FMT = "yuv420p"
+DEFAULT_SAMPLE_RATE = 48000
+DEFAULT_CHANNELS = 2
+
+
+class RenderSegment:
+
+    def __init__(self, first, last, source_path=None, source_start=None):
+        self.first = first # timeline frames, inclusive
+        self.last = last
+        self.source_path = source_path # None for rendered segments
+        self.source_start = source_start # seconds from source start, at keyframe
+
+    def is_copy(self):
+        return self.source_path != None
+
+    def get_length(self):
+        return self.last - self.first + 1
+
+
+# --------------------------------------------------- planning
+def get_render_plan(project_file_path, args_vals_list, profile, start_frame, end_frame):
+    """
+    Returns list of RenderSegments covering render range or None if there is nothing to copy.
+    """
+    target = get_target(args_vals_list, profile)
+    if target == None:
+        return None
+
+    s_project = persistance.unpickle(project_file_path)
+    s_seq = s_project.sequences[s_project.c_seq_index]
+
+    min_copy_frames = int(MIN_COPY_SECONDS * target["fps"])
+    sources = {} # path -> (stream info, reverserender.SourceInfo) or None
+    copy_segments = []
+    for first, last, source_first, clip in _get_single_clip_ranges(s_seq, start_frame, end_frame):
+        if last - first + 1 < min_copy_frames:
+            continue
+        if clip.path not in sources:
+            sources[clip.path] = _probe_source(clip.path, target)
+        if sources[clip.path] == None:
+            continue
+
+        keyframe_range = _get_keyframe_range(sources[clip.path], source_first, source_first + last - first)
+        if keyframe_range == None:
+            continue
+        copy_first, copy_last, source_start = keyframe_range
+        if copy_last - copy_first + 1 < min_copy_frames:
+            continue
+        offset = copy_first - source_first
+        copy_segments.append(RenderSegment(first + offset, first + offset + copy_last - copy_first, clip.path, source_start))
+
+    if len(copy_segments) == 0:
+        return None
+
+    # Everything between copied segments is rendered.
+    copy_segments.sort(key=lambda segment: segment.first)
+    segments = []
+    frame = start_frame
+    for segment in copy_segments:
+        if segment.first > frame:
+            segments.append(RenderSegment(frame, segment.first - 1))
+        segments.append(segment)
+        frame = segment.last + 1
+    if frame <= end_frame:
+        segments.append(RenderSegment(frame, end_frame))
+
+    return segments
+
+def get_target(args_vals_list, profile):
+    """
+    Returns dict of stream properties that copied source streams need to have or None
+    if encoding is not supported for smart render.
+    """
+    args = dict(args_vals_list)
+    try:
+        vcodec, intermediate_format, intermediate_ext = VCODEC_STREAMS[args.get("vcodec")]
+        acodec = ACODEC_STREAMS[args.get("acodec")]
+    except KeyError:
+        return None
+    if args.get("acodec") in NON_TS_ACODECS and intermediate_format == "mpegts":
+        intermediate_format = "matroska"
+        intermediate_ext = "mkv"
+
+    width = profile.width()
+    height = profile.height()
+    if "s" in args:
+        try:
+            width, height = [int(value) for value in args["s"].split("x")]
+        except ValueError:
+            return None
+
+    try:
+        sample_rate = int(args.get("ar", DEFAULT_SAMPLE_RATE))
+        channels = int(args.get("ac", DEFAULT_CHANNELS))
+    except ValueError:
+        return None
+
+    return {"vcodec":vcodec,
+            "width":width,
+            "height":height,
+            "fps":profile.fps(),
+            "progressive":profile.progressive(),
+            "pix_fmt":args.get("pix_fmt", DEFAULT_PIX_FMT),
+            "acodec":acodec,
+            "sample_rate":sample_rate,
+            "channels":channels,
+            "intermediate_format":intermediate_format,
+            "intermediate_ext":intermediate_ext}
+
+def _get_single_clip_ranges(s_seq, start_frame, end_frame):
+    # Returns list of (timeline first, timeline last, source first, clip) ranges where clip
+    # is only content on timeline and is shown unchanged.
+    if s_seq.master_audio_gain != 1.0 or s_seq.master_audio_pan != appconsts.NO_PAN \
+        or getattr(s_seq, "watermark_file_path", None) != None:
+        return []
+
+    items = []
+    for i in range(1, len(s_seq.tracks) - 1):
+        track = s_seq.tracks[i]
+        position = 0
+        for clip in track.clips:
+            length = clip.clip_out - clip.clip_in + 1
+            if clip.is_blanck_clip == False:
+                items.append((position, position + length - 1, track, clip))
+            position += length
+
+    # Ranges of all other clips and compositors block copying.
+    compositor_ranges = [(compositor.clip_in, compositor.clip_out) for compositor in s_seq.compositors]
+
+    ranges = []
+    for item in items:
+        first, last, track, clip = item
+        if _clip_is_unchanged(clip, track) == False:
+            continue
+
+        blocked = list(compositor_ranges)
+        blocked += [(other[0], other[1]) for other in items if other is not item]
+        for free_first, free_last in _get_free_ranges(max(first, start_frame), min(last, end_frame), blocked):
+            ranges.append((free_first, free_last, clip.clip_in + free_first - first, clip))
+
+    return ranges
+
+def _clip_is_unchanged(clip, track):
+    if clip.media_type != appconsts.VIDEO or len(clip.filters) > 0 or clip.mute_filter != None:
+        return False
+    # Sequence data is not built, older projects may not have all attributes.
+    if getattr(clip, "container_data", None) != None or getattr(clip, "slowmo_data", None) != None \
+        or getattr(clip, "speed", 1.0) != 1.0:
+        return False
+    if utils.is_mlt_xml_file(clip.path) == True or os.path.isfile(clip.path) == False:
+        return False
+    if track.mute_state != appconsts.TRACK_MUTE_NOTHING or track.audio_gain != 1.0 \
+        or track.audio_pan != appconsts.NO_PAN:
+        return False
+    return True
+
+def _get_free_ranges(first, last, blocked):
+    free = []
+    for blocked_first, blocked_last in sorted(blocked):
+        if blocked_last < first or blocked_first > last:
+            continue
+        if blocked_first > first:
+            free.append((first, blocked_first - 1))
+        first = max(first, blocked_last + 1)
+    if first <= last:
+        free.append((first, last))
+    return free
+
+
+# --------------------------------------------------- source media
+def _probe_source(source_path, target):
+    # Returns (stream info, reverserender.SourceInfo) if source streams can be copied to target, otherwise None.
+    try:
+        probe_out = subprocess.check_output(["ffprobe", "-v", "error", "-show_entries",
+                                             "stream=codec_type,codec_name,width,height,pix_fmt,r_frame_rate,field_order,sample_rate,channels",
+                                             "-of", "json", source_path], universal_newlines=True)
+        streams = json.loads(probe_out)["streams"]
+    except (OSError, subprocess.CalledProcessError, ValueError, KeyError) as e:
+        print("Smart render source probe failed:", e)
+        return None
+
+    video_streams = [stream for stream in streams if stream.get("codec_type") == "video"]
+    audio_streams = [stream for stream in streams if stream.get("codec_type") == "audio"]
+    if len(video_streams) == 0 or len(audio_streams) == 0:
+        return None
+    video = video_streams[0]
+    audio = audio_streams[0]
+
+    try:
+        num, den = video["r_frame_rate"].split("/")
+        fps = float(num) / float(den)
+        compatible = (video["codec_name"] == target["vcodec"]
+                      and int(video["width"]) == target["width"]
+                      and int(video["height"]) == target["height"]
+                      and abs(fps - target["fps"]) < 0.001
+                      and video.get("pix_fmt") == target["pix_fmt"]
+                      and audio["codec_name"] == target["acodec"]
+                      and int(audio["sample_rate"]) == target["sample_rate"]
+                      and int(audio["channels"]) == target["channels"])
+    except (KeyError, ValueError, ZeroDivisionError):
+        return None
+    if compatible == False:
+        return None
+    if target["progressive"] == True and video.get("field_order", "progressive") not in ("progressive", "unknown"):
+        return None
+
+    info = reverserender.probe_source(source_path)
+    if info == None:
+        return None
+    return (video, info)
+
+def _get_keyframe_range(source, first, last):
+    # Returns (first, last, start time) of largest source frame range inside given range
+    # that starts on keyframe and ends before keyframe or at end of media, or None.
+    video, info = source
+    frames = len(info.frame_times)
+    if last >= frames:
+        return None
+
+    keyframes = sorted(info.keyframes)
+    start_index = bisect.bisect_left(keyframes, first)
+    if start_index == len(keyframes):
+        return None
+    copy_first = keyframes[start_index]
+
+    if last == frames - 1:
+        copy_last = last
+    else:
+        end_index = bisect.bisect_right(keyframes, last + 1) - 1
+        copy_last = keyframes[end_index] - 1
+    if copy_last < copy_first:
+        return None
+
+    # Frame numbers are only valid for constant frame rate media.
+    half_frame = 0.5 / info.fps
+    if abs(info.frame_times[copy_first] - copy_first / info.fps) > half_frame:
+        return None
+    if copy_last + 1 < frames and abs(info.frame_times[copy_last + 1] - (copy_last + 1) / info.fps) > half_frame:
+        return None
+
+    return (copy_first, copy_last, info.frame_times[copy_first])
+
+
+# --------------------------------------------------- rendering
+class SmartRenderPlayer(threading.Thread):
+    """
+    Renders segments and joins them to render file, has same interface
+    for render progress as renderconsumer.FileRenderPlayer.
+    """
+    def __init__(self, render_path, producer, profile, args_vals_list, segments, wait_for_producer_end_stop):
+        self.render_path = render_path
+        self.producer = producer
+        self.profile = profile
+        self.args_vals_list = args_vals_list
+        self.segments = segments
+        self.wait_for_producer_end_stop = wait_for_producer_end_stop
+        self.target = get_target(args_vals_list, profile)
+        self.work_folder = userfolders.get_cache_dir() + SEGMENTS_DIR + str(os.getpid())
+
+        self.running = False
+        self.has_started_running = False
+        self.aborted = False
+        self.segment_player = None
+        self.process = None
+        self.done_frames = 0
+        self.total_frames = sum([segment.get_length() for segment in segments])
+        threading.Thread.__init__(self)
+
+    def run(self):
+        self.running = True
+        self.has_started_running = True
+
+        copied = sum([segment.get_length() for segment in self.segments if segment.is_copy()])
+        print("Smart render,", len(self.segments), "segments,", copied, "of", self.total_frames, "frames copied")
+
+        if self._render_segments() == False and self.aborted == False:
+            # Output is rendered normally from scratch.
+            print("Smart render failed, rendering all frames")
+            self.done_frames = 0
+            consumer = renderconsumer.get_mlt_render_consumer(self.render_path, self.profile, self.args_vals_list)
+            start_frame = self.segments[0].first
+            end_frame = self.segments[-1].last
+            self._run_render_player(self.producer, consumer, start_frame, end_frame, self.wait_for_producer_end_stop)
+
+        self.running = False
+
+    def _render_segments(self):
+        if os.path.exists(self.work_folder):
+            shutil.rmtree(self.work_folder)
+        os.mkdir(self.work_folder)
+
+        try:
+            segment_paths = []
+            for i in range(0, len(self.segments)):
+                if self.aborted == True:
+                    return False
+                segment = self.segments[i]
+                segment_path = self.work_folder + "/segment_" + str(i) + "." + self.target["intermediate_ext"]
+                if segment.is_copy():
+                    success = self._copy_segment(segment, segment_path)
+                else:
+                    success = self._render_segment(segment, segment_path)
+                if success == False:
+                    return False
+                self.done_frames += segment.get_length()
+                segment_paths.append(segment_path)
+
+            list_path = self.work_folder + "/concat_list"
+            with open(list_path, "w") as f:
+                for segment_path in segment_paths:
+                    f.write("file '" + segment_path.replace("'", "'\\''") + "'\n")
+
+            command_list = ["ffmpeg", "-y", "-v", "error", "-nostdin", "-f", "concat", "-safe", "0", "-i", list_path, "-c", "copy"]
+            args = dict(self.args_vals_list)
+            if "f" in args:
+                command_list += ["-f", args["f"]]
+            if "movflags" in args:
+                command_list += ["-movflags", args["movflags"]]
+            command_list += [self.render_path]
+            return self._run(command_list)
+        finally:
+            shutil.rmtree(self.work_folder, ignore_errors=True)
+
+    def _copy_segment(self, segment, segment_path):
+        fps = self.target["fps"]
+        duration = float(segment.get_length()) / fps
+        # Seek lands on segment start keyframe.
+        command_list = ["ffmpeg", "-y", "-v", "error", "-nostdin",
+                        "-noaccurate_seek", "-ss", "%.6f" % (segment.source_start + 0.25 / fps),
+                        "-i", segment.source_path, "-t", "%.6f" % duration,
+                        "-map", "0:v:0", "-map", "0:a:0", "-c", "copy", "-avoid_negative_ts", "make_zero",
+                        "-f", self.target["intermediate_format"], segment_path]
+        return self._run(command_list)
+
+    def _render_segment(self, segment, segment_path):
+        args_vals_list = []
+        for arg, val in self.args_vals_list:
+            if arg != "f" and arg != "movflags":
+                args_vals_list.append((arg, val))
+        args_vals_list.append(("f", self.target["intermediate_format"]))
+
+        consumer = renderconsumer.get_mlt_render_consumer(segment_path, self.profile, args_vals_list)
+        tractor = renderconsumer.get_clipped_producer_as_tractor(self.producer, segment.first, segment.last)
+        self._run_render_player(tractor, consumer, 0, segment.get_length() - 1, True)
+        return self.aborted == False and os.path.isfile(segment_path)
+
+    def _run_render_player(self, producer, consumer, start_frame, end_frame, wait_for_producer_end_stop):
+        self.segment_player = renderconsumer.FileRenderPlayer(None, producer, consumer, start_frame, end_frame)
+        self.segment_player.wait_for_producer_end_stop = wait_for_producer_end_stop
+        self.segment_player.start()
+        while self.segment_player.has_started_running == False:
+            time.sleep(0.05)
+        while self.segment_player.running == True:
+            time.sleep(0.1)
+        self.segment_player.shutdown()
+        self.segment_player = None
+
+    def _run(self, command_list):
+        if self.aborted == True:
+            return False
+        try:
+            self.process = subprocess.Popen(command_list, stdin=subprocess.DEVNULL)
+        except OSError as e:
+            print("Smart render ffmpeg launch failed:", e)
+            return False
+        ret_code = self.process.wait()
+        self.process = None
+
+        if ret_code != 0 and self.aborted == False:
+            print("Smart render ffmpeg failed:", " ".join(command_list))
+        return ret_code == 0 and self.aborted == False
+
+    def get_render_fraction(self):
+        done_frames = self.done_frames
+        segment_player = self.segment_player
+        if segment_player != None:
+            done_frames += segment_player.get_render_fraction() * (segment_player.stop_frame - segment_player.start_frame + 1)
+        return min(1.0, float(done_frames) / float(max(1, self.total_frames)))
+
+    def shutdown(self):
+        if self.running == False:
+            return
+        self.aborted = True
+        segment_player = self.segment_player
+        if segment_player != None:
+            segment_player.shutdown()
+        process = self.process
+        if process != None:
+            process.kill()
@@ -22,6 +22,7 @@ try:
     import mlt7 as mlt
 except:
     import mlt
+import os
 import threading
 import time
 
@@ -32,6 +33,8 @@ import renderconsumer
 
 _render_thread = None
 
+STABILIZE_DATA_HEADER = "VID.STAB 1"
+
 
 # ----------------------------------------------------- module interface with message files
 # We are using message files to communicate with application.
@@ -52,18 +55,41 @@ def delete_session_folders(parent_folder, session_id):
      ccrutils.delete_internal_folders(parent_folder, session_id)
 
 # --------------------------------------------------- render thread launch
-def main(root_path, session_id, parent_folder, profile_desc, write_file, clip_path, accuracy, shakiness, smoothing, zoom):
+def main(root_path, session_id, parent_folder, profile_desc, write_file, clip_path, accuracy, shakiness, smoothing, zoom, range_in=None, range_out=None):
     
     mltheadlessutils.mlt_env_init(root_path, parent_folder, session_id)
 
     global _render_thread
-    _render_thread = StabilizeHeadlessRunnerThread(profile_desc, write_file, clip_path, accuracy, shakiness,  smoothing, zoom)
+    _render_thread = StabilizeHeadlessRunnerThread(profile_desc, write_file, clip_path, accuracy, shakiness,  smoothing, zoom, range_in, range_out)
     _render_thread.start()
 
+def offset_results_file(results_file, frame_offset):
+    # Range analysis numbers frames from range start. We shift frame numbers to match source
+    # frame positions and write empty motion data for frames before range.
+    # Returns False if results file is not in known text format.
+    with open(results_file) as f:
+        lines = f.readlines()
+    if len(lines) == 0 or lines[0].strip() != STABILIZE_DATA_HEADER:
+        return False
+
+    out_lines = [line for line in lines if line.startswith("#") or line.strip() == STABILIZE_DATA_HEADER]
+    for frame in range(1, frame_offset + 1):
+        out_lines.append("Frame " + str(frame) + " (List 0 [])\n")
+    for line in lines:
+        if line.startswith("Frame "):
+            number_str, rest = line[len("Frame "):].split(" ", 1)
+            out_lines.append("Frame " + str(int(number_str) + frame_offset) + " " + rest)
+
+    tmp_file = results_file + ".tmp"
+    with open(tmp_file, "w") as f:
+        f.writelines(out_lines)
+    os.replace(tmp_file, results_file)
+    return True
+
 
 class StabilizeHeadlessRunnerThread(threading.Thread):
 
-    def __init__(self, profile_desc, write_file, clip_path, accuracy, shakiness, smoothing, zoom):
+    def __init__(self, profile_desc, write_file, clip_path, accuracy, shakiness, smoothing, zoom, range_in=None, range_out=None):
         threading.Thread.__init__(self)
 
         self.write_file = write_file
@@ -73,6 +99,12 @@ class StabilizeHeadlessRunnerThread(threading.Thread):
         self.smoothing = smoothing
         self.zoom = zoom
         self.profile_desc = profile_desc
+        # Analysis is done for full clip if range not given.
+        self.range_in = None
+        self.range_out = None
+        if range_in != None and range_out != None:
+            self.range_in = int(range_in)
+            self.range_out = int(range_out)
         self.abort = False
 
     def run(self):
@@ -80,7 +112,26 @@ class StabilizeHeadlessRunnerThread(threading.Thread):
 
         profile = mltprofiles.get_profile(self.profile_desc) 
         producer = mlt.Producer(profile, str(self.clip_path)) # this runs 0.5s+ on some clips
+
+        if self.range_in != None and self.range_in > 0:
+            # Filter on a cut sees frame positions from range start, results file is fixed after analysis.
+            cut = producer.cut(self.range_in, self.range_out)
+            self.analyze(profile, cut)
+            if offset_results_file(str(self.write_file), self.range_in) == True:
+                ccrutils.write_completed_message()
+                return
+            print("Unknown stabilizing data format, analyzing full clip.")
+            producer = mlt.Producer(profile, str(self.clip_path))
+        elif self.range_out != None:
+            # Range starts from first frame, no frame positions fixing needed.
+            producer = producer.cut(0, self.range_out)
+            
+        self.analyze(profile, producer)
         
+        # Write out completed flag file.
+        ccrutils.write_completed_message()
+
+    def analyze(self, profile, producer):
         stabilize_filter = mlt.Filter(profile, "vidstab")
         # Initial values.
         stabilize_filter.set("stepsize", "6")
@@ -137,9 +188,6 @@ class StabilizeHeadlessRunnerThread(threading.Thread):
             render_fraction = float(producer.frame()) / float(producer.get_length())
             self.render_update(render_fraction)
             time.sleep(0.3)
-        
-        # Write out completed flag file.
-        ccrutils.write_completed_message()
 
     def check_abort_requested(self):
         self.abort = ccrutils.abort_requested()
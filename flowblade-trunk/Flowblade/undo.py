@@ -29,7 +29,6 @@ import time
 
 import callbackbridge
 import editorstate
-import utils
 
 set_post_undo_redo_edit_mode = None # This is set at startup to avoid circular imports.
 repaint_tline = None
@@ -172,70 +171,113 @@ def undo_redo_stress_test():
             time.sleep(delay)
 
 # ------------------------------------------- LINKED SEQUENCE CYCLIC TESTING
-WHITE = 0
-GREY = 1
-BLACK = 2
-
-is_cyclic = False
-
-class LinkNode:
-    
-    def __init__(self, seq):
-        self.seq = seq
-        self.targets = []
-        self.color = WHITE
-
-    def get_target_nodes(self, nodes):
-        target_nodes = []
-        for node in nodes:
-            if node.seq.uid in self.targets:
-                target_nodes.append(node)
-        return target_nodes
-
-def force_revert_if_cyclic_seq_links(project):
-    test_thread = utils.LaunchThread(project, _run_seq_link_cyclic_test)
-    test_thread.run()
-
-def _run_seq_link_cyclic_test(project):
-    global is_cyclic
-    is_cyclic = False
-    nodes = []
+# Sequence link graph is maintained between edits. Edits report tracks where clips 
+# with 'link_seq_data' were inserted or removed, and only those tracks are rescanned.
+# Cycle test is only done for link edges that were added since last test.
+_link_graph_project = None
+_track_link_targets = {} # track -> {link seq uid: clips count}
+_seq_link_targets = {} # seq uid -> {link seq uid: clips count}
+_dirty_link_tracks = set()
+
+def seq_link_track_changed(track):
+    # Called by edit ops when a clip with 'link_seq_data' is inserted or removed.
+    _dirty_link_tracks.add(track)
+
+def _get_track_link_targets(track):
+    targets = {}
+    for clip in track.clips:
+        if clip.link_seq_data == None:
+            continue
+        targets[clip.link_seq_data] = targets.get(clip.link_seq_data, 0) + 1
+    return targets
+
+def _update_seq_link_graph(project):
+    # Returns list of (seq uid, link seq uid) edges added since last update.
+    global _link_graph_project, _track_link_targets, _seq_link_targets, _dirty_link_tracks
+    if project is not _link_graph_project:
+        _link_graph_project = project
+        _track_link_targets = {}
+        _seq_link_targets = {}
+
+    dirty_tracks = _dirty_link_tracks
+    _dirty_link_tracks = set()
+    added_edges = []
     
+    project_seq_uids = set()
     for seq in project.sequences:
-        node = LinkNode(seq)
-        nodes.append(node)
+        project_seq_uids.add(seq.uid)
+        if seq.uid not in _seq_link_targets:
+            # New or unseen sequence, all tracks are scanned once.
+            seq_targets = {}
+            for track in seq.tracks:
+                track_targets = _get_track_link_targets(track)
+                _track_link_targets[track] = track_targets
+                _add_link_targets(seq_targets, track_targets, 1)
+            _seq_link_targets[seq.uid] = seq_targets
+            for target_uid in seq_targets:
+                added_edges.append((seq.uid, target_uid))
+            continue
+
+        if len(dirty_tracks) == 0:
+            continue
+
+        seq_targets = _seq_link_targets[seq.uid]
         for track in seq.tracks:
-            for clip in track.clips:
-                if clip.link_seq_data == None:
-                    continue
-                else:
-                    try:
-                        node.targets.append(clip.link_seq_data)
-                    except AttributeError:
-                        # Is already a set.
-                        node.targets.add(clip.link_seq_data)
-                    node.targets = set(node.targets) 
-
-    for node in nodes:
-        _visitDFS(node, nodes)
-        
-    if is_cyclic == True:
-        GLib.idle_add(_do_force_undo_with_pop)
-
-def _visitDFS(node, nodes):
-    global is_cyclic
-    
-    node.color = GREY
+            if track not in dirty_tracks:
+                continue
+            old_track_targets = _track_link_targets.get(track, {})
+            track_targets = _get_track_link_targets(track)
+            _track_link_targets[track] = track_targets
+            _add_link_targets(seq_targets, old_track_targets, -1)
+            for target_uid in _add_link_targets(seq_targets, track_targets, 1):
+                added_edges.append((seq.uid, target_uid))
+
+    # Forget deleted sequences.
+    for seq_uid in list(_seq_link_targets.keys()):
+        if seq_uid not in project_seq_uids:
+            del _seq_link_targets[seq_uid]
+
+    return added_edges
+
+def _add_link_targets(seq_targets, track_targets, sign):
+    # Returns link seq uids that became new targets for sequence.
+    new_targets = []
+    for target_uid, count in track_targets.items():
+        old_count = seq_targets.get(target_uid, 0)
+        new_count = old_count + sign * count
+        if new_count <= 0:
+            seq_targets.pop(target_uid, None)
+        else:
+            seq_targets[target_uid] = new_count
+            if old_count == 0:
+                new_targets.append(target_uid)
+    return new_targets
+
+def _link_path_exists(from_uid, to_uid):
+    # Iterative DFS over link graph.
+    visited = set()
+    stack = [from_uid]
+    while len(stack) > 0:
+        seq_uid = stack.pop()
+        if seq_uid == to_uid:
+            return True
+        if seq_uid in visited:
+            continue
+        visited.add(seq_uid)
+        stack.extend(_seq_link_targets.get(seq_uid, {}).keys())
+    return False
 
-    target_nodes = node.get_target_nodes(nodes)
-
-    for target_node in target_nodes:
-        if target_node.color == GREY:
-            is_cyclic = True
-        if target_node.color == WHITE:
-            _visitDFS(target_node, nodes)
+def force_revert_if_cyclic_seq_links(project):
+    if _seq_link_graph_is_cyclic(project) == True:
+        GLib.idle_add(_do_force_undo_with_pop)
 
-    node.color = BLACK
+def _seq_link_graph_is_cyclic(project):
+    # Graph was acyclic before added edges, so a cycle exists only if 
+    # some added edge (seq, target) closes a path from target back to seq.
+    for seq_uid, target_uid in _update_seq_link_graph(project):
+        if _link_path_exists(target_uid, seq_uid) == True:
+            return True
+    return False
 
 
 def _do_force_undo_with_pop():
@@ -40,6 +40,7 @@ from editorstate import PLAYER
 from editorstate import PROJECT
 from editorstate import timeline_visible
 import editorpersistance
+import framescheduler
 import kftoolmode
 import monitorevent
 import mediaplugin
@@ -61,6 +62,9 @@ PIX_PER_FRAME_MIN = 0.001
 MOUSE_SIDE_SCROLL_SPEED = 1.4
 MOUSE_SIDE_SCROLL_SPEED_LENGTH_CORRECTION_MULTI = 6000.0
 
+# Playback frame display update rates, times per second
+KF_EDITORS_MAX_RATE = 10
+
 # Trim edit loop playback
 TRIM_EDIT_PRE_ROLL = 25
 TRIM_EDIT_POST_ROLL = 20
@@ -604,6 +608,41 @@ def update_frame_displayers(frame):
     gui.big_tc.queue_draw()
     clipeffectseditor.display_kfeditors_tline_frame(frame)
     compositeeditor.display_kfeditors_tline_frame(frame)
+    framescheduler.frame_displayed(frame)
+
+def update_playback_frame_displayers(frame):
+    """
+    Display frame position during playback.
+
+    Displays are updated on next frame clock tick, timeline widgets redraw only
+    frame pointer areas and hidden editors are not updated.
+    """
+    if framescheduler.has_subscribers() == False:
+        _subscribe_playback_frame_displays()
+
+    if not timeline_visible() and save_monitor_frame:
+        MONITOR_MEDIA_FILE().current_frame = frame
+
+    framescheduler.frame_changed(frame)
+
+def _subscribe_playback_frame_displays():
+    framescheduler.subscribe("pos_bar", _display_pos_bar_frame)
+    framescheduler.subscribe("big_tc", lambda frame: gui.big_tc.queue_draw())
+    # Timeline frame pointer does not move when clip is displayed in monitor.
+    framescheduler.subscribe("tline_scale", lambda frame: gui.tline_scale.queue_playhead_draw(), None, timeline_visible)
+    framescheduler.subscribe("kftool", kftoolmode.update_clip_frame, None, kftoolmode.kf_editor_active)
+    framescheduler.subscribe("tline_canvas", lambda frame: gui.tline_canvas.queue_playhead_draw(), None, timeline_visible)
+    framescheduler.subscribe("clip_kf_editors", clipeffectseditor.display_kfeditors_tline_frame, 
+                             KF_EDITORS_MAX_RATE, clipeffectseditor.kfeditors_visible)
+    framescheduler.subscribe("compositor_kf_editors", compositeeditor.display_kfeditors_tline_frame, 
+                             KF_EDITORS_MAX_RATE, compositeeditor.kfeditors_visible)
+
+def _display_pos_bar_frame(frame):
+    if timeline_visible():
+        producer_length = PLAYER().producer.get_length()
+    else:
+        producer_length = gui.pos_bar.producer.get_length()
+    gui.pos_bar.set_normalized_pos(frame / float(producer_length))
 
 def update_position_bar():
     if timeline_visible():